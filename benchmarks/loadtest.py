@@ -0,0 +1,225 @@
+"""Load-test the JSON API (``src/api.py``) at a fixed request rate.
+
+Requests are sent open loop: request ``i`` is due ``i / rate`` seconds
+after the start whether or not earlier ones have finished. Latency is
+measured from the time a request was due, so queueing behind a slow
+server counts against it instead of silently lowering the rate::
+
+    python benchmarks/loadtest.py --rows 100k --rate 200 --duration 20
+    python benchmarks/loadtest.py --url http://127.0.0.1:8502 --rate 500 --output load.json
+
+Without ``--url`` a server is started in a child process, on ``--db`` or
+on a database built from ``--rows`` synthetic rows. A share of requests
+(``--conditional``) revalidates with the ETag of the previous response to
+the same path, as a polling client would.
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import http.client
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterator, Sequence
+from urllib.parse import urlsplit
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from benchmarks import synthetic
+from benchmarks.run import _git_commit, parse_size
+
+# Request mix, drawn uniformly; the dashboard's views plus a few selections.
+PATHS = [
+    "/health",
+    "/insight",
+    "/trend",
+    "/growth/categories",
+    "/growth/categories?freq=quarter",
+    "/growth/makers?top=20&by=registrations",
+    "/growth/makers?freq=quarter&top=20&by=qoq_pct",
+    "/rankings?top=50&by=share_pct",
+    "/rankings?bottom=20&by=share_change_bps",
+]
+
+API_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "api.py")
+
+
+def run_load(
+    base_url: str,
+    rate: float,
+    duration: float,
+    paths: Sequence[str] = PATHS,
+    concurrency: int = 32,
+    conditional: float = 0.5,
+    seed: int = 0,
+) -> Dict:
+    """Send ``rate`` requests per second for ``duration`` seconds and
+    summarise their latencies (in milliseconds) and status codes."""
+
+    url = urlsplit(base_url)
+    total = max(int(rate * duration), 1)
+    rng = random.Random(seed)
+    plan = [(rng.choice(paths), rng.random() < conditional) for _ in range(total)]
+    local = threading.local()
+    etags: Dict[str, str] = {}
+
+    def send(due: float, path: str, revalidate: bool):
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if getattr(local, "conn", None) is None:
+            local.conn = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+        headers = {"If-None-Match": etags[path]} if revalidate and path in etags else {}
+        try:
+            local.conn.request("GET", path, headers=headers)
+            response = local.conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            local.conn.close()
+            local.conn = None
+            return None, time.perf_counter() - due
+        if response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+        return response.status, time.perf_counter() - due
+
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as pool:
+        start = time.perf_counter() + 0.05
+        futures = [
+            pool.submit(send, start + i / rate, path, revalidate) for i, (path, revalidate) in enumerate(plan)
+        ]
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+
+    statuses = Counter("error" if status is None else str(status) for status, _ in results)
+    latencies = np.array([seconds for _, seconds in results]) * 1000
+    return {
+        "requests": total,
+        "target_rate": rate,
+        "achieved_rate": round(total / elapsed, 1),
+        "statuses": dict(sorted(statuses.items())),
+        "errors": sum(count for status, count in statuses.items() if not status.startswith(("2", "3"))),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p90_ms": round(float(np.percentile(latencies, 90)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "max_ms": round(float(latencies.max()), 2),
+        "mean_ms": round(float(latencies.mean()), 2),
+    }
+
+
+def warm(base_url: str, paths: Sequence[str] = PATHS):
+    """Request every path once, so the run measures a warm server."""
+
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=300)
+    try:
+        for path in paths:
+            conn.request("GET", path)
+            conn.getresponse().read()
+    finally:
+        conn.close()
+
+
+@contextlib.contextmanager
+def serve(db_path: str, startup_timeout: float = 300) -> Iterator[str]:
+    """Run ``src/api.py`` on ``db_path`` in a child process; yield its URL."""
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, API_SCRIPT, "--db", db_path, "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + startup_timeout
+        while True:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            try:
+                conn.request("GET", "/health")
+                if conn.getresponse().status == 200:
+                    break
+            except OSError:
+                if process.poll() is not None or time.time() > deadline:
+                    raise RuntimeError(f"API server on {db_path} did not start")
+                time.sleep(0.2)
+            finally:
+                conn.close()
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def build_db(workdir: str, rows: int, seed: int = 0) -> str:
+    """Build a database of ``rows`` synthetic rows under ``workdir``."""
+
+    from src.ingest import init_db
+
+    csv = synthetic.write_csv(os.path.join(workdir, f"vahan_{rows}.csv"), rows, seed)
+    db = os.path.join(workdir, f"vahan_{rows}.db")
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db(db, csv, snapshot_dir=os.path.join(workdir, f"snapshot_{rows}"))
+    return db
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Vahan JSON API.")
+    parser.add_argument("--url", help="API to test; by default one is started on --db or --rows")
+    parser.add_argument("--db", help="database to serve when starting the API")
+    parser.add_argument("--rows", default="100k", help="synthetic rows to serve when neither --url nor --db is given")
+    parser.add_argument("--rate", type=float, default=100, help="requests per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=32, help="most requests in flight at once")
+    parser.add_argument("--conditional", type=float, default=0.5, help="share of requests sent with If-None-Match")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the request mix and synthetic data")
+    parser.add_argument("--output", help="also write the results as JSON here")
+    args = parser.parse_args(argv)
+
+    workdir = None
+    try:
+        with contextlib.ExitStack() as stack:
+            base_url = args.url
+            if base_url is None:
+                db = args.db
+                if db is None:
+                    workdir = tempfile.mkdtemp(prefix="vahan-load-")
+                    rows = parse_size(args.rows)
+                    print(f"Building a database of {rows:,} synthetic rows...", flush=True)
+                    db = build_db(workdir, rows, args.seed)
+                base_url = stack.enter_context(serve(db))
+            warm(base_url)
+            result = run_load(
+                base_url, args.rate, args.duration, PATHS, args.concurrency, args.conditional, args.seed
+            )
+    finally:
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(
+        f"{result['requests']:,} requests at {result['achieved_rate']}/s (target {args.rate:g}/s): "
+        f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, max {result['max_ms']} ms; "
+        f"statuses {result['statuses']}"
+    )
+    if args.output:
+        report = {"commit": _git_commit(), "python": platform.python_version(), "url": base_url, **result}
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Wrote {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Time and memory-profile the pipeline on synthetic Vahan data.
+
+Each stage runs in a freshly spawned process so its peak RSS is not
+inflated by whatever ran before it. Results are written as JSON so two
+commits can be compared::
+
+    python benchmarks/run.py --sizes 10k,1m --output before.json
+    python benchmarks/run.py --sizes 10k,1m --output after.json --compare before.json
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from benchmarks import synthetic
+from src.ingest import _load_vahan_records, init_db
+from src.instrument import peak_rss_mb
+
+DEFAULT_SIZES = ["10k", "1m", "50m"]
+
+STAGES = [
+    "generate",
+    "load_records",
+    "init_db",
+    "load_db",
+    "read_facts",
+    "compute_yoy_qoq",
+    "compute_category_growth",
+    "get_key_insight",
+]
+
+TRANSFORM_COLUMNS = ["date", "vehicle_category", "maker", "registrations"]
+
+
+def parse_size(text: str) -> int:
+    """Parse ``"10k"``, ``"1m"`` or ``"50M"`` into a row count."""
+
+    text = text.strip().lower().replace("_", "")
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def _paths(workdir: str, rows: int) -> Dict[str, str]:
+    return {
+        "csv": os.path.join(workdir, f"vahan_{rows}.csv"),
+        "db": os.path.join(workdir, f"vahan_{rows}.db"),
+        "snapshot": os.path.join(workdir, f"snapshot_{rows}"),
+    }
+
+
+# Each stage prepares its inputs, then returns the callable that is timed;
+# the callable returns the number of rows it processed.
+
+def _stage_generate(paths, rows, seed) -> Callable[[], int]:
+    def run():
+        synthetic.write_csv(paths["csv"], rows, seed)
+        return rows
+    return run
+
+
+def _stage_load_records(paths, rows, seed) -> Callable[[], int]:
+    return lambda: sum(1 for _ in _load_vahan_records(paths["csv"]))
+
+
+def _stage_init_db(paths, rows, seed) -> Callable[[], int]:
+    for suffix in ("", "-wal", "-shm"):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(paths["db"] + suffix)
+    shutil.rmtree(paths["snapshot"], ignore_errors=True)
+
+    def run():
+        init_db(paths["db"], paths["csv"], snapshot_dir=paths["snapshot"])
+        return rows
+    return run
+
+
+def _stage_load_db(paths, rows, seed) -> Callable[[], int]:
+    from src.query import Filters
+    from src.snapshot import load_facts
+    from src.storage import connect
+
+    def run():
+        conn = connect(paths["db"])
+        df = load_facts(conn, Filters(), paths["snapshot"])
+        conn.close()
+        return len(df)
+    return run
+
+
+def _stage_read_facts(paths, rows, seed) -> Callable[[], int]:
+    from src.query import Filters, read_facts
+    from src.storage import connect
+
+    def run():
+        conn = connect(paths["db"])
+        df = read_facts(conn, Filters())
+        conn.close()
+        return len(df)
+    return run
+
+
+def _transform_stage(name: str):
+    def prepare(paths, rows, seed) -> Callable[[], int]:
+        from src import data_processing, transform
+
+        func = {
+            "compute_yoy_qoq": transform.compute_yoy_qoq,
+            "compute_category_growth": transform.compute_category_growth,
+            "get_key_insight": data_processing.get_key_insight,
+        }[name]
+        df = synthetic.frame(rows, seed, TRANSFORM_COLUMNS)
+
+        def run():
+            func(df)
+            return len(df)
+        return run
+    return prepare
+
+
+PREPARE = {
+    "generate": _stage_generate,
+    "load_records": _stage_load_records,
+    "init_db": _stage_init_db,
+    "load_db": _stage_load_db,
+    "read_facts": _stage_read_facts,
+    "compute_yoy_qoq": _transform_stage("compute_yoy_qoq"),
+    "compute_category_growth": _transform_stage("compute_category_growth"),
+    "get_key_insight": _transform_stage("get_key_insight"),
+}
+
+
+def run_stage(stage: str, workdir: str, rows: int, seed: int = 0) -> Dict:
+    """Run one stage in the current process and return its measurements."""
+
+    run = PREPARE[stage](_paths(workdir, rows), rows, seed)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        processed = run()
+    seconds = time.perf_counter() - start
+    peak = peak_rss_mb()
+    return {
+        "stage": stage,
+        "rows": rows,
+        "processed": int(processed),
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(processed / seconds, 1) if seconds else None,
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(peak, 1),
+        "peak_delta_mb": round(peak - baseline, 1),
+    }
+
+
+def run_suite(
+    sizes: List[int],
+    stages: List[str] = STAGES,
+    workdir: Optional[str] = None,
+    seed: int = 0,
+    inline: bool = False,
+) -> Dict:
+    """Run ``stages`` for every size and return the results document.
+
+    Stages depend on the ones before them (``init_db`` needs the CSV that
+    ``generate`` wrote, ``load_db`` the database), so they always run in
+    :data:`STAGES` order. Unless ``inline`` is set every stage gets its own
+    spawned process.
+    """
+
+    owned = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix="vahan-bench-")
+    context = multiprocessing.get_context("spawn")
+    results = []
+    try:
+        for rows in sizes:
+            for stage in (s for s in STAGES if s in stages):
+                if inline:
+                    result = run_stage(stage, workdir, rows, seed)
+                else:
+                    with concurrent.futures.ProcessPoolExecutor(1, mp_context=context) as pool:
+                        result = pool.submit(run_stage, stage, workdir, rows, seed).result()
+                print(
+                    f"{stage:<24} {rows:>12,} rows  {result['seconds']:>9.3f}s  "
+                    f"peak {result['peak_rss_mb']:>8.1f} MiB (+{result['peak_delta_mb']:.1f})",
+                    flush=True,
+                )
+                results.append(result)
+    finally:
+        if owned:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict) -> List[str]:
+    """Describe how ``current`` moved against ``baseline``, stage by stage."""
+
+    before = {(r["stage"], r["rows"]): r for r in baseline["results"]}
+    lines = []
+    for result in current["results"]:
+        old = before.get((result["stage"], result["rows"]))
+        if not old or not old["seconds"]:
+            continue
+        lines.append(
+            f"{result['stage']:<24} {result['rows']:>12,} rows  "
+            f"time x{result['seconds'] / old['seconds']:.2f}  "
+            f"peak {result['peak_delta_mb'] - old['peak_delta_mb']:+.1f} MiB"
+        )
+    return lines
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic Vahan data.")
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES), help="comma separated row counts, e.g. 10k,1m,50m")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma separated subset of stages")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic data")
+    parser.add_argument("--workdir", help="keep generated files here instead of a temporary directory")
+    parser.add_argument("--output", default="benchmarks/results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    parser.add_argument("--inline", action="store_true", help="run every stage in this process")
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+
+    report = run_suite(sizes, stages, args.workdir, args.seed, args.inline)
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"Wrote {args.output}.")
+
+    if args.compare:
+        with open(args.compare) as fh:
+            print("\n".join(compare(report, json.load(fh))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Deterministic generator of Vahan-scale synthetic registration data.
+
+The output mimics the shape of real state-wise Vahan exports: about 1,500
+makers of very uneven size, a few dozen vehicle categories, 36 states and
+union territories and 12 years of months, with series that start late,
+stop early and skip months. The same ``seed`` and ``rows`` always produce
+the same rows, in the same order, whatever ``chunk_rows`` is.
+"""
+
+import os
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+MAKERS = 1_500
+CATEGORIES = [
+    "2WIC", "2WN", "2WT", "3WN", "3WT", "3WIC", "4WIC", "LMV", "LPV", "LGV",
+    "MMV", "MPV", "MGV", "HMV", "HPV", "HGV", "E-RICKSHAW", "E-CART",
+    "AMBULANCE", "TRACTOR", "TRAILER", "CONSTRUCTION", "QUADRICYCLE",
+    "ADAPTED", "OMNIBUS", "CAB", "MAXI CAB", "SCHOOL BUS", "CARAVAN", "OTHER",
+]
+STATES = [f"S{i:02d}" for i in range(36)]
+START_YEAR = 2014
+MONTHS = 12 * 12
+
+# Share of active months that are missing from the export.
+GAP_RATE = 0.05
+
+# Series generated per block; bounds the memory of a single chunk.
+BLOCK_SERIES = 2_000
+
+COLUMNS = ["date", "state", "vehicle_category", "maker", "registrations"]
+
+
+def max_rows() -> int:
+    """Upper bound on the rows the generator can produce."""
+
+    return MAKERS * len(CATEGORIES) * len(STATES) * MONTHS
+
+
+def generate(rows: int, seed: int = 0, chunk_rows: int = 500_000) -> Iterator[pd.DataFrame]:
+    """Yield ``rows`` synthetic rows in chunks of at most ``chunk_rows``.
+
+    Every (date, state, vehicle_category, maker) combination appears at
+    most once.
+    """
+
+    if rows > max_rows():
+        raise ValueError(f"At most {max_rows()} rows can be generated.")
+
+    dates = np.array(
+        [f"{START_YEAR + m // 12}-{m % 12 + 1:02d}-01" for m in range(MONTHS)], dtype=object
+    )
+    makers = np.array([f"MAKER {i:04d}" for i in range(MAKERS)], dtype=object)
+    categories = np.array(CATEGORIES, dtype=object)
+    states = np.array(STATES, dtype=object)
+
+    # Fixed per-maker and per-category scale: a few makers dominate.
+    base = np.random.default_rng(seed)
+    maker_scale = base.lognormal(mean=3.0, sigma=1.6, size=MAKERS)
+    category_scale = base.lognormal(mean=1.0, sigma=0.8, size=len(CATEGORIES))
+    season = 1 + 0.15 * np.sin(2 * np.pi * (np.arange(MONTHS) % 12) / 12)
+
+    # Walk the (maker, category, state) space in a scrambled but fixed
+    # order; ``stride`` is coprime with its size, so every series is
+    # visited at most once.
+    space = MAKERS * len(CATEGORIES) * len(STATES)
+    stride = 1_000_003
+    while np.gcd(stride, space) != 1:
+        stride += 2
+
+    produced = 0
+    pending = []
+    pending_rows = 0
+    block = 0
+    while produced < rows:
+        if block * BLOCK_SERIES >= space:
+            raise ValueError(f"Only {produced} rows fit the synthetic universe.")
+        rng = np.random.default_rng([seed, block])
+        series = (np.arange(block * BLOCK_SERIES, (block + 1) * BLOCK_SERIES) * stride) % space
+        block += 1
+
+        maker = series // (len(CATEGORIES) * len(STATES))
+        category = series // len(STATES) % len(CATEGORIES)
+        state = series % len(STATES)
+
+        start = rng.integers(0, MONTHS, size=len(series)) * (rng.random(len(series)) < 0.6)
+        stop = np.where(rng.random(len(series)) < 0.1, rng.integers(0, MONTHS, size=len(series)), MONTHS)
+        month = np.arange(MONTHS)
+        active = (month >= start[:, None]) & (month < stop[:, None])
+        active &= rng.random(active.shape) >= GAP_RATE
+
+        level = maker_scale[maker] * category_scale[category]
+        trend = 1 + rng.normal(0.05, 0.1, size=len(series))
+        growth = np.abs(trend)[:, None] ** (month / 12)[None, :]
+        noise = rng.lognormal(0, 0.2, size=active.shape)
+        counts = np.rint(level[:, None] * growth * season * noise).astype("int64")
+
+        series_idx, month_idx = np.nonzero(active)
+        take = min(len(series_idx), rows - produced)
+        series_idx, month_idx = series_idx[:take], month_idx[:take]
+        frame = pd.DataFrame({
+            "date": dates[month_idx],
+            "state": states[state[series_idx]],
+            "vehicle_category": categories[category[series_idx]],
+            "maker": makers[maker[series_idx]],
+            "registrations": counts[series_idx, month_idx],
+        })
+        produced += take
+        pending.append(frame)
+        pending_rows += take
+
+        while pending_rows >= chunk_rows or (produced >= rows and pending_rows):
+            merged = pd.concat(pending, ignore_index=True) if len(pending) > 1 else pending[0]
+            yield merged.iloc[:chunk_rows].reset_index(drop=True)
+            rest = merged.iloc[chunk_rows:]
+            pending = [rest] if len(rest) else []
+            pending_rows = len(rest)
+
+
+def write_csv(path: str, rows: int, seed: int = 0, chunk_rows: int = 500_000) -> str:
+    """Write ``rows`` synthetic rows to ``path`` as CSV and return the path."""
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    header = True
+    with open(path, "w", newline="") as fh:
+        for chunk in generate(rows, seed=seed, chunk_rows=chunk_rows):
+            chunk.to_csv(fh, index=False, header=header)
+            header = False
+    return path
+
+
+def frame(rows: int, seed: int = 0, columns: Optional[list] = None) -> pd.DataFrame:
+    """Return ``rows`` synthetic rows as a single DataFrame."""
+
+    df = pd.concat(generate(rows, seed=seed), ignore_index=True)
+    return df[columns] if columns is not None else df
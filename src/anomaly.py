@@ -0,0 +1,274 @@
+"""Trend-break scan over every maker x category monthly series.
+
+Each series' monthly registrations are laid out as one row of a dense
+``series x month`` matrix, and every score is computed for every cell at once
+from cumulative sums along the month axis. The cost is a few passes over the
+matrix whatever the number of series, so the full maker universe is rescanned
+on every data refresh (see :func:`refresh_anomalies`).
+
+For each month a series is scored against its own history:
+
+* **seasonal**: against the trailing year's level plus the median offset
+  of the same month in up to three earlier years. This is used once a
+  series has a year of history, so recurring peaks such as festive months
+  are not flagged and a one-off spike is not expected again next year.
+* **level**: a rolling z-score against the trailing year, for series too
+  young to have a seasonal baseline.
+* **break**: the mean of the last few months against the year before them.
+  It only counts when every one of those months sits on the same side of
+  the old level, and it is reported once, in the month the new level is
+  confirmed.
+
+Deviations are measured in standard deviations, with a Poisson floor of
+``sqrt(mean)`` so that small, noisy series do not flag every wobble.
+"""
+
+import sqlite3
+import warnings
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.storage import data_version, month_key_to_timestamp
+from src.transform import period_ordinals
+
+# Scores at or beyond this many standard deviations are reported.
+THRESHOLD = 3.0
+
+# Trailing months that form a series' baseline.
+WINDOW = 12
+
+# Months of history a baseline needs before its score is used.
+MIN_HISTORY = 6
+
+# Months a new level must hold before it is reported as a break.
+BREAK_MONTHS = 6
+
+# Months in a seasonal cycle; a month is compared with the same month of earlier years.
+SEASON = 12
+
+# Earlier years whose same month is combined into the seasonal baseline.
+SEASONAL_YEARS = 3
+
+KINDS = ("spike", "collapse", "break")
+
+COLUMNS = ["kind", "score", "registrations", "expected"]
+
+
+def score_matrix(values: np.ndarray) -> dict:
+    """Score every cell of a ``series x month`` matrix.
+
+    ``values`` holds registrations with ``NaN`` before a series starts.
+    Returns ``{name: (score, expected)}`` arrays shaped like ``values`` for
+    ``"level"``, ``"seasonal"`` and ``"break"``; cells without enough
+    history score ``NaN``.
+    """
+
+    values = np.asarray(values, dtype="float64")
+    mean, std, count = _window_stats(values, WINDOW, lag=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        level = (values - mean) / _scale(mean, std)
+    level[count < MIN_HISTORY] = np.nan
+
+    # Seasonal offset: how far the same month sat above or below its own
+    # trailing level in earlier years, the median over years so that a
+    # one-off spike or a level shift last year is not expected again.
+    deviation = values - mean
+    deviation[count < MIN_HISTORY] = np.nan
+    earlier = np.full((SEASONAL_YEARS,) + values.shape, np.nan)
+    for year in range(1, SEASONAL_YEARS + 1):
+        earlier[year - 1, :, SEASON * year:] = deviation[:, :-SEASON * year]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        offset = np.nanmedian(earlier, axis=0)
+    seasonal_expected = mean + offset
+    residual = values - seasonal_expected
+    _, residual_std, residual_count = _window_stats(residual, WINDOW, lag=1)
+    # Until the residuals have history, the spread of the level stands in.
+    residual_std = np.where(residual_count >= MIN_HISTORY, residual_std, std)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        seasonal = residual / _scale(seasonal_expected, residual_std)
+
+    recent, recent_std, recent_count = _window_stats(values, BREAK_MONTHS, lag=0)
+    before, before_std, before_count = _window_stats(values, WINDOW, lag=BREAK_MONTHS)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # The wider of the two spreads, so a quiet stretch alone is no break.
+        spread = np.fmax(_scale(before, before_std), _scale(recent, recent_std))
+        error = spread * np.sqrt(1 / before_count + 1 / recent_count)
+        shift = (recent - before) / error
+    low, high = _window_extremes(values, BREAK_MONTHS)
+    sustained = ((shift > 0) & (low > before)) | ((shift < 0) & (high < before))
+    sustained &= (recent_count == BREAK_MONTHS) & (before_count >= MIN_HISTORY)
+    shift[~sustained] = np.nan
+
+    return {
+        "level": (level, mean),
+        "seasonal": (seasonal, seasonal_expected),
+        "break": (shift, before),
+    }
+
+
+def scan(
+    monthly: pd.DataFrame,
+    series: Sequence[str] = ("vehicle_category", "maker"),
+    time: str = "period",
+    threshold: float = THRESHOLD,
+) -> pd.DataFrame:
+    """Return the anomalies of every series in ``monthly``.
+
+    ``monthly`` has one row per series and month, like the monthly frame of
+    :func:`src.transform.compute_yoy_qoq`; ``time`` is a month-start
+    timestamp or an integer ``month_key``. Months a series skips after its
+    first row count as zero registrations up to the latest month overall,
+    so a series that stops reporting shows up as a collapse.
+
+    Returns the ``time`` and ``series`` columns plus ``kind`` (one of
+    :data:`KINDS`), a signed ``score`` in standard deviations,
+    ``registrations`` and the ``expected`` value of the baseline that fired,
+    newest month first and strongest first within a month.
+    """
+
+    empty = pd.DataFrame({
+        time: monthly[time].iloc[:0],
+        **{column: monthly[column].iloc[:0] for column in series},
+        "kind": pd.Series(dtype="object"),
+        "score": pd.Series(dtype="float64"),
+        "registrations": pd.Series(dtype="int64"),
+        "expected": pd.Series(dtype="float64"),
+    })
+    if monthly.empty:
+        return empty
+
+    keys = monthly[time]
+    timestamps = pd.api.types.is_datetime64_any_dtype(keys)
+    ordinals = period_ordinals(keys) if timestamps else keys.to_numpy("int64")
+    codes = monthly.groupby(list(series), observed=True, sort=False).ngroup().to_numpy()
+    _, first_rows = np.unique(codes, return_index=True)
+    labels = monthly[list(series)].iloc[first_rows]
+
+    values, start = _dense(codes, ordinals, monthly["registrations"].to_numpy("float64"))
+    scores = score_matrix(values)
+    point, expected = _point_scores(scores)
+    brk, before = scores["break"]
+
+    holding = np.abs(np.nan_to_num(brk)) >= threshold
+    # A break keeps scoring while the new level holds; report its first month.
+    flagged_break = holding.copy()
+    flagged_break[:, 1:] &= ~holding[:, :-1]
+    flagged_point = (np.abs(np.nan_to_num(point)) >= threshold) & ~flagged_break
+    rows, cols = np.nonzero(flagged_break | flagged_point)
+    if not len(rows):
+        return empty
+
+    is_break = flagged_break[rows, cols]
+    score = np.where(is_break, brk[rows, cols], point[rows, cols])
+    kind = np.where(is_break, "break", np.where(score > 0, "spike", "collapse"))
+    month = start + cols
+    result = labels.iloc[rows].reset_index(drop=True)
+    result.insert(0, time, month_key_to_timestamp(month) if timestamps else month)
+    result["kind"] = kind
+    result["score"] = score.round(2)
+    result["registrations"] = values[rows, cols].astype("int64")
+    result["expected"] = np.where(is_break, before[rows, cols], expected[rows, cols]).round(1)
+    order = np.lexsort((-np.abs(result["score"].to_numpy()), -month))
+    return result.iloc[order].reset_index(drop=True)
+
+
+def refresh_anomalies(conn: sqlite3.Connection, threshold: float = THRESHOLD) -> Optional[int]:
+    """Rescan ``rollup_maker_month`` into ``anomalies`` if the data changed.
+
+    The scan is tagged with the data version it was computed from (the
+    ``anomaly_version`` row of ``meta``), so repeated calls are free until
+    the next ingest. Returns the number of anomalies stored, or ``None``
+    when the stored scan was already current.
+    """
+
+    version = data_version(conn)
+    scanned = conn.execute("SELECT value FROM meta WHERE key = 'anomaly_version'").fetchone()
+    if scanned and scanned[0] == version:
+        return None
+
+    monthly = pd.read_sql(
+        "SELECT month_key, category_id, maker_id, registrations FROM rollup_maker_month",
+        conn,
+    )
+    found = scan(monthly, series=("category_id", "maker_id"), time="month_key", threshold=threshold)
+    with conn:
+        conn.execute("DELETE FROM anomalies")
+        conn.executemany(
+            "INSERT INTO anomalies (month_key, category_id, maker_id, kind, score, registrations, expected)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            found[["month_key", "category_id", "maker_id", *COLUMNS]].itertuples(index=False, name=None),
+        )
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('anomaly_version', ?)", (version,))
+    return len(found)
+
+
+def _dense(codes: np.ndarray, ordinals: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, int]:
+    """Scatter rows into a ``series x month`` matrix starting at month ``start``.
+
+    Cells before a series' first row are ``NaN``; later cells without a row
+    are zero.
+    """
+
+    start = int(ordinals.min())
+    span = int(ordinals.max()) - start + 1
+    offsets = ordinals - start
+    matrix = np.zeros((int(codes.max()) + 1, span))
+    np.add.at(matrix, (codes, offsets), values)
+    first = np.full(matrix.shape[0], span)
+    np.minimum.at(first, codes, offsets)
+    matrix[np.arange(span)[None, :] < first[:, None]] = np.nan
+    return matrix, start
+
+
+def _window_stats(values: np.ndarray, window: int, lag: int):
+    """Mean, standard deviation and count of observed cells in the ``window``
+    months ending ``lag`` months before each cell."""
+
+    observed = ~np.isnan(values)
+    filled = np.where(observed, values, 0.0)
+    months = values.shape[1]
+    high = np.clip(np.arange(months) + 1 - lag, 0, months)
+    low = np.clip(high - window, 0, months)
+
+    def windowed(a):
+        totals = np.zeros((a.shape[0], months + 1))
+        np.cumsum(a, axis=1, out=totals[:, 1:])
+        return totals[:, high] - totals[:, low]
+
+    count = windowed(observed.astype("float64"))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = windowed(filled) / count
+        variance = np.maximum(windowed(filled * filled) / count - mean * mean, 0.0)
+    return mean, np.sqrt(variance), count
+
+
+def _window_extremes(values: np.ndarray, window: int):
+    """Minimum and maximum of the ``window`` months ending at each cell."""
+
+    padded = np.concatenate([np.full((values.shape[0], window - 1), np.nan), values], axis=1)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=1)
+    # Incomplete windows are excluded by the caller through the cell count.
+    with np.errstate(invalid="ignore"):
+        return np.fmin.reduce(windows, axis=2), np.fmax.reduce(windows, axis=2)
+
+
+def _point_scores(scores: dict):
+    """Seasonal score where a series has one, the level score otherwise."""
+
+    level, mean = scores["level"]
+    seasonal, seasonal_expected = scores["seasonal"]
+    use_seasonal = ~np.isnan(seasonal)
+    return (
+        np.where(use_seasonal, seasonal, level),
+        np.where(use_seasonal, seasonal_expected, mean),
+    )
+
+
+def _scale(mean: np.ndarray, std: np.ndarray) -> np.ndarray:
+    """Standard deviation with a Poisson floor of ``sqrt(mean)`` (at least 1)."""
+
+    with np.errstate(invalid="ignore"):
+        return np.fmax(std, np.sqrt(np.fmax(np.abs(mean), 1.0)))
@@ -0,0 +1,385 @@
+"""Local HTTP/JSON API over the dashboard analytics.
+
+Serves the same growth tables, trend, headline figures and rankings as the
+dashboard, for tools that would otherwise scrape it::
+
+    python src/api.py --port 8502
+    curl 'localhost:8502/growth/makers?start=2025-01&categories=2W&top=10&by=yoy_pct'
+
+Endpoints (all ``GET``):
+
+* ``/health``: status and the data version served.
+* ``/dimensions``: categories, makers, areas and the month range on file.
+* ``/growth/makers`` and ``/growth/categories``: YoY rows, or QoQ rows with
+  ``freq=quarter``.
+* ``/trend``: total registrations per month.
+* ``/insight``: the headline figures and key insight of the dashboard.
+* ``/rankings``: maker rank and share per category for ``month``
+  (``YYYY-MM``, default the latest).
+
+Every endpoint but ``/health`` takes the dashboard filters: ``start`` and
+``end`` (``YYYY-MM``), and ``categories``, ``makers``, ``states`` and
+``rtos``, repeated once per value. Table endpoints also take ``top`` or
+``bottom`` with ``by`` to return only the ``K`` rows with the largest or
+smallest ``by``.
+
+One process holds a single in-memory copy of the full-history growth
+tables (see :class:`src.report.GrowthTables`), shared by all request
+threads and reloaded when a new data version is published. Area
+selections and rankings are read from the rollups. Responses carry an
+``ETag`` built from the published data version and the normalised request,
+so clients revalidate with ``If-None-Match`` and get ``304 Not Modified``
+until the data changes. Encoded responses are cached per version.
+"""
+
+import argparse
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+# Allow running as ``python src/api.py`` from the project root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.query import (
+    Filters,
+    month_key,
+    read_category_growth,
+    read_dimensions,
+    read_maker_growth,
+    read_monthly_totals,
+    read_rankings,
+)
+from src.ranking import top_k
+from src.report import GrowthTables, preset_filters, summarize
+from src.storage import DB_PATH, VersionChanged, pinned, published_version
+
+HOST = "127.0.0.1"
+PORT = 8502
+
+# Seconds between checks for a newly published data version.
+VERSION_CHECK_SECONDS = 1.0
+
+# Encoded responses kept per data version, least recently used evicted.
+RESPONSE_CACHE_ENTRIES = 512
+
+# Query parameters holding a list of names, repeated once per value.
+LIST_PARAMS = ("categories", "makers", "states", "rtos")
+FILTER_PARAMS = ("start", "end", *LIST_PARAMS)
+TABLE_PARAMS = ("top", "bottom", "by")
+
+logger = logging.getLogger("vahan.api")
+
+
+class NotFound(LookupError):
+    """The request path is not an endpoint."""
+
+
+@dataclasses.dataclass
+class _Published:
+    """One data version's shared tables and encoded responses."""
+
+    version: int
+    tables: GrowthTables
+    responses: "OrderedDict[str, bytes]" = dataclasses.field(default_factory=OrderedDict)
+
+
+class AnalyticsService:
+    """Answers API requests from one shared copy of the published data.
+
+    Safe to call from any number of threads. The version is checked at
+    most every ``check_interval`` seconds; while one thread loads a new
+    version the others keep answering from the previous one.
+    """
+
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        check_interval: float = VERSION_CHECK_SECONDS,
+        cache_entries: int = RESPONSE_CACHE_ENTRIES,
+    ):
+        self.db_path = db_path
+        self.check_interval = check_interval
+        self.cache_entries = cache_entries
+        self._published: Optional[_Published] = None
+        self._next_check = 0.0
+        self._load_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+
+    def published(self) -> _Published:
+        """The current version's tables, reloaded if a new one was published."""
+
+        current = self._published
+        if current is not None and time.monotonic() < self._next_check:
+            return current
+        if not self._load_lock.acquire(blocking=current is None):
+            return current
+        try:
+            if self._published is not None and time.monotonic() < self._next_check:
+                return self._published
+            # The version and the tables built for it come from one read
+            # transaction, so they match even while a refresh is publishing
+            with pinned(self.db_path) as conn:
+                version = published_version(conn)
+                if self._published is None or self._published.version != version:
+                    started = time.perf_counter()
+                    self._published = _Published(version, GrowthTables(conn))
+                    logger.info(
+                        "Serving data version %s (loaded in %.2fs).", version, time.perf_counter() - started
+                    )
+            self._next_check = time.monotonic() + self.check_interval
+            return self._published
+        finally:
+            self._load_lock.release()
+
+    def get(
+        self, path: str, params: Dict[str, List[str]], etag: Optional[str] = None
+    ) -> Tuple[str, Optional[bytes]]:
+        """Return ``(etag, body)`` for a request; ``body`` is ``None`` when
+        ``etag`` is already current.
+
+        Raises :class:`NotFound` for an unknown path and ``ValueError`` for
+        bad parameters.
+        """
+
+        if path not in ENDPOINTS:
+            raise NotFound(path)
+        handler, extra = ENDPOINTS[path]
+        unknown = set(params) - set(FILTER_PARAMS if path != "/health" else ()) - set(extra)
+        if unknown:
+            raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+        published = self.published()
+        key = _request_key(path, params)
+        current = f'"{published.version}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"'
+        if etag is not None and {current, "*"} & set(_etags(etag)):
+            return current, None
+        with self._cache_lock:
+            body = published.responses.get(key)
+            if body is not None:
+                published.responses.move_to_end(key)
+        if body is None:
+            try:
+                body = _encode(published.version, handler(self, published, params))
+            except VersionChanged:
+                # A newer version was published since this one was loaded;
+                # answer from that one rather than cache its rows under the
+                # old. Waiting on the load lock lets a reload already under
+                # way finish first.
+                with self._load_lock:
+                    if self._published is published:
+                        self._next_check = 0.0
+                return self.get(path, params, etag)
+            with self._cache_lock:
+                published.responses[key] = body
+                while len(published.responses) > self.cache_entries:
+                    published.responses.popitem(last=False)
+        return current, body
+
+    def pinned(self, published: _Published):
+        """A read-only connection that sees ``published.version`` and nothing
+        newer; raises :class:`VersionChanged` once that is no longer current."""
+
+        return pinned(self.db_path, published.version)
+
+    def frames(self, published: _Published, filters: Filters):
+        """``(monthly, quarterly, cat_month, cat_quarter, trend)`` for ``filters``."""
+
+        if filters.geo_level is None:
+            return published.tables.select(filters)
+        with self.pinned(published) as conn:
+            return (
+                *read_maker_growth(conn, filters),
+                *read_category_growth(conn, filters),
+                read_monthly_totals(conn, filters),
+            )
+
+
+def _health(service: AnalyticsService, published: _Published, params):
+    return {"status": "ok"}
+
+
+def _dimensions(service: AnalyticsService, published: _Published, params):
+    with service.pinned(published) as conn:
+        return dataclasses.asdict(read_dimensions(conn))
+
+
+def _maker_growth(service: AnalyticsService, published: _Published, params):
+    monthly, quarterly, *_ = service.frames(published, _filters(params))
+    return _table(quarterly if _freq(params) == "quarter" else monthly, params)
+
+
+def _category_growth(service: AnalyticsService, published: _Published, params):
+    _, _, cat_month, cat_quarter, _ = service.frames(published, _filters(params))
+    return _table(cat_quarter if _freq(params) == "quarter" else cat_month, params)
+
+
+def _trend(service: AnalyticsService, published: _Published, params):
+    *_, trend = service.frames(published, _filters(params))
+    return _table(trend, params)
+
+
+def _insight(service: AnalyticsService, published: _Published, params):
+    filters = _filters(params)
+    return summarize("api", filters, *service.frames(published, filters)).summary()
+
+
+def _rankings(service: AnalyticsService, published: _Published, params):
+    month = _single(params, "month")
+    with service.pinned(published) as conn:
+        df = read_rankings(conn, _filters(params), None if month is None else month_key(month))
+    return _table(df, params)
+
+
+# Path -> (handler, parameters it takes besides the filters).
+ENDPOINTS = {
+    "/health": (_health, ()),
+    "/dimensions": (_dimensions, ()),
+    "/growth/makers": (_maker_growth, ("freq", *TABLE_PARAMS)),
+    "/growth/categories": (_category_growth, ("freq", *TABLE_PARAMS)),
+    "/trend": (_trend, TABLE_PARAMS),
+    "/insight": (_insight, ()),
+    "/rankings": (_rankings, ("month", *TABLE_PARAMS)),
+}
+
+
+def _filters(params: Dict[str, List[str]]) -> Filters:
+    preset = {"start": _single(params, "start"), "end": _single(params, "end")}
+    for name in LIST_PARAMS:
+        if name in params:
+            preset[name] = params[name]
+    return preset_filters(preset)
+
+
+def _single(params: Dict[str, List[str]], name: str) -> Optional[str]:
+    values = params.get(name)
+    if not values:
+        return None
+    if len(values) > 1:
+        raise ValueError(f"{name} given more than once")
+    return values[0]
+
+
+def _freq(params: Dict[str, List[str]]) -> str:
+    freq = _single(params, "freq") or "month"
+    if freq not in ("month", "quarter"):
+        raise ValueError(f"freq must be month or quarter, not {freq!r}")
+    return freq
+
+
+def _table(df: pd.DataFrame, params: Dict[str, List[str]]) -> pd.DataFrame:
+    """Apply the ``top`` / ``bottom`` / ``by`` parameters to ``df``."""
+
+    top, bottom, by = _single(params, "top"), _single(params, "bottom"), _single(params, "by")
+    if top is None and bottom is None:
+        return df
+    if top is not None and bottom is not None:
+        raise ValueError("Give top or bottom, not both")
+    if by not in df.columns or not pd.api.types.is_numeric_dtype(df[by]):
+        raise ValueError(f"by must name a numeric column: {', '.join(df.select_dtypes('number').columns)}")
+    k = int(top if top is not None else bottom)
+    return top_k(df, k, by=by, largest=top is not None)
+
+
+def _encode(version: int, result) -> bytes:
+    if isinstance(result, pd.DataFrame):
+        # pandas writes the rows; timestamps become ISO strings as in the reports.
+        rows = result.to_json(orient="records", date_format="iso")
+        return f'{{"version": {version}, "rows": {rows}}}'.encode()
+    return json.dumps({"version": version, **result}, default=str).encode()
+
+
+def _request_key(path: str, params: Dict[str, List[str]]) -> str:
+    """Normalise a request so equal selections share a cache entry and ETag."""
+
+    normal = {name: sorted(values) if name in LIST_PARAMS else values for name, values in params.items()}
+    return path + "?" + json.dumps(normal, sort_keys=True)
+
+
+def _etags(header: str) -> List[str]:
+    return [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "VahanAPI/1.0"
+    # Keep connections open between requests from the same client.
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query, keep_blank_values=False)
+        try:
+            etag, body = self.server.service.get(
+                url.path.rstrip("/") or "/", params, self.headers.get("If-None-Match")
+            )
+        except NotFound:
+            return self._send(404, _error(f"No endpoint {url.path}; try one of {', '.join(ENDPOINTS)}"))
+        except ValueError as exc:
+            return self._send(400, _error(str(exc)))
+        except Exception:
+            logger.exception("Request %s failed.", self.path)
+            return self._send(500, _error("Internal error"))
+        self._send(304 if body is None else 200, body, etag)
+
+    def _send(self, status: int, body: Optional[bytes], etag: Optional[str] = None):
+        self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", etag)
+            # Cacheable, but to be revalidated against the data version.
+            self.send_header("Cache-Control", "no-cache")
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body or b"")))
+        self.end_headers()
+        if body is not None:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+
+def _error(message: str) -> bytes:
+    return json.dumps({"error": message}).encode()
+
+
+def make_server(
+    host: str = HOST, port: int = PORT, service: Optional[AnalyticsService] = None
+) -> ThreadingHTTPServer:
+    """Build a threaded server for ``service``; ``port=0`` picks a free one."""
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service or AnalyticsService()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Vahan analytics as a JSON API.")
+    parser.add_argument("--db", default=DB_PATH, help="path of the SQLite database")
+    parser.add_argument("--host", default=HOST, help="address to listen on")
+    parser.add_argument("--port", type=int, default=PORT, help="port to listen on")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    server = make_server(args.host, args.port, AnalyticsService(args.db))
+    # Load the tables before taking requests.
+    server.service.published()
+    logger.info("Listening on http://%s:%s/", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import dataclasses
+import hashlib
+import json
+import pickle
+import sqlite3
+import time
+from typing import Any, Callable
+
+CACHE_PATH = "data/cache.db"
+
+# Upper bound on the pickled size of all entries; least recently used
+# entries are evicted beyond it.
+MAX_BYTES = 512 * 1024 * 1024
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL,
+    value BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_entries_last_access ON entries (last_access);
+"""
+
+_MISSING = object()
+
+
+class ResultCache:
+    """Disk-backed cache of query and transform results.
+
+    Entries live in a small SQLite file, so every process and replica that
+    points at the same path shares them and they survive restarts. Each
+    entry is keyed on a result name, the data version it was computed from
+    and the normalised parameters (usually a :class:`src.query.Filters`).
+    Entries for any other data version are treated as misses, and older
+    versions are purged on the next write, which is how an ingest
+    invalidates the cache; a writer still working from an older version
+    than the cache has seen is ignored. Total size is capped at
+    ``max_bytes`` by least-recently-used eviction.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA_SQL)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def get(self, name: str, version: int, params: Any = None, default: Any = None) -> Any:
+        key = _key(name, params)
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute(
+                    "SELECT value FROM entries WHERE key = ? AND version = ?", (key, version)
+                ).fetchone()
+                if row is None:
+                    return default
+                conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        finally:
+            conn.close()
+        return pickle.loads(row[0])
+
+    def put(self, name: str, version: int, params: Any, value: Any):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                newest = conn.execute("SELECT MAX(version) FROM entries").fetchone()[0]
+                if newest is not None and newest > version:
+                    return
+                conn.execute("DELETE FROM entries WHERE version < ?", (version,))
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO entries (key, name, version, size, last_access, value)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (_key(name, params), name, version, len(blob), time.time(), blob),
+                )
+                self._evict(conn)
+        finally:
+            conn.close()
+
+    def get_or_compute(self, name: str, version: int, params: Any, compute: Callable[[], Any]) -> Any:
+        """Return the cached result, computing and storing it on a miss."""
+
+        value = self.get(name, version, params, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(name, version, params, value)
+        return value
+
+    def purge(self, version: int) -> int:
+        """Drop every entry computed from a version older than ``version``."""
+
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute("DELETE FROM entries WHERE version < ?", (version,)).rowcount
+        finally:
+            conn.close()
+
+    def size(self) -> int:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+
+def _key(name: str, params: Any) -> str:
+    """Hash ``name`` and ``params`` into a stable cache key."""
+
+    if dataclasses.is_dataclass(params):
+        params = dataclasses.asdict(params)
+    payload = json.dumps([name, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
@@ -1,61 +1,198 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
 import sys
 import os
 import altair as alt
+from contextlib import contextmanager
 
 # --- Fix imports ---
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
-from src.data_processing import get_key_insight
-from src.transform import compute_yoy_qoq, compute_category_growth
+from src.cache import ResultCache
+from src.dashboard.charts import downsample, payload_bytes, top_n
+from src.export import FORMATS as EXPORT_FORMATS, build_export
 from src.ingest import init_db
+from src.instrument import span, start_recording
+from src.query import (
+    Filters,
+    month_key,
+    read_anomalies,
+    read_category_growth,
+    read_dimensions,
+    read_geo_totals,
+    read_maker_growth,
+    read_monthly_totals,
+    read_rankings,
+    read_windowed_metrics,
+)
+from src.ranking import top_k
+from src.refresh import DROP_ENV, RefreshWorker
+from src.report import GrowthTables, summarize
+from src.snapshot import load_facts
+from src.storage import (
+    VersionChanged,
+    connect,
+    month_key_to_timestamp,
+    pinned,
+    published_version,
+)
 
 st.set_page_config(page_title="Vehicle Registrations — Investor Dashboard", layout="wide")
 
+# Stage timings of this rerun, for the debug panel (and VAHAN_METRICS if set)
+SPANS = start_recording()
+
 DB_PATH = "data/vahan.db"
 
-@st.cache_data
-def load_db(db_path=DB_PATH):
-    # Ensure database and table exist before querying
+# Most anomalies listed at once, newest and strongest first
+ANOMALY_ROWS = 200
+
+# Results shared by every session, process and replica using this data
+# directory; entries are keyed on the data version so an ingest invalidates them.
+RESULT_CACHE = ResultCache()
+
+@st.cache_resource
+def ensure_db(db_path=DB_PATH):
+    # Ensure database and table exist before querying, once per process
     init_db()
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql(
-        "SELECT date, vehicle_category, maker, registrations FROM registrations",
-        conn,
-    )
+
+@st.cache_resource
+def start_refresh(drop_dir, db_path=DB_PATH):
+    # One background worker per process ingests new exports off the request
+    # path; reruns never wait on it
+    worker = RefreshWorker(drop_dir, db_path)
+    worker.start()
+    return worker
+
+def load_version(db_path=DB_PATH):
+    # Cheap per-rerun check so a newly published version shows up without a
+    # restart; until then every cache keeps serving the previous one
+    conn = connect(db_path)
+    version = published_version(conn)
     conn.close()
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df.dropna(subset=["date"])
-    df["registrations"] = (
-        pd.to_numeric(df["registrations"], errors="coerce").fillna(0).astype(int)
-    )
-    df["vehicle_category"] = df["vehicle_category"].astype(str)
-    df["maker"] = df["maker"].astype(str)
-    df["period"] = df["date"].dt.to_period("M").dt.to_timestamp()
-    return df
+    return version
+
+@contextmanager
+def read_pinned(version, db_path=DB_PATH):
+    # All reads behind one result see the published version it is cached
+    # under; if a newer one was published since this rerun started, rerun on
+    # it rather than read (and cache) the new data under the old version
+    try:
+        with pinned(db_path, version) as conn:
+            yield conn
+    except VersionChanged:
+        st.rerun()
+
+@st.cache_data
+def load_dimensions(version, db_path=DB_PATH):
+    with read_pinned(version, db_path) as conn:
+        dims = read_dimensions(conn)
+    return dims
+
+def load_db(filters: Filters, version, db_path=DB_PATH):
+    # Only the rows matching the sidebar selection are read, from the pruned
+    # partitions of the published Parquet snapshot (SQLite for area
+    # selections), in the compact layout (integer keys, categorical names,
+    # int32 counts)
+    @span("dashboard.load_facts")
+    def compute():
+        with read_pinned(version, db_path) as conn:
+            df = load_facts(conn, filters, version=version)
+        return df
+    return RESULT_CACHE.get_or_compute("facts", version, filters, compute)
+
+@st.cache_resource(max_entries=1)
+def load_tables(version, db_path=DB_PATH):
+    # Full-history growth tables with their filter index, built once per
+    # published version; sidebar selections are then answered in memory by
+    # posting-list intersection, as in the API
+    with read_pinned(version, db_path) as conn:
+        tables = GrowthTables(conn)
+    return tables
+
+def load_growth(filters: Filters, version, db_path=DB_PATH):
+    # ``(monthly, quarterly, cat_month, cat_quarter, trend)``; the national
+    # tables cannot be narrowed to an area, so area selections read the
+    # geographic rollups instead
+    if filters.geo_level is None:
+        return load_tables(version, db_path).select(filters)
+
+    @span("dashboard.read_growth")
+    def compute():
+        with read_pinned(version, db_path) as conn:
+            monthly, quarterly = read_maker_growth(conn, filters)
+            cat_month, cat_quarter = read_category_growth(conn, filters)
+            ts = read_monthly_totals(conn, filters)
+        return monthly, quarterly, cat_month, cat_quarter, ts
+    return RESULT_CACHE.get_or_compute("growth_geo", version, filters, compute)
+
+def load_windowed(filters: Filters, version, db_path=DB_PATH):
+    # YTD / FYTD / trailing sums and shares, from the full rollup history
+    @span("dashboard.read_windowed")
+    def compute():
+        with read_pinned(version, db_path) as conn:
+            makers, categories = read_windowed_metrics(conn, filters)
+        return makers, categories
+    return RESULT_CACHE.get_or_compute("windowed", version, filters, compute)
+
+def load_anomalies(filters: Filters, version, db_path=DB_PATH):
+    # Every series is scored at ingest time; only the selection is read here
+    @span("dashboard.read_anomalies")
+    def compute():
+        with read_pinned(version, db_path) as conn:
+            df = read_anomalies(conn, filters, limit=ANOMALY_ROWS)
+        return df
+    return RESULT_CACHE.get_or_compute("anomalies", version, filters, compute)
 
-# Load data
-df = load_db()
+def load_geo(filters: Filters, level, version, db_path=DB_PATH):
+    # Per-state or per-RTO totals straight from that level's rollup
+    @span("dashboard.read_geo", level=level)
+    def compute():
+        with read_pinned(version, db_path) as conn:
+            df = read_geo_totals(conn, filters, level)
+        return df
+    return RESULT_CACHE.get_or_compute(f"geo_{level}", version, filters, compute)
+
+def load_rankings(filters: Filters, month, version, db_path=DB_PATH):
+    # Ranks and shares are precomputed per month at refresh time; only the
+    # selected month is read
+    @span("dashboard.read_rankings")
+    def compute():
+        with read_pinned(version, db_path) as conn:
+            df = read_rankings(conn, filters, month)
+        return df
+    return RESULT_CACHE.get_or_compute(f"rankings_{month}", version, filters, compute)
+
+def section(title, key, expanded=True):
+    # A section is only built while its toggle is on, so collapsed sections
+    # cost neither the data shaping nor the chart payload
+    st.subheader(title)
+    return st.toggle("Show", value=expanded, key=key)
+
+def show_chart(chart, note=""):
+    # Report what each chart costs to send to the browser
+    st.altair_chart(chart, use_container_width=True)
+    st.caption(f"Chart payload: {payload_bytes(chart) / 1024:.1f} KiB{note}")
+
+# Load filter options
+with span("dashboard.ensure_db"):
+    ensure_db()
+refresh_worker = start_refresh(os.environ[DROP_ENV]) if os.environ.get(DROP_ENV) else None
+with span("dashboard.load_dimensions"):
+    version = load_version()
+    dims = load_dimensions(version)
 
 # Sidebar filters
 with st.sidebar:
     st.header("Filters")
 
-    if df.empty:
+    if not dims.makers or dims.start_month is None:
         st.error("No data found in the database.")
         st.stop()
 
-    if df['period'].isnull().all():
-        st.error("Date data missing or invalid in the database.")
-        st.stop()
-
-    min_date = df['period'].min()
-    max_date = df['period'].max()
-
-    # Convert pandas timestamps to python dates
-    min_date = min_date.date() if pd.notnull(min_date) else None
-    max_date = max_date.date() if pd.notnull(max_date) else None
+    # Convert month keys to python dates
+    min_date, max_date = (
+        ts.date() for ts in month_key_to_timestamp([dims.start_month, dims.end_month])
+    )
 
     date_range = st.date_input(
         "Date range (month granularity)",
@@ -71,29 +208,59 @@ with st.sidebar:
     else:
         start_date, end_date = date_range, max_date
 
-    vehicle_cats = sorted(df['vehicle_category'].unique().tolist())
-    makers_all = sorted(df['maker'].unique().tolist())
+    vehicle_cats = list(dims.categories)
+    makers_all = list(dims.makers)
 
     selected_cats = st.multiselect("Vehicle category", vehicle_cats, default=vehicle_cats)
-    selected_makers = st.multiselect("Manufacturers", makers_all, default=makers_all[:10])
+    # Default to the largest manufacturers by recent volume
+    selected_makers = st.multiselect(
+        "Manufacturers", makers_all, default=list(dims.top_makers) or makers_all[:10]
+    )
+
+    # Areas narrow every query to the state / RTO rollups; empty means national
+    selected_states = selected_rtos = None
+    if dims.states:
+        selected_states = st.multiselect("State", list(dims.states), placeholder="All states") or None
+        rto_options = sorted({
+            rto for state, rto in dims.rtos if selected_states is None or state in selected_states
+        })
+        selected_rtos = st.multiselect("RTO", rto_options, placeholder="All RTOs") or None
+
+    st.header("Display")
+    chart_makers = st.slider("Manufacturers per chart", min_value=5, max_value=50, value=15)
+    show_timings = st.toggle("Stage timings (debug)", value=False)
+    if refresh_worker is not None:
+        st.caption(
+            f"Data version {version}; watching {refresh_worker.drop_dir}"
+            + (f" (last refresh failed: {refresh_worker.last_error})" if refresh_worker.last_error else "")
+        )
 
-mask = (df['period'] >= pd.to_datetime(start_date)) & (df['period'] <= pd.to_datetime(end_date))
-mask &= df['vehicle_category'].isin(selected_cats)
-mask &= df['maker'].isin(selected_makers)
-df_f = df[mask].copy()
+# Push the selection down into SQL; ``None`` means "everything selected"
+filters = Filters.from_selection(
+    start_date,
+    end_date,
+    None if set(selected_cats) == set(vehicle_cats) else selected_cats,
+    None if set(selected_makers) == set(makers_all) else selected_makers,
+    selected_states,
+    selected_rtos,
+)
+with span("dashboard.load_growth"):
+    monthly, quarterly, cat_month, cat_quarter, ts = load_growth(filters, version)
 
-if df_f.empty:
+if cat_month.empty:
     st.warning("No data for the selected filters / date range.")
     st.stop()
 
-monthly, quarterly = compute_yoy_qoq(df_f)
-cat_month, cat_quarter = compute_category_growth(df_f)
+# Same figures and tables as the headless report (src/report.py)
+with span("dashboard.summarize"):
+    report = summarize("dashboard", filters, monthly, quarterly, cat_month, cat_quarter, ts)
 
 # Dashboard header
 st.title("Vehicle Registrations — Investor Dashboard")
 
-latest_period = df_f["period"].max()
-latest_total = int(df_f[df_f["period"] == latest_period]["registrations"].sum())
+latest_period = report.latest_period
+cat_latest = report.tables["category_yoy"]
+latest_total = report.latest_total
 
 c1, c2, c3 = st.columns([2,2,2])
 with c1:
@@ -101,18 +268,15 @@ with c1:
 with c2:
     st.metric("Total registrations (latest month)", f"{latest_total:,}")
 with c3:
-    total_prev_year = df_f[df_f['period'] == (latest_period - pd.DateOffset(years=1))]['registrations'].sum()
-    if total_prev_year > 0:
-        total_yoy = round(100 * (latest_total - total_prev_year) / total_prev_year, 2)
-        st.metric("Total YoY (%)", f"{total_yoy} %")
+    if report.total_yoy is not None:
+        st.metric("Total YoY (%)", f"{report.total_yoy} %")
     else:
         st.metric("Total YoY (%)", "N/A")
 
-cat_latest = cat_month[cat_month["period"] == latest_period]
 st.subheader(f"Category YoY (%) — latest month {latest_period.strftime('%Y-%m')}")
 if not cat_latest.empty:
     st.dataframe(
-        cat_latest[["vehicle_category", "registrations", "prev_year_regs", "yoy_pct"]]
+        cat_latest
         .fillna("N/A")
         .round(2)
     )
@@ -129,16 +293,15 @@ if not cat_latest.empty:
             )
             .properties(height=300)
         )
-        st.altair_chart(bar, use_container_width=True)
+        show_chart(bar)
     else:
         st.info("Not enough data for YoY comparison.")
 
-latest_q = cat_quarter["quarter"].max()
-cat_q_latest = cat_quarter[cat_quarter["quarter"] == latest_q]
+cat_q_latest = report.tables["category_qoq"]
 st.subheader("Category QoQ (%) — latest quarter")
 if not cat_q_latest.empty:
     st.dataframe(
-        cat_q_latest[["vehicle_category", "registrations", "prev_q_regs", "qoq_pct"]]
+        cat_q_latest
         .fillna("N/A")
         .round(2)
     )
@@ -152,104 +315,218 @@ if not cat_q_latest.empty:
         )
         .properties(height=300)
     )
-    st.altair_chart(qbar, use_container_width=True)
+    show_chart(qbar)
 
 st.markdown("---")
 
-# Time series: overall trend
-st.subheader("Overall monthly registrations (trend)")
-ts = df_f.groupby('period', as_index=False)['registrations'].sum().sort_values('period')
-if not ts.empty:
-    ts['period'] = pd.to_datetime(ts['period'])
-    chart = alt.Chart(ts).mark_line(point=True).encode(
-        x=alt.X('period:T', title='Month'),
-        y=alt.Y('registrations:Q', title='Registrations'),
-        tooltip=['period:T', 'registrations:Q']
-    ).properties(height=300, width=600)
-    st.altair_chart(chart, use_container_width=True)
+# Time series: overall trend, summed to quarters or years on long ranges
+if section("Overall monthly registrations (trend)", "show_trend") and not ts.empty:
+    with span("dashboard.trend"):
+        trend, freq = downsample(ts)
+        chart = alt.Chart(trend).mark_line(point=True).encode(
+            x=alt.X('period:T', title=freq.capitalize()),
+            y=alt.Y('registrations:Q', title='Registrations'),
+            tooltip=['period:T', 'registrations:Q']
+        ).properties(height=300, width=600)
+        show_chart(chart, f" ({len(trend)} {freq}s)")
 
 # Category breakdown
-st.subheader("Category-wise monthly trend")
-cat_ts = df_f.groupby(['period', 'vehicle_category'], as_index=False)['registrations'].sum()
-if not cat_ts.empty:
-    cat_ts['period'] = pd.to_datetime(cat_ts['period'])
-    area = alt.Chart(cat_ts).mark_area().encode(
-        x='period:T',
-        y='registrations:Q',
-        color='vehicle_category:N',
-        tooltip=['period:T', 'vehicle_category:N', 'registrations:Q']
-    ).properties(height=320)
-    st.altair_chart(area, use_container_width=True)
+cat_ts = report.tables["category_trend"]
+if section("Category-wise monthly trend", "show_category_trend", expanded=False) and not cat_ts.empty:
+    with span("dashboard.category_trend"):
+        cat_trend, freq = downsample(cat_ts, by=["vehicle_category"])
+        area = alt.Chart(cat_trend).mark_area().encode(
+            x=alt.X('period:T', title=freq.capitalize()),
+            y='registrations:Q',
+            color='vehicle_category:N',
+            tooltip=['period:T', 'vehicle_category:N', 'registrations:Q']
+        ).properties(height=320)
+        show_chart(area, f" ({len(cat_trend)} points by {freq})")
 
 # Top manufacturers — YoY
-st.subheader(f"Top manufacturers — YoY (%) — latest month {latest_period.strftime('%Y-%m')}")
-lm = monthly[monthly['period'] == latest_period].copy().sort_values('yoy_pct', ascending=False)
-if not lm.empty:
-    st.dataframe(
-        lm[
-            [
-                "maker",
-                "vehicle_category",
-                "registrations",
-                "registrations_prev_year",
-                "yoy_pct",
-            ]
-        ]
-        .fillna("N/A")
-        .round(2)
-    )
-    lm_yoy = lm.dropna(subset=["yoy_pct"])
-    if not lm_yoy.empty:
-        mbar = (
-            alt.Chart(lm_yoy)
+lm = report.tables["top_makers_yoy"]
+if section(
+    f"Top manufacturers — YoY (%) — latest month {latest_period.strftime('%Y-%m')}", "show_maker_yoy"
+) and not lm.empty:
+    with span("dashboard.maker_yoy"):
+        # Only the ends of the ranking are shown, picked by partial selection
+        st.caption(f"Fastest and slowest growing {chart_makers} of {len(lm):,} manufacturers")
+        y1, y2 = st.columns(2)
+        y1.dataframe(top_k(lm, chart_makers, by="yoy_pct").round(2), hide_index=True)
+        y2.dataframe(top_k(lm, chart_makers, by="yoy_pct", largest=False).round(2), hide_index=True)
+        # Largest manufacturers by volume; the rest share one "Other" bar
+        lm_yoy, bucketed = top_n(
+            lm.dropna(subset=["yoy_pct"]), chart_makers,
+            labels=("maker", "vehicle_category"), previous="registrations_prev_year", pct="yoy_pct",
+        )
+        if not lm_yoy.empty:
+            mbar = (
+                alt.Chart(lm_yoy)
+                .mark_bar()
+                .encode(
+                    x=alt.X("maker:N", title="Manufacturer", sort="-y"),
+                    y=alt.Y("yoy_pct:Q", title="YoY %"),
+                    color="vehicle_category:N",
+                    tooltip=[
+                        "maker",
+                        "vehicle_category",
+                        alt.Tooltip("yoy_pct:Q", format=".2f"),
+                    ],
+                )
+                .properties(height=300)
+            )
+            show_chart(mbar, f" ({bucketed:,} rows in Other)" if bucketed else "")
+        else:
+            st.info("Not enough data for YoY comparison.")
+
+# Top manufacturers — QoQ
+qq = report.tables["top_makers_qoq"]
+if section("Top manufacturers — QoQ (%) — latest quarter", "show_maker_qoq", expanded=False) and not qq.empty:
+    with span("dashboard.maker_qoq"):
+        st.caption(f"Fastest and slowest growing {chart_makers} of {len(qq):,} manufacturers")
+        q1, q2 = st.columns(2)
+        q1.dataframe(top_k(qq, chart_makers, by="qoq_pct").round(2), hide_index=True)
+        q2.dataframe(top_k(qq, chart_makers, by="qoq_pct", largest=False).round(2), hide_index=True)
+        qq_top, bucketed = top_n(
+            qq.dropna(subset=["qoq_pct"]), chart_makers,
+            labels=("maker", "vehicle_category"), previous="prev_q_regs", pct="qoq_pct",
+        )
+        if not qq_top.empty:
+            mqbar = (
+                alt.Chart(qq_top)
+                .mark_bar()
+                .encode(
+                    x=alt.X("maker:N", title="Manufacturer", sort="-y"),
+                    y=alt.Y("qoq_pct:Q", title="QoQ %"),
+                    color="vehicle_category:N",
+                    tooltip=[
+                        "maker",
+                        "vehicle_category",
+                        alt.Tooltip("qoq_pct:Q", format=".2f"),
+                    ],
+                )
+                .properties(height=300)
+            )
+            show_chart(mqbar, f" ({bucketed:,} rows in Other)" if bucketed else "")
+        else:
+            st.info("Not enough data for QoQ comparison.")
+
+# Market share within each category and how ranks moved since last month
+if section(
+    f"Market share and rank movement — {latest_period.strftime('%Y-%m')}", "show_rankings", expanded=False
+):
+    with span("dashboard.rankings"):
+        rankings = load_rankings(filters, month_key(latest_period), version)
+        shown = rankings.drop(columns="period").round(2)
+        st.caption(
+            f"Leaders of each category (top {chart_makers} by share); shares are of the whole category, "
+            "changes in basis points against the previous month and the same month last year"
+        )
+        st.dataframe(shown[shown["rank"] <= chart_makers], hide_index=True)
+        r1, r2 = st.columns(2)
+        with r1:
+            st.caption("Largest share gains")
+            st.dataframe(top_k(shown, chart_makers, by="share_change_bps"), hide_index=True)
+        with r2:
+            st.caption("Largest share losses")
+            st.dataframe(top_k(shown, chart_makers, by="share_change_bps", largest=False), hide_index=True)
+
+# Cumulative and trailing windows for the latest month
+if section(
+    f"YTD, FYTD and trailing metrics — {latest_period.strftime('%Y-%m')}", "show_windowed", expanded=False
+):
+    with span("dashboard.windowed"):
+        win_makers, win_categories = load_windowed(filters, version)
+        win_cat = win_categories[win_categories["period"] == latest_period].drop(columns="period")
+        st.dataframe(win_cat.round(2), hide_index=True)
+        win_top = win_makers[win_makers["period"] == latest_period].nlargest(chart_makers, "trailing_12m")
+        st.caption(
+            "Financial year runs April–March; shares are of the category for manufacturers "
+            f"and of the selection for categories. Top {len(win_top)} manufacturers by trailing 12 months:"
+        )
+        st.dataframe(win_top.drop(columns="period").round(2), hide_index=True)
+
+# Spikes, collapses and trend breaks across all maker x category series
+if section("Series that broke trend", "show_anomalies"):
+    with span("dashboard.anomalies"):
+        anomalies = load_anomalies(filters, version)
+        if anomalies.empty:
+            st.info("No spikes, collapses or trend breaks in the selected range.")
+        else:
+            newest = anomalies[anomalies["period"] == anomalies["period"].max()]
+            counts = newest["kind"].value_counts()
+            st.caption(
+                f"{newest['period'].iloc[0].strftime('%Y-%m')}: "
+                + ", ".join(f"{counts.get(kind, 0)} {kind}s" for kind in ("spike", "collapse", "break"))
+                + " (scores in standard deviations from each series' own baseline)"
+            )
+            st.dataframe(anomalies.assign(period=anomalies["period"].dt.strftime("%Y-%m")))
+
+# Drill-down: states, or the RTOs of the selected states
+if dims.states and section(
+    f"Registrations by area — {latest_period.strftime('%Y-%m')}", "show_geo", expanded=False
+):
+    with span("dashboard.geo"):
+        geo_level = "state" if filters.states is None else "rto"
+        areas = ["state"] if geo_level == "state" else ["state", "rto"]
+        geo = load_geo(filters, geo_level, version)
+        geo_latest = geo[geo["period"] == latest_period].drop(columns="period")
+        geo_latest = geo_latest.sort_values("registrations", ascending=False, ignore_index=True)
+        st.dataframe(geo_latest.round(2), hide_index=True)
+        geo_top, bucketed = top_n(
+            geo_latest, chart_makers, labels=areas, previous="prev_year_regs", pct="yoy_pct"
+        )
+        gbar = (
+            alt.Chart(geo_top)
             .mark_bar()
             .encode(
-                x=alt.X("maker:N", title="Manufacturer"),
-                y=alt.Y("yoy_pct:Q", title="YoY %"),
-                color="vehicle_category:N",
-                tooltip=[
-                    "maker",
-                    "vehicle_category",
-                    alt.Tooltip("yoy_pct:Q", format=".2f"),
-                ],
+                x=alt.X(f"{geo_level}:N", title="State" if geo_level == "state" else "RTO", sort="-y"),
+                y=alt.Y("registrations:Q", title="Registrations"),
+                tooltip=[*areas, "registrations", alt.Tooltip("yoy_pct:Q", format=".2f")],
             )
             .properties(height=300)
         )
-        st.altair_chart(mbar, use_container_width=True)
-    else:
-        st.info("Not enough data for YoY comparison.")
+        show_chart(gbar, f" ({bucketed:,} areas in Other)" if bucketed else "")
 
-# Top manufacturers — QoQ
-st.subheader("Top manufacturers — QoQ (%) — latest quarter")
-qq = quarterly[quarterly['quarter'] == latest_q].sort_values('qoq_pct', ascending=False)
-if not qq.empty:
-    st.dataframe(
-        qq[["maker", "vehicle_category", "registrations", "prev_q_regs", "qoq_pct"]]
-        .fillna("N/A")
-        .round(2)
+# Download: Streamlit serves downloads from bytes, so the file is only built
+# (chunk by chunk into a temporary file that spills to disk) and read on the
+# rerun that asks for it; the download itself does not rerun, and the next
+# rerun drops it
+st.markdown("---")
+e1, e2 = st.columns([1, 2])
+with e1:
+    export_format = st.selectbox(
+        "Export format", list(EXPORT_FORMATS), format_func=lambda key: EXPORT_FORMATS[key].label
     )
-    mqbar = (
-        alt.Chart(qq)
-        .mark_bar()
-        .encode(
-            x=alt.X("maker:N", title="Manufacturer"),
-            y=alt.Y("qoq_pct:Q", title="QoQ %"),
-            color="vehicle_category:N",
-            tooltip=[
-                "maker",
-                "vehicle_category",
-                alt.Tooltip("qoq_pct:Q", format=".2f"),
-            ],
+with e2:
+    if st.button("Prepare filtered data for download"):
+        with span("dashboard.export", format=export_format):
+            with build_export(load_db(filters, version), export_format) as export_file:
+                export_data = export_file.read()
+        st.download_button(
+            f"Download filtered data ({EXPORT_FORMATS[export_format].label})",
+            export_data,
+            file_name=f"vahan_filtered.{EXPORT_FORMATS[export_format].extension}",
+            mime=EXPORT_FORMATS[export_format].mime,
+            on_click="ignore",
         )
-        .properties(height=300)
-    )
-    st.altair_chart(mqbar, use_container_width=True)
-
-# Download button
-st.markdown("---")
-st.download_button("Download filtered data (CSV)", df_f.to_csv(index=False), file_name="vahan_filtered.csv")
 
 # Key Investment Insight section
 st.markdown("### 📊 Key Investment Insight")
-insight = get_key_insight(df_f)
-st.success(insight)
+st.success(report.insight)
+
+# Cost breakdown of this rerun; cache hits show up as near-zero stages
+if show_timings:
+    with st.sidebar:
+        st.header("Stage timings")
+        # Spans are recorded as they finish; list them as they started
+        spans = sorted(SPANS, key=lambda record: record.started)
+        timings = pd.DataFrame({
+            "stage": ["  " * record.depth + record.name for record in spans],
+            "ms": [round(record.seconds * 1000, 1) for record in spans],
+            "RSS Δ (MiB)": [record.rss_delta_mb for record in spans],
+            "RSS (MiB)": [record.rss_mb for record in spans],
+        })
+        st.dataframe(timings, hide_index=True)
+        top = [record for record in SPANS if record.depth == 0]
+        st.caption(f"{sum(record.seconds for record in top) * 1000:.0f} ms in {len(top)} top-level stages")
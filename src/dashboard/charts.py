@@ -0,0 +1,95 @@
+"""Server-side shaping of chart data before it is sent to the browser.
+
+Altair embeds a chart's rows as JSON in the page, so the size of a chart is
+the size of its data. These helpers cap that: bar charts keep the top rows
+and fold the rest into a single "Other" bar, time series switch to quarters
+or years when the range has too many months, and :func:`payload_bytes`
+measures what a chart costs to send.
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import pandas as pd
+
+from src.transform import growth_pct
+
+# Upper bound on the points of a time series chart, per series.
+MAX_POINTS = 120
+
+# Coarser frequencies tried in turn when a series has too many months.
+FREQUENCIES = [("Q", "quarter"), ("Y", "year")]
+
+OTHER = "Other"
+
+
+def top_n(
+    df: pd.DataFrame,
+    n: int,
+    rank_by: str = "registrations",
+    labels: Sequence[str] = ("maker",),
+    current: str = "registrations",
+    previous: Optional[str] = None,
+    pct: Optional[str] = None,
+) -> Tuple[pd.DataFrame, int]:
+    """Keep the ``n`` largest rows by ``rank_by`` and bucket the rest.
+
+    The remaining rows are summed into one row labelled :data:`OTHER` in
+    every ``labels`` column; when ``previous`` and ``pct`` are given the
+    bucket's percentage is recomputed from its summed current and previous
+    values, so it is the growth of the bucket rather than a sum of
+    percentages. Returns the capped frame and the number of rows bucketed.
+    """
+
+    if len(df) <= n:
+        return df, 0
+    keep = df.nlargest(n, rank_by)
+    rest = df.drop(keep.index)
+    other = {column: OTHER for column in labels}
+    other[current] = rest[current].sum()
+    if previous is not None:
+        other[previous] = rest[previous].sum(min_count=1)
+        if pct is not None:
+            other[pct] = growth_pct(
+                pd.Series([other[current]], dtype="float64"), pd.Series([other[previous]], dtype="float64")
+            ).iloc[0]
+    bucket = pd.DataFrame([other])
+    columns = [c for c in df.columns if c in bucket.columns]
+    capped = pd.concat([keep, bucket[columns]], ignore_index=True)
+    for column in labels:
+        # Categorical labels need the bucket name among their categories.
+        capped[column] = capped[column].astype(str)
+    return capped, len(rest)
+
+
+def downsample(
+    df: pd.DataFrame,
+    time_col: str = "period",
+    value_cols: Sequence[str] = ("registrations",),
+    by: Sequence[str] = (),
+    max_points: int = MAX_POINTS,
+) -> Tuple[pd.DataFrame, str]:
+    """Sum ``value_cols`` into the finest of month / quarter / year that
+    keeps every series within ``max_points`` points.
+
+    Returns the frame and the name of the frequency used. Periods are
+    labelled with their start, so the result plots on the same time axis.
+    """
+
+    if df[time_col].nunique() <= max_points:
+        return df, "month"
+    for freq, name in FREQUENCIES:
+        start = df[time_col].dt.to_period(freq).dt.to_timestamp()
+        if start.nunique() <= max_points or freq == FREQUENCIES[-1][0]:
+            break
+    frame = (
+        df.assign(**{time_col: start})
+        .groupby([time_col, *by], as_index=False, observed=True)[list(value_cols)]
+        .sum()
+    )
+    return frame, name
+
+
+def payload_bytes(chart) -> int:
+    """Return the size of the chart specification, data included, in bytes."""
+
+    return len(chart.to_json(indent=None).encode())
@@ -0,0 +1,29 @@
+-- src/db/sample.sql
+--
+-- Small seed dataset for local experiments. Apply after the schema, e.g.
+--   sqlite3 data/vahan.db < src/db/schema.sql
+--   sqlite3 data/vahan.db < src/db/sample.sql
+
+BEGIN TRANSACTION;
+
+INSERT INTO registrations (date, vehicle_category, maker, registrations) VALUES
+('2024-01-01','2W','Honda',1200),
+('2024-01-01','2W','Yamaha',800),
+('2024-01-01','4W','Maruti',1500),
+('2024-02-01','2W','Honda',1350),
+('2024-02-01','2W','Yamaha',900),
+('2024-02-01','4W','Maruti',1600),
+('2024-03-01','2W','Honda',1400),
+('2024-03-01','2W','Yamaha',950),
+('2024-03-01','4W','Maruti',1700),
+('2025-01-01','2W','Honda',1600),
+('2025-01-01','2W','Yamaha',1100),
+('2025-01-01','4W','Maruti',1800),
+('2025-02-01','2W','Honda',1650),
+('2025-02-01','2W','Yamaha',1150),
+('2025-02-01','4W','Maruti',1900),
+('2025-03-01','2W','Honda',1700),
+('2025-03-01','2W','Yamaha',1200),
+('2025-03-01','4W','Maruti',2000);
+
+COMMIT;
@@ -1,38 +1,330 @@
 -- src/db/schema.sql
+--
+-- Storage layout for the registrations data. Applied by
+-- ``src.storage.ensure_schema`` on every connection, so every statement
+-- must be idempotent.
 
-PRAGMA foreign_keys = OFF;
-BEGIN TRANSACTION;
-
-CREATE TABLE IF NOT EXISTS registrations (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    date TEXT NOT NULL,               -- YYYY-MM-DD (month start)
-    vehicle_category TEXT NOT NULL,   -- '2W','3W','4W', etc.
-    maker TEXT NOT NULL,
-    registrations INTEGER NOT NULL,
-    year INTEGER,
-    month INTEGER
-);
-
-DELETE FROM registrations;
-
-INSERT INTO registrations (date, vehicle_category, maker, registrations, year, month) VALUES
-('2024-01-01','2W','Honda',1200,2024,1),
-('2024-01-01','2W','Yamaha',800,2024,1),
-('2024-01-01','4W','Maruti',1500,2024,1),
-('2024-02-01','2W','Honda',1350,2024,2),
-('2024-02-01','2W','Yamaha',900,2024,2),
-('2024-02-01','4W','Maruti',1600,2024,2),
-('2024-03-01','2W','Honda',1400,2024,3),
-('2024-03-01','2W','Yamaha',950,2024,3),
-('2024-03-01','4W','Maruti',1700,2024,3),
-('2025-01-01','2W','Honda',1600,2025,1),
-('2025-01-01','2W','Yamaha',1100,2025,1),
-('2025-01-01','4W','Maruti',1800,2025,1),
-('2025-02-01','2W','Honda',1650,2025,2),
-('2025-02-01','2W','Yamaha',1150,2025,2),
-('2025-02-01','4W','Maruti',1900,2025,2),
-('2025-03-01','2W','Honda',1700,2025,3),
-('2025-03-01','2W','Yamaha',1200,2025,3),
-('2025-03-01','4W','Maruti',2000,2025,3);
-
-COMMIT;
+-- Dimension tables: each distinct category / maker name is stored once and
+-- referenced by its integer id from the fact table.
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE          -- '2W','3W','4W', etc.
+);
+
+CREATE TABLE IF NOT EXISTS makers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+-- Geography: every RTO (regional transport office) belongs to one state.
+-- RTO names are only unique within their state.
+CREATE TABLE IF NOT EXISTS states (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS rtos (
+    id INTEGER PRIMARY KEY,
+    state_id INTEGER NOT NULL REFERENCES states (id),
+    name TEXT NOT NULL,
+    UNIQUE (state_id, name)
+);
+
+-- One row per (date, vehicle_category, maker) natural key.
+CREATE TABLE IF NOT EXISTS registration_facts (
+    day INTEGER NOT NULL,              -- YYYYMMDD
+    month_key INTEGER NOT NULL,        -- year * 12 + month - 1
+    category_id INTEGER NOT NULL REFERENCES categories (id),
+    maker_id INTEGER NOT NULL REFERENCES makers (id),
+    registrations INTEGER NOT NULL,
+    PRIMARY KEY (day, category_id, maker_id)
+) WITHOUT ROWID;
+
+-- Covering indexes for the dashboard filters: a period range optionally
+-- narrowed by category, and per-maker lookups.
+CREATE INDEX IF NOT EXISTS ix_facts_month_category
+    ON registration_facts (month_key, category_id, maker_id, registrations);
+
+CREATE INDEX IF NOT EXISTS ix_facts_maker_month
+    ON registration_facts (maker_id, month_key, category_id, registrations);
+
+-- High-water mark of every ingested source file.
+CREATE TABLE IF NOT EXISTS ingest_state (
+    source TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Outcome of the latest ingest attempt for every source file: ``ok``,
+-- ``skipped`` (unchanged since the last ingest) or ``failed`` with the error.
+CREATE TABLE IF NOT EXISTS ingest_manifest (
+    source TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    rows INTEGER NOT NULL DEFAULT 0,
+    changed INTEGER NOT NULL DEFAULT 0,
+    seconds REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    finished_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Single-row settings; ``data_version`` is bumped whenever the facts change
+-- (see ``src.storage.refresh_rollups``) so derived artefacts can tell if
+-- they are stale. ``published_version`` is the version readers serve; it
+-- only moves once the anomaly scan has caught up (``src.ingest.publish``).
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0);
+
+-- Spikes, collapses and trend breaks of every maker x category series, as
+-- found by ``src.anomaly.refresh_anomalies``; rebuilt whenever
+-- ``data_version`` moves past the ``anomaly_version`` row of ``meta``.
+CREATE TABLE IF NOT EXISTS anomalies (
+    month_key INTEGER NOT NULL,
+    category_id INTEGER NOT NULL REFERENCES categories (id),
+    maker_id INTEGER NOT NULL REFERENCES makers (id),
+    kind TEXT NOT NULL,
+    score REAL NOT NULL,
+    registrations INTEGER NOT NULL,
+    expected REAL NOT NULL,
+    PRIMARY KEY (month_key, category_id, maker_id)
+) WITHOUT ROWID;
+
+-- Row-oriented view with the original ``registrations`` columns, for readers
+-- and ad-hoc writers that predate the integer-coded layout.
+CREATE VIEW IF NOT EXISTS registrations AS
+SELECT
+    printf('%04d-%02d-%02d', f.day / 10000, f.day / 100 % 100, f.day % 100) AS date,
+    c.name AS vehicle_category,
+    m.name AS maker,
+    f.registrations AS registrations,
+    f.month_key AS month_key
+FROM registration_facts AS f
+JOIN categories AS c ON c.id = f.category_id
+JOIN makers AS m ON m.id = f.maker_id;
+
+CREATE TRIGGER IF NOT EXISTS registrations_insert
+INSTEAD OF INSERT ON registrations
+BEGIN
+    INSERT OR IGNORE INTO categories (name) VALUES (NEW.vehicle_category);
+    INSERT OR IGNORE INTO makers (name) VALUES (NEW.maker);
+    INSERT INTO registration_facts (day, month_key, category_id, maker_id, registrations)
+    VALUES (
+        CAST(replace(substr(NEW.date, 1, 10), '-', '') AS INTEGER),
+        CAST(substr(NEW.date, 1, 4) AS INTEGER) * 12 + CAST(substr(NEW.date, 6, 2) AS INTEGER) - 1,
+        (SELECT id FROM categories WHERE name = NEW.vehicle_category),
+        (SELECT id FROM makers WHERE name = NEW.maker),
+        NEW.registrations
+    )
+    ON CONFLICT (day, category_id, maker_id) DO UPDATE
+    SET registrations = excluded.registrations;
+END;
+
+-- Per-RTO facts from exports that carry a state / RTO breakdown, keyed so
+-- a month's rows for one RTO are contiguous. National facts are the sum
+-- over RTOs: the triggers below apply every change to
+-- ``registration_facts`` as a delta, so the national tables, rollups and
+-- snapshot never read this (much larger) table.
+CREATE TABLE IF NOT EXISTS geo_facts (
+    month_key INTEGER NOT NULL,
+    rto_id INTEGER NOT NULL REFERENCES rtos (id),
+    category_id INTEGER NOT NULL REFERENCES categories (id),
+    maker_id INTEGER NOT NULL REFERENCES makers (id),
+    day INTEGER NOT NULL,
+    registrations INTEGER NOT NULL,
+    PRIMARY KEY (month_key, rto_id, category_id, maker_id, day)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS geo_facts_insert
+AFTER INSERT ON geo_facts
+BEGIN
+    INSERT INTO registration_facts (day, month_key, category_id, maker_id, registrations)
+    VALUES (NEW.day, NEW.month_key, NEW.category_id, NEW.maker_id, NEW.registrations)
+    ON CONFLICT (day, category_id, maker_id) DO UPDATE
+    SET registrations = registrations + excluded.registrations;
+END;
+
+CREATE TRIGGER IF NOT EXISTS geo_facts_update
+AFTER UPDATE ON geo_facts
+BEGIN
+    UPDATE registration_facts
+    SET registrations = registrations + NEW.registrations - OLD.registrations
+    WHERE day = NEW.day AND category_id = NEW.category_id AND maker_id = NEW.maker_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS geo_facts_delete
+AFTER DELETE ON geo_facts
+BEGIN
+    UPDATE registration_facts
+    SET registrations = registrations - OLD.registrations
+    WHERE day = OLD.day AND category_id = OLD.category_id AND maker_id = OLD.maker_id;
+    DELETE FROM registration_facts
+    WHERE day = OLD.day AND category_id = OLD.category_id AND maker_id = OLD.maker_id
+      AND registrations = 0
+      AND NOT EXISTS (
+          SELECT 1 FROM geo_facts AS g
+          WHERE g.month_key = OLD.month_key AND g.day = OLD.day
+            AND g.category_id = OLD.category_id AND g.maker_id = OLD.maker_id
+      );
+END;
+
+-- Materialised rollups, maintained by ``src.storage.refresh_rollups``.
+-- ``quarter_key`` is ``month_key / 3`` (year * 4 + quarter - 1). Prior
+-- period columns are NULL when the series has no row for that period.
+CREATE TABLE IF NOT EXISTS rollup_maker_month (
+    month_key INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    maker_id INTEGER NOT NULL,
+    registrations INTEGER NOT NULL,
+    prev_year_regs INTEGER,
+    PRIMARY KEY (month_key, category_id, maker_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rollup_category_month (
+    month_key INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    registrations INTEGER NOT NULL,
+    prev_year_regs INTEGER,
+    PRIMARY KEY (month_key, category_id)
+) WITHOUT ROWID;
+
+-- Maker rank and market share within each category and month, with the
+-- previous month's rank and share and the share a year earlier. Keyed by
+-- rank so the top of a category is a range scan; the maker index covers
+-- the lookups of earlier months. See ``src.ranking``.
+CREATE TABLE IF NOT EXISTS rollup_maker_rank (
+    month_key INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    maker_id INTEGER NOT NULL,
+    registrations INTEGER NOT NULL,
+    share_pct REAL,
+    prev_rank INTEGER,
+    prev_share_pct REAL,
+    prev_year_share_pct REAL,
+    PRIMARY KEY (month_key, category_id, rank, maker_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS ix_rollup_maker_rank_maker
+ON rollup_maker_rank (category_id, maker_id, month_key, share_pct);
+
+CREATE TABLE IF NOT EXISTS rollup_maker_quarter (
+    quarter_key INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    maker_id INTEGER NOT NULL,
+    registrations INTEGER NOT NULL,
+    prev_q_regs INTEGER,
+    prev_year_regs INTEGER,
+    PRIMARY KEY (quarter_key, category_id, maker_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rollup_category_quarter (
+    quarter_key INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    registrations INTEGER NOT NULL,
+    prev_q_regs INTEGER,
+    prev_year_regs INTEGER,
+    PRIMARY KEY (quarter_key, category_id)
+) WITHOUT ROWID;
+
+-- Geographic rollups, one per level of the state -> RTO hierarchy (the
+-- national level is ``rollup_maker_month``). Each level is built from the
+-- one below it and keyed by area first, so a drill-down reads one area's
+-- contiguous range; the ``month_key`` indexes serve the refresh.
+CREATE TABLE IF NOT EXISTS rollup_rto_month (
+    rto_id INTEGER NOT NULL,
+    month_key INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    maker_id INTEGER NOT NULL,
+    registrations INTEGER NOT NULL,
+    PRIMARY KEY (rto_id, month_key, category_id, maker_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS ix_rollup_rto_month ON rollup_rto_month (month_key);
+
+CREATE TABLE IF NOT EXISTS rollup_state_month (
+    state_id INTEGER NOT NULL,
+    month_key INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    maker_id INTEGER NOT NULL,
+    registrations INTEGER NOT NULL,
+    PRIMARY KEY (state_id, month_key, category_id, maker_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS ix_rollup_state_month ON rollup_state_month (month_key);
+
+-- Months whose facts changed since the rollups were last refreshed. Marked
+-- in the same transaction as the fact change, so a crash between ingest and
+-- refresh cannot leave stale rollups behind. The triggers avoid
+-- ``INSERT OR IGNORE`` because the outer statement's conflict policy (e.g. an
+-- upsert or ``INSERT OR REPLACE``) would override it.
+CREATE TABLE IF NOT EXISTS rollup_dirty_months (
+    month_key INTEGER PRIMARY KEY
+);
+
+CREATE TRIGGER IF NOT EXISTS facts_mark_insert
+AFTER INSERT ON registration_facts
+BEGIN
+    INSERT INTO rollup_dirty_months (month_key)
+    SELECT NEW.month_key
+    WHERE NOT EXISTS (SELECT 1 FROM rollup_dirty_months WHERE month_key = NEW.month_key);
+END;
+
+CREATE TRIGGER IF NOT EXISTS facts_mark_update
+AFTER UPDATE ON registration_facts
+BEGIN
+    INSERT INTO rollup_dirty_months (month_key)
+    SELECT OLD.month_key
+    WHERE NOT EXISTS (SELECT 1 FROM rollup_dirty_months WHERE month_key = OLD.month_key);
+    INSERT INTO rollup_dirty_months (month_key)
+    SELECT NEW.month_key
+    WHERE NOT EXISTS (SELECT 1 FROM rollup_dirty_months WHERE month_key = NEW.month_key);
+END;
+
+CREATE TRIGGER IF NOT EXISTS facts_mark_delete
+AFTER DELETE ON registration_facts
+BEGIN
+    INSERT INTO rollup_dirty_months (month_key)
+    SELECT OLD.month_key
+    WHERE NOT EXISTS (SELECT 1 FROM rollup_dirty_months WHERE month_key = OLD.month_key);
+END;
+
+-- Months refreshed since the Parquet snapshot was last written, handed on
+-- by the rollup refresh; ``src.snapshot.write_snapshot`` rewrites only their
+-- year partitions and clears them.
+CREATE TABLE IF NOT EXISTS snapshot_dirty_months (
+    month_key INTEGER PRIMARY KEY
+);
+
+-- Databases that had facts before the rollups existed get a full build.
+INSERT OR IGNORE INTO rollup_dirty_months (month_key)
+SELECT DISTINCT month_key FROM registration_facts
+WHERE NOT EXISTS (SELECT 1 FROM rollup_maker_month);
+
+-- Databases whose rollups predate the rank table get them rebuilt once.
+INSERT OR IGNORE INTO rollup_dirty_months (month_key)
+SELECT DISTINCT month_key FROM rollup_maker_month
+WHERE NOT EXISTS (SELECT 1 FROM rollup_maker_rank);
+
+-- Rows rejected by ``src.validation.validate`` at ingest, with their raw
+-- values and the rule they broke; replaced whenever their source is
+-- ingested again.
+CREATE TABLE IF NOT EXISTS quarantine (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    date TEXT,
+    vehicle_category TEXT,
+    maker TEXT,
+    registrations TEXT,
+    state TEXT,
+    rto TEXT,
+    rule TEXT NOT NULL,
+    quarantined_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_quarantine_source ON quarantine (source);
@@ -0,0 +1,127 @@
+import gzip
+import io
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.query import expand_facts
+
+# Rows expanded into strings at a time while writing an export.
+EXPORT_CHUNK_ROWS = 100_000
+
+# Exports larger than this are spilled from memory to a temporary file.
+SPILL_BYTES = 32 * 1024 * 1024
+
+# Bytes handed out per block when streaming a finished export.
+STREAM_BLOCK_BYTES = 1024 * 1024
+
+# Excel's row limit per sheet, less the header row.
+XLSX_SHEET_ROWS = 1_048_575
+
+EXPORT_SCHEMA = pa.schema([
+    ("date", pa.date32()),
+    ("vehicle_category", pa.string()),
+    ("maker", pa.string()),
+    ("registrations", pa.int64()),
+    ("period", pa.date32()),
+])
+
+
+@dataclass(frozen=True)
+class ExportFormat:
+    label: str
+    extension: str
+    mime: str
+
+
+FORMATS: Dict[str, ExportFormat] = {
+    "csv.gz": ExportFormat("CSV (gzip)", "csv.gz", "application/gzip"),
+    "parquet": ExportFormat("Parquet", "parquet", "application/vnd.apache.parquet"),
+    "xlsx": ExportFormat(
+        "Excel", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    ),
+}
+
+
+def write_export(df: pd.DataFrame, fmt: str, fh: BinaryIO, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Write compact facts to the binary file ``fh`` in format ``fmt``.
+
+    ``df`` is in the layout of :func:`src.query.read_facts`. It is expanded
+    into readable rows (see :func:`src.query.expand_facts`) ``chunk_rows``
+    at a time, so only one chunk of strings exists at once whatever the
+    size of the export.
+    """
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}.")
+    chunks = (expand_facts(df.iloc[start:start + chunk_rows]) for start in range(0, len(df), chunk_rows))
+
+    if fmt == "csv.gz":
+        with gzip.GzipFile(fileobj=fh, mode="wb", mtime=0) as gz, io.TextIOWrapper(gz, encoding="utf-8", newline="") as text:
+            header = True
+            for chunk in chunks:
+                chunk.to_csv(text, index=False, header=header, date_format="%Y-%m-%d")
+                header = False
+            if header:
+                text.write(",".join(EXPORT_SCHEMA.names) + "\n")
+    elif fmt == "parquet":
+        with pq.ParquetWriter(fh, EXPORT_SCHEMA) as writer:
+            for chunk in chunks:
+                writer.write_table(pa.Table.from_pandas(chunk, schema=EXPORT_SCHEMA, preserve_index=False))
+    else:
+        _write_xlsx(chunks, fh)
+
+
+def build_export(
+    df: pd.DataFrame,
+    fmt: str,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+    spill_bytes: int = SPILL_BYTES,
+) -> BinaryIO:
+    """Return a file holding the export, rewound to the start.
+
+    The file stays in memory up to ``spill_bytes`` and then moves to a
+    temporary file on disk; it is deleted when closed.
+    """
+
+    spool = tempfile.SpooledTemporaryFile(max_size=spill_bytes)
+    write_export(df, fmt, spool, chunk_rows)
+    spool.seek(0)
+    return spool
+
+
+def stream_export(
+    df: pd.DataFrame,
+    fmt: str,
+    block_bytes: int = STREAM_BLOCK_BYTES,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+) -> Iterator[bytes]:
+    """Yield the export of ``df`` in blocks of at most ``block_bytes``."""
+
+    with build_export(df, fmt, chunk_rows) as spool:
+        for block in iter(lambda: spool.read(block_bytes), b""):
+            yield block
+
+
+def _write_xlsx(chunks: Iterator[pd.DataFrame], fh: BinaryIO):
+    from openpyxl import Workbook
+
+    # Write-only mode streams rows to the sheet XML instead of keeping cells.
+    workbook = Workbook(write_only=True)
+    sheet, rows = None, XLSX_SHEET_ROWS
+    for chunk in chunks:
+        chunk = chunk.assign(date=chunk["date"].dt.date, period=chunk["period"].dt.date)
+        for record in chunk.itertuples(index=False, name=None):
+            if rows == XLSX_SHEET_ROWS:
+                sheet = workbook.create_sheet(f"vahan_{len(workbook.worksheets) + 1}")
+                sheet.append(EXPORT_SCHEMA.names)
+                rows = 0
+            sheet.append(record)
+            rows += 1
+    if sheet is None:
+        workbook.create_sheet("vahan_1").append(EXPORT_SCHEMA.names)
+    workbook.save(fh)
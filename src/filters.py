@@ -0,0 +1,175 @@
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from src.query import Filters
+
+# Use the posting lists while the rows they touch are at most this fraction
+# of the month range; beyond it one vectorised pass over the range is cheaper.
+SPARSE_FRACTION = 0.25
+
+
+class FilterIndex:
+    """Answer :class:`src.query.Filters` selections over an in-memory frame.
+
+    The index is built once when the data loads. Rows are ordered by their
+    month key, so a date range becomes a pair of binary searches. For every
+    category and maker it keeps a posting list: the row positions holding
+    that value, sorted by month. Posting lists are the compressed form of a
+    per-value bitmap, so a selection is a union of posting slices clipped to
+    the month range and intersected with the other dimension through a
+    code lookup. The work is proportional to the rows selected, not to the
+    frame, so toggling one maker among 1,500 touches only that selection.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        Frame to filter; it is never copied or reordered.
+    keys: str or array
+        Column (or array) of integer month keys, ``year * 12 + month - 1``.
+        With ``quarterly=True`` they are quarter keys (``month_key // 3``)
+        and month bounds are mapped onto quarters.
+    dimensions: sequence of str
+        Columns filtered by name, matched to ``Filters.categories`` and
+        ``Filters.makers``. Categorical columns reuse their codes; others
+        are factorised once.
+    """
+
+    FIELDS = {"vehicle_category": "categories", "maker": "makers"}
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        keys: Union[str, np.ndarray] = "month_key",
+        dimensions: Sequence[str] = ("vehicle_category", "maker"),
+        quarterly: bool = False,
+    ):
+        self.df = df
+        self.quarterly = quarterly
+        keys = np.asarray(df[keys] if isinstance(keys, str) else keys, dtype="int64")
+        self._keys = keys
+        self.monotonic = bool(len(keys) < 2 or (keys[1:] >= keys[:-1]).all())
+        self._order = None if self.monotonic else np.argsort(keys, kind="stable")
+        self._sorted_keys = keys if self.monotonic else keys[self._order]
+
+        position_type = "int32" if len(df) < 2**31 else "int64"
+        self._dimensions: Dict[str, _Postings] = {}
+        for column in dimensions:
+            if column not in df.columns:
+                continue
+            values = df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes = values.cat.codes.to_numpy()
+                names = pd.Index(values.cat.categories)
+            else:
+                codes, names = pd.factorize(values)
+                names = pd.Index(names)
+            perm = np.lexsort((keys, codes)).astype(position_type)
+            bounds = np.searchsorted(codes[perm], np.arange(len(names) + 1))
+            self._dimensions[column] = _Postings(names, codes, perm, keys[perm], bounds)
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def positions(self, filters: Filters) -> Union[slice, np.ndarray]:
+        """Return the selected rows as a ``slice`` or as sorted positions.
+
+        A slice is returned whenever the selected rows are contiguous: any
+        range on a frame ordered by month, and for instance one maker's
+        range on a frame ordered by maker and month.
+        """
+
+        low, high = self._bounds(filters)
+        selections = [
+            (postings, postings.codes_for(getattr(filters, self.FIELDS[column])))
+            for column, postings in self._dimensions.items()
+            if getattr(filters, self.FIELDS[column]) is not None
+        ]
+        if not selections:
+            if self.monotonic:
+                return slice(low, high)
+            return _contiguous(np.sort(self._order[low:high]))
+
+        start_key, stop_key = self._key_range(filters)
+        costs = [postings.count(codes, start_key, stop_key) for postings, codes in selections]
+        driver = int(np.argmin(costs))
+        if costs[driver] <= SPARSE_FRACTION * (high - low):
+            postings, codes = selections.pop(driver)
+            rows = postings.rows(codes, start_key, stop_key)
+        else:
+            rows = np.arange(low, high) if self.monotonic else self._order[low:high]
+        for postings, codes in selections:
+            rows = rows[postings.allowed(codes)[postings.codes[rows]]]
+        return _contiguous(np.sort(rows))
+
+    def select(self, filters: Filters) -> pd.DataFrame:
+        """Return the rows matching ``filters`` in their original order.
+
+        Contiguous selections (see :meth:`positions`) are row slices that
+        share memory with the indexed frame; otherwise only the selected
+        rows are gathered.
+        """
+
+        rows = self.positions(filters)
+        if isinstance(rows, slice):
+            return self.df.iloc[rows]
+        return self.df.take(rows)
+
+    def _key_range(self, filters: Filters):
+        start = filters.start_month
+        stop = filters.end_month
+        if self.quarterly:
+            start = start // 3 if start is not None else None
+            stop = stop // 3 if stop is not None else None
+        return start, stop
+
+    def _bounds(self, filters: Filters):
+        start, stop = self._key_range(filters)
+        low = 0 if start is None else int(np.searchsorted(self._sorted_keys, start, "left"))
+        high = len(self._sorted_keys) if stop is None else int(np.searchsorted(self._sorted_keys, stop, "right"))
+        return low, max(low, high)
+
+
+def _contiguous(rows: np.ndarray) -> Union[slice, np.ndarray]:
+    # Sorted, distinct positions are one run exactly when they span their count.
+    if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+        return slice(int(rows[0]), int(rows[-1]) + 1)
+    return rows
+
+
+class _Postings:
+    """Row positions per value of one dimension, each run sorted by key."""
+
+    def __init__(self, names: pd.Index, codes: np.ndarray, rows: np.ndarray, keys: np.ndarray, bounds: np.ndarray):
+        self.names = names
+        self.codes = codes
+        self._rows = rows
+        self._keys = keys
+        self._bounds = bounds
+
+    def codes_for(self, names: Sequence[str]) -> np.ndarray:
+        codes = self.names.get_indexer(list(names))
+        return codes[codes >= 0]
+
+    def allowed(self, codes: np.ndarray) -> np.ndarray:
+        lookup = np.zeros(len(self.names) + 1, dtype=bool)
+        lookup[codes] = True
+        # Code -1 (missing value) indexes the trailing False.
+        return lookup
+
+    def _run(self, code: int, start: Optional[int], stop: Optional[int]):
+        low, high = self._bounds[code], self._bounds[code + 1]
+        keys = self._keys[low:high]
+        if start is not None:
+            low += int(np.searchsorted(keys, start, "left"))
+        if stop is not None:
+            high = self._bounds[code] + int(np.searchsorted(keys, stop, "right"))
+        return low, max(low, high)
+
+    def count(self, codes: np.ndarray, start: Optional[int], stop: Optional[int]) -> int:
+        return sum(high - low for low, high in (self._run(c, start, stop) for c in codes))
+
+    def rows(self, codes: np.ndarray, start: Optional[int], stop: Optional[int]) -> np.ndarray:
+        runs = [self._rows[low:high] for low, high in (self._run(c, start, stop) for c in codes)]
+        return np.concatenate(runs) if runs else np.empty(0, dtype=self._rows.dtype)
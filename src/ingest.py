@@ -1,92 +1,866 @@
+import argparse
+import collections
+import glob
+import hashlib
+import itertools
+import multiprocessing
+import os
+import re
 import sqlite3
-from typing import Iterable, Tuple
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import pandas as pd
 
-DB_PATH = "data/vahan.db"
+# Allow running as ``python src/ingest.py`` from the project root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.anomaly import refresh_anomalies
+from src.instrument import peak_rss_mb, span
+from src.snapshot import SNAPSHOT_DIR, snapshot_version, write_snapshot
+from src.storage import (
+    DB_PATH,
+    UNKNOWN_AREA,
+    Connection,
+    connect,
+    data_version,
+    delete_rows,
+    ensure_schema,
+    publish_version,
+    refresh_rollups,
+    staged,
+    upsert_frame,
+)
+from src.validation import COLUMNS, Validated, clear_quarantine, quarantine_rows, validate
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+DATA_PATH = "data/vahan.csv"
 
-    # Create table if not exists
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS registrations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT NOT NULL,
-            vehicle_category TEXT NOT NULL,
-            maker TEXT NOT NULL,
-            registrations INTEGER NOT NULL
+# Rows read and inserted per transaction in streaming mode.  Large enough to
+# amortise the per-commit cost, small enough that peak memory stays flat.
+CHUNK_SIZE = 50_000
+
+# Parsed chunks a worker may queue ahead of the writer, per file in flight.
+CHUNKS_IN_FLIGHT = 2
+
+# Optional geographic breakdown; exports that carry either column are
+# stored per RTO (see ``src.storage.upsert_frame``).
+GEO_COLUMNS = ["state", "rto"]
+
+# Header spellings seen in Vahan exports, keyed by their normalised form
+# (lower case, runs of non-alphanumerics collapsed to a single space).
+COLUMN_ALIASES = {
+    "date": "date",
+    "month": "date",
+    "period": "date",
+    "month year": "date",
+    "registration date": "date",
+    "registration month": "date",
+    "vehicle category": "vehicle_category",
+    "vehicle category group": "vehicle_category",
+    "category": "vehicle_category",
+    "maker": "maker",
+    "maker name": "maker",
+    "manufacturer": "maker",
+    "vehicle maker": "maker",
+    "registrations": "registrations",
+    "registration count": "registrations",
+    "no of registrations": "registrations",
+    "registered vehicles": "registrations",
+    "count": "registrations",
+    "total": "registrations",
+    "state": "state",
+    "state name": "state",
+    "rto": "rto",
+    "rto name": "rto",
+    "rto office": "rto",
+    "office name": "rto",
+    "registering authority": "rto",
+}
+
+# Excel exports are recognised by their leading bytes rather than by their
+# extension: ``data/vahan.csv`` as downloaded from Vahan is really an XLSX.
+XLSX_MAGIC = b"PK\x03\x04"
+XLS_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+# Header of the row labels in Vahan's "Vehicle Class Wise" report, a yearly
+# vehicle class x category cross-tab. It has no date or maker columns, so it
+# cannot be ingested; it is recognised only to say so.
+CROSS_TAB_HEADER = "vehicle class"
+
+# How many leading rows of a sheet to search for the header row; exports
+# carry a title and blank spacer rows above it.
+HEADER_SCAN_ROWS = 20
+
+# ``ingest_state`` source name used to remember that the sample rows were
+# loaded, so they can be removed once a real export arrives.
+SAMPLE_SOURCE = "<sample>"
+
+SAMPLE_DATA = [
+    ("2024-01-01", "2W", "Honda", 1000),
+    ("2024-01-01", "4W", "Maruti", 1400),
+    ("2024-02-01", "2W", "Yamaha", 800),
+    ("2024-02-01", "4W", "Hyundai", 1200),
+    ("2024-03-01", "2W", "Honda", 1100),
+    ("2024-03-01", "4W", "Tata", 1000),
+    ("2024-04-01", "2W", "Suzuki", 900),
+    ("2024-04-01", "4W", "Maruti", 1500),
+    ("2024-05-01", "2W", "Honda", 1300),
+    ("2024-05-01", "4W", "Hyundai", 1100),
+    ("2025-01-01", "2W", "Honda", 1200),
+    ("2025-01-01", "4W", "Maruti", 1500),
+    ("2025-02-01", "2W", "Yamaha", 900),
+    ("2025-02-01", "4W", "Hyundai", 1300),
+    ("2025-03-01", "2W", "Honda", 1400),
+    ("2025-03-01", "4W", "Tata", 1100),
+    ("2025-04-01", "2W", "Suzuki", 1000),
+    ("2025-04-01", "4W", "Maruti", 1600),
+    ("2025-05-01", "2W", "Honda", 1500),
+    ("2025-05-01", "4W", "Hyundai", 1400),
+]
+
+
+@dataclass
+class IngestStats:
+    """Throughput figures for a single streaming ingest run."""
+
+    rows: int = 0
+    changed: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    peak_rss_mb: float = 0.0
+    rollup_months: int = 0
+    rejected: int = 0
+    skipped: bool = False
+    files: int = 0
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        text = (
+            f"{self.rows} rows ({self.changed} new or changed) in {self.chunks} chunks, "
+            f"{self.seconds:.2f}s ({self.rows_per_sec:,.0f} rows/s, "
+            f"peak RSS {self.peak_rss_mb:.1f} MiB); "
+            f"rollups refreshed for {self.rollup_months} months"
         )
-    """)
+        if self.rejected:
+            text += f"; {self.rejected} rows quarantined"
+        if self.files:
+            text += f"; {self.files} files, {len(self.failed)} failed"
+        return text
 
-    # Check if table already has data
-    cursor.execute("SELECT COUNT(*) FROM registrations")
-    count = cursor.fetchone()[0]
-    if count == 0:
-        try:
-            records = list(_load_vahan_records("data/vahan.csv"))
-            cursor.executemany(
-                """
-                INSERT INTO registrations (date, vehicle_category, maker, registrations)
-                VALUES (?, ?, ?, ?)
-                """,
-                records,
-            )
-            print(f"Inserted {len(records)} rows from dataset.")
-        except Exception:
-            # Fallback to minimal sample data if dataset is missing
-            sample_data = [
-                ("2024-01-01", "2W", "Honda", 1000),
-                ("2024-01-01", "4W", "Maruti", 1400),
-                ("2024-02-01", "2W", "Yamaha", 800),
-                ("2024-02-01", "4W", "Hyundai", 1200),
-                ("2024-03-01", "2W", "Honda", 1100),
-                ("2024-03-01", "4W", "Tata", 1000),
-                ("2024-04-01", "2W", "Suzuki", 900),
-                ("2024-04-01", "4W", "Maruti", 1500),
-                ("2024-05-01", "2W", "Honda", 1300),
-                ("2024-05-01", "4W", "Hyundai", 1100),
-                ("2025-01-01", "2W", "Honda", 1200),
-                ("2025-01-01", "4W", "Maruti", 1500),
-                ("2025-02-01", "2W", "Yamaha", 900),
-                ("2025-02-01", "4W", "Hyundai", 1300),
-                ("2025-03-01", "2W", "Honda", 1400),
-                ("2025-03-01", "4W", "Tata", 1100),
-                ("2025-04-01", "2W", "Suzuki", 1000),
-                ("2025-04-01", "4W", "Maruti", 1600),
-                ("2025-05-01", "2W", "Honda", 1500),
-                ("2025-05-01", "4W", "Hyundai", 1400),
-            ]
-            cursor.executemany(
-                """
-                INSERT INTO registrations (date, vehicle_category, maker, registrations)
-                VALUES (?, ?, ?, ?)
-                """,
-                sample_data,
-            )
-            print(f"Inserted {len(sample_data)} sample rows.")
 
-    conn.commit()
+@dataclass
+class ParsedFile:
+    """Outcome of parsing a source file, known once its chunks are consumed.
+
+    ``chunks`` counts the chunks parsed; ``error`` is the reason parsing
+    stopped, if it did.
+    """
+
+    path: str
+    sha256: str = ""
+    chunks: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+@span("ingest.init_db")
+def init_db(
+    db_path: str = DB_PATH,
+    data_path: str = DATA_PATH,
+    chunksize: int = CHUNK_SIZE,
+    force: bool = False,
+    snapshot_dir: Optional[str] = SNAPSHOT_DIR,
+    workers: Optional[int] = None,
+):
+    conn = connect(db_path)
+    ensure_schema(conn)
+    # Readers of this database (other replicas, a running dashboard) see the
+    # ingest and the version it publishes together, or not at all.
+    with staged(conn):
+        _ingest_or_sample(conn, data_path, chunksize, force, workers)
+        publish(conn, snapshot_dir)
     conn.close()
     print("Database ready.")
 
 
+def _ingest_or_sample(
+    conn: sqlite3.Connection, data_path: str, chunksize: int, force: bool, workers: Optional[int]
+):
+    try:
+        if os.path.isdir(data_path) or glob.has_magic(data_path):
+            sources = resolve_sources(data_path)
+            if not sources:
+                raise FileNotFoundError(f"No files match {data_path}")
+            stats = ingest_files(conn, sources, chunksize=chunksize, force=force, workers=workers)
+            for source, error in stats.failed:
+                print(f"Could not ingest {source} ({error}).")
+            if len(stats.failed) == len(sources):
+                raise ValueError(f"none of the {len(sources)} files could be ingested")
+        else:
+            stats = ingest_file(conn, data_path, chunksize=chunksize, force=force)
+        if stats.skipped:
+            print(f"{data_path} unchanged since last ingest; skipped.")
+        else:
+            print(f"Upserted {stats}.")
+    except Exception as exc:
+        count = conn.execute("SELECT COUNT(*) FROM registrations").fetchone()[0]
+        if count:
+            # Existing rows and any chunks written before the error stay.
+            print(f"Could not ingest {data_path} ({exc}); keeping existing rows.")
+        else:
+            # Fallback to minimal sample data if dataset is missing
+            _insert_sample(conn)
+            print(f"Could not load {data_path} ({exc}).")
+            print(f"Inserted {len(SAMPLE_DATA)} sample rows.")
+
+
+def publish(conn: Connection, snapshot_dir: Optional[str] = SNAPSHOT_DIR) -> int:
+    """Publish the current data version, switching readers to it in one step.
+
+    Months left dirty are rolled up, the anomaly scan is rebuilt and the
+    Parquet snapshot of the new version is written, then the version is
+    published. All of it is one :func:`src.storage.staged` transaction; run
+    the ingest in the same one (as :func:`init_db` and
+    :func:`src.refresh.refresh_once` do) and readers, who read each version
+    inside one read transaction (:func:`src.storage.pinned`), see either the
+    previous version's rows, rollups and anomalies or the new version's,
+    never a mix. The snapshot is written under its own version number and
+    the one it replaces is kept, so sessions still on the previous version
+    go on reading it. Returns the version published.
+    """
+
+    with staged(conn):
+        # Picks up months left dirty by an ingest that stopped part way.
+        with span("ingest.refresh_rollups"):
+            refresh_rollups(conn)
+        with span("ingest.anomalies"):
+            anomalies = refresh_anomalies(conn)
+        if anomalies is not None:
+            print(f"Flagged {anomalies} anomalies across all maker x category series.")
+        version = data_version(conn)
+        # The snapshot's own record rolls back with a failed pass, while its
+        # files on disk do not; either being behind means it is rewritten.
+        written = conn.execute("SELECT value FROM meta WHERE key = 'snapshot_version'").fetchone()
+        if snapshot_dir and (snapshot_version(snapshot_dir) != version or written != (version,)):
+            with span("ingest.snapshot"):
+                write_snapshot(conn, snapshot_dir)
+            print(f"Wrote Parquet snapshot v{version} to {snapshot_dir}.")
+        return publish_version(conn)
+
+
+@span("ingest.file")
+def ingest_file(
+    conn: sqlite3.Connection,
+    path: str,
+    chunksize: int = CHUNK_SIZE,
+    force: bool = False,
+) -> IngestStats:
+    """Incrementally upsert ``path`` unless it is unchanged since last time.
+
+    The file's size, modification time and SHA-256 are kept in
+    ``ingest_state``. A file whose size and mtime match is skipped without
+    being read; one whose mtime moved but whose content hash matches is
+    skipped after hashing. ``force`` re-ingests regardless. The state row is
+    only written once every chunk has been committed, so an interrupted run
+    is simply repeated next time. The rollup tables are refreshed for the
+    months the file changed before the state row is written.
+    """
+
+    source = os.path.abspath(path)
+    stat = os.stat(path)
+    previous = conn.execute(
+        "SELECT sha256, mtime_ns, size FROM ingest_state WHERE source = ?", (source,)
+    ).fetchone()
+    if previous and not force and previous[1:] == (stat.st_mtime_ns, stat.st_size):
+        with conn:
+            _record_manifest(conn, source, "skipped")
+        return IngestStats(skipped=True)
+
+    try:
+        with span("ingest.hash"):
+            digest = _file_sha256(path)
+        if previous and not force and previous[0] == digest:
+            with conn:
+                _touch_state(conn, source, stat)
+                _record_manifest(conn, source, "skipped")
+            return IngestStats(skipped=True)
+
+        chunks = _iter_vahan_chunks(path, chunksize)
+        # Parse the first chunk before touching the sample rows so an unreadable
+        # file leaves the database as it was.
+        first = next(chunks, None)
+        if first is not None:
+            _drop_sample_rows(conn)
+            with conn:
+                clear_quarantine(conn, [source])
+            chunks = itertools.chain([first], chunks)
+        stats = _write_chunks(conn, chunks, source)
+    except Exception as exc:
+        with conn:
+            _record_manifest(conn, source, "failed", error=_describe(exc))
+        raise
+    with span("ingest.refresh_rollups"):
+        stats.rollup_months = refresh_rollups(conn)
+    with conn:
+        _write_state(conn, source, digest, stat, stats.rows)
+        _record_manifest(conn, source, "ok", stats.rows, stats.changed, stats.seconds)
+    return stats
+
+
+def resolve_sources(pattern: str) -> List[str]:
+    """Expand a directory or glob into the sorted list of files it names.
+
+    Directories are walked recursively, skipping hidden files; anything else
+    is treated as a glob pattern (``**`` matches nested directories).
+    """
+
+    if os.path.isdir(pattern):
+        paths = [
+            os.path.join(root, name)
+            for root, dirs, names in os.walk(pattern)
+            for name in names
+            if not name.startswith(".")
+        ]
+    else:
+        paths = [p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p)]
+    return sorted(paths)
+
+
+@span("ingest.files")
+def ingest_files(
+    conn: sqlite3.Connection,
+    paths: Sequence[str],
+    chunksize: int = CHUNK_SIZE,
+    force: bool = False,
+    workers: Optional[int] = None,
+) -> IngestStats:
+    """Incrementally upsert many source files, parsing them in parallel.
+
+    Files whose size and mtime match ``ingest_state`` are skipped without
+    being read. The rest are hashed, parsed and cleaned in a pool of
+    ``workers`` processes (one per core by default) while this process is
+    the single writer: files are applied in ``paths`` order and committed in
+    batches of about ``chunksize`` rows, each file's rows together with its
+    ``ingest_state`` row. A file that cannot be parsed writes nothing and is
+    reported in ``stats.failed``. Every file gets an ``ingest_manifest`` row
+    with its outcome, and the rollups are refreshed once at the end. Inside
+    :func:`src.storage.staged` the batch commits are held back until the
+    whole block commits.
+    """
+
+    stats = IngestStats(files=len(paths))
+    start = time.perf_counter()
+
+    pending = []
+    for path in paths:
+        source = os.path.abspath(path)
+        stat = os.stat(path)
+        previous = conn.execute(
+            "SELECT sha256, mtime_ns, size FROM ingest_state WHERE source = ?", (source,)
+        ).fetchone()
+        if previous and not force and previous[1:] == (stat.st_mtime_ns, stat.st_size):
+            _record_manifest(conn, source, "skipped")
+        else:
+            pending.append((source, stat, previous))
+    conn.commit()
+
+    batch_rows = 0
+    sample_dropped = False
+    # A file whose content hash is unchanged is hashed but not parsed.
+    jobs = [(source, previous[0] if previous and not force else None) for source, _, previous in pending]
+    try:
+        for (source, stat, previous), (chunks, result) in zip(pending, _parse_files(jobs, chunksize, workers)):
+            # Chunks are written as they arrive; a file that fails part way
+            # is rolled back to this savepoint and writes nothing. The open
+            # transaction keeps RELEASE from committing on its own.
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            conn.execute("SAVEPOINT ingest_file")
+            rows = changed = 0
+            started = False
+            with span("ingest.upsert", source=source) as upsert:
+                for chunk in chunks:
+                    if not started:
+                        _start_file(conn, source, drop_sample=not sample_dropped)
+                        started = True
+                    changed += upsert_frame(conn, chunk.valid)
+                    stats.rejected += quarantine_rows(conn, source, chunk.rejected)
+                    rows += len(chunk.valid)
+                upsert.fields["rows"] = rows
+            parsed = result()
+            if parsed.error is not None:
+                conn.execute("ROLLBACK TO ingest_file")
+                conn.execute("RELEASE ingest_file")
+                _record_manifest(conn, source, "failed", seconds=parsed.seconds, error=parsed.error)
+                stats.failed.append((source, parsed.error))
+                continue
+            conn.execute("RELEASE ingest_file")
+            if previous and not force and previous[0] == parsed.sha256:
+                _touch_state(conn, source, stat)
+                _record_manifest(conn, source, "skipped")
+                continue
+            if not started:
+                _start_file(conn, source, drop_sample=not sample_dropped)
+            sample_dropped = True
+            _write_state(conn, source, parsed.sha256, stat, rows)
+            _record_manifest(conn, source, "ok", rows, changed, parsed.seconds)
+            stats.rows += rows
+            stats.changed += changed
+            stats.chunks += parsed.chunks
+            batch_rows += rows
+            if batch_rows >= chunksize:
+                conn.commit()
+                batch_rows = 0
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    stats.skipped = stats.files > 0 and stats.rows == 0 and not stats.failed
+    with span("ingest.refresh_rollups"):
+        stats.rollup_months = refresh_rollups(conn)
+    stats.seconds = time.perf_counter() - start
+    stats.peak_rss_mb = peak_rss_mb()
+    return stats
+
+
+def _stream_file(
+    path: str, chunksize: int, skip_sha256: Optional[str], parsed: ParsedFile
+) -> Iterator[Validated]:
+    """Hash ``path`` and yield its cleaned chunks, recording the outcome in ``parsed``.
+
+    Nothing is parsed when the hash is ``skip_sha256``. Errors end the
+    stream and are recorded rather than raised, so one bad export does not
+    stop the others.
+    """
+
+    start = time.perf_counter()
+    try:
+        with span("ingest.hash", source=path):
+            parsed.sha256 = _file_sha256(path)
+        if parsed.sha256 == skip_sha256:
+            return
+        chunks = _iter_vahan_chunks(path, chunksize)
+        while True:
+            # Timed apart from the consumer's writes, as in ``_write_chunks``.
+            with span("ingest.parse", source=path):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            parsed.chunks += 1
+            yield chunk
+    except Exception as exc:
+        parsed.error = _describe(exc)
+    finally:
+        parsed.seconds = time.perf_counter() - start
+
+
+def _parse_file(path: str, chunksize: int, skip_sha256: Optional[str], queue) -> ParsedFile:
+    """Run :func:`_stream_file` in a worker process, passing chunks back on ``queue``.
+
+    ``queue`` is bounded, so the worker waits for the writer instead of
+    holding the whole file; ``None`` marks the end of the file.
+    """
+
+    parsed = ParsedFile(path)
+    try:
+        # Worker processes inherit VAHAN_METRICS, so their spans reach the same sink.
+        for chunk in _stream_file(path, chunksize, skip_sha256, parsed):
+            queue.put(chunk)
+    finally:
+        queue.put(None)
+    return parsed
+
+
+def _parse_files(
+    jobs: Sequence[Tuple[str, Optional[str]]], chunksize: int, workers: Optional[int]
+) -> Iterator[Tuple[Iterator[Validated], Callable[[], ParsedFile]]]:
+    """Parse ``(path, skip_sha256)`` jobs in parallel, in order.
+
+    Yields, per file, an iterator over its chunks and a function returning
+    its :class:`ParsedFile` once they are consumed. Each file's chunks
+    stream back through a queue of :data:`CHUNKS_IN_FLIGHT`, and at most two
+    files per worker are queued, so memory is bounded by the chunk size
+    rather than by the size of the files or of the backfill.
+    """
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        for path, skip_sha256 in jobs:
+            parsed = ParsedFile(path)
+            yield _stream_file(path, chunksize, skip_sha256, parsed), lambda parsed=parsed: parsed
+        return
+
+    remaining = iter(jobs)
+    # The manager is shut down first on the way out, which unblocks any
+    # worker still waiting on a full queue.
+    with ProcessPoolExecutor(workers) as pool, multiprocessing.Manager() as manager:
+
+        def submit(job):
+            queue = manager.Queue(CHUNKS_IN_FLIGHT)
+            return queue, pool.submit(_parse_file, job[0], chunksize, job[1], queue)
+
+        in_flight = collections.deque(submit(job) for job in itertools.islice(remaining, 2 * workers))
+        try:
+            while in_flight:
+                queue, future = in_flight.popleft()
+                yield iter(queue.get, None), future.result
+                job = next(remaining, None)
+                if job is not None:
+                    in_flight.append(submit(job))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _write_state(conn: sqlite3.Connection, source: str, digest: str, stat: os.stat_result, rows: int):
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO ingest_state (source, sha256, mtime_ns, size, rows)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (source, digest, stat.st_mtime_ns, stat.st_size, rows),
+    )
+
+
+def _touch_state(conn: sqlite3.Connection, source: str, stat: os.stat_result):
+    conn.execute(
+        "UPDATE ingest_state SET mtime_ns = ?, size = ? WHERE source = ?",
+        (stat.st_mtime_ns, stat.st_size, source),
+    )
+
+
+def _record_manifest(
+    conn: sqlite3.Connection,
+    source: str,
+    status: str,
+    rows: int = 0,
+    changed: int = 0,
+    seconds: float = 0.0,
+    error: Optional[str] = None,
+):
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO ingest_manifest (source, status, rows, changed, seconds, error)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (source, status, rows, changed, seconds, error),
+    )
+
+
+def _describe(exc: BaseException) -> str:
+    return f"{type(exc).__name__}: {exc}"
+
+
+def ingest_stream(conn: sqlite3.Connection, path: str, chunksize: int = CHUNK_SIZE) -> IngestStats:
+    """Upsert the dataset at ``path`` into ``registrations`` chunk by chunk.
+
+    Each chunk of at most ``chunksize`` rows is written and committed in its
+    own transaction, so only one chunk is ever held in memory regardless of
+    the size of the export. Rows that fail validation are quarantined.
+    """
+
+    source = os.path.abspath(path)
+    with conn:
+        clear_quarantine(conn, [source])
+    return _write_chunks(conn, _iter_vahan_chunks(path, chunksize), source)
+
+
+def _write_chunks(conn: sqlite3.Connection, chunks: Iterable[Validated], source: str) -> IngestStats:
+    stats = IngestStats()
+    start = time.perf_counter()
+    chunks = iter(chunks)
+    while True:
+        # Chunks are parsed lazily, so reading and writing are timed apart.
+        with span("ingest.parse"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        with span("ingest.upsert", rows=len(chunk.valid)), conn:
+            stats.changed += upsert_frame(conn, chunk.valid)
+            stats.rejected += quarantine_rows(conn, source, chunk.rejected)
+        stats.rows += len(chunk.valid)
+        stats.chunks += 1
+    stats.seconds = time.perf_counter() - start
+    stats.peak_rss_mb = peak_rss_mb()
+    return stats
+
+
+def _insert_sample(conn: sqlite3.Connection):
+    with conn:
+        upsert_frame(conn, pd.DataFrame(SAMPLE_DATA, columns=COLUMNS))
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO ingest_state (source, sha256, mtime_ns, size, rows)
+            VALUES (?, '', 0, 0, ?)
+            """,
+            (SAMPLE_SOURCE, len(SAMPLE_DATA)),
+        )
+    refresh_rollups(conn)
+
+
+def _drop_sample_rows(conn: sqlite3.Connection):
+    """Remove the fallback sample rows before real data is ingested."""
+
+    with conn:
+        _delete_sample_rows(conn)
+
+
+def _start_file(conn: sqlite3.Connection, source: str, drop_sample: bool):
+    # Before a changed file's first rows, inside the caller's transaction.
+    if drop_sample:
+        _delete_sample_rows(conn)
+    clear_quarantine(conn, [source])
+
+
+def _delete_sample_rows(conn: sqlite3.Connection):
+    deleted = conn.execute("DELETE FROM ingest_state WHERE source = ?", (SAMPLE_SOURCE,))
+    if deleted.rowcount:
+        delete_rows(conn, SAMPLE_DATA)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _iter_vahan_chunks(path: str, chunksize: int = CHUNK_SIZE) -> Iterator[Validated]:
+    """Yield validated chunks of at most ``chunksize`` rows from ``path``.
+
+    The reader is chosen from the file content: XLSX and legacy XLS
+    workbooks are streamed sheet row by sheet row, anything else is read
+    as CSV.
+    """
+
+    fmt = _sniff_format(path)
+    if fmt == "xlsx":
+        chunks = _iter_xlsx_chunks(path, chunksize)
+    elif fmt == "xls":
+        chunks = _iter_xls_chunks(path, chunksize)
+    else:
+        chunks = _iter_csv_chunks(path, chunksize)
+    for chunk in chunks:
+        yield _clean_chunk(chunk)
+
+
+def _sniff_format(path: str) -> str:
+    """Return ``"xlsx"``, ``"xls"`` or ``"csv"`` based on the file header."""
+
+    with open(path, "rb") as fh:
+        head = fh.read(8)
+    if head.startswith(XLSX_MAGIC):
+        return "xlsx"
+    if head.startswith(XLS_MAGIC):
+        return "xls"
+    return "csv"
+
+
+def _canonical_column(name) -> Optional[str]:
+    """Map a header cell onto one of :data:`COLUMNS`, or ``None``."""
+
+    if name is None:
+        return None
+    return COLUMN_ALIASES.get(_header_key(name))
+
+
+def _header_key(name) -> str:
+    return re.sub(r"[^0-9a-z]+", " ", str(name).lower()).strip()
+
+
+def _iter_csv_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    # The header is mapped as for sheets, so of two headers naming the same
+    # column (say "Registrations" and "Total") the first is kept.
+    header = list(pd.read_csv(path, nrows=0).columns)
+    positions = _header_positions(header)
+    if positions is None:
+        missing = set(COLUMNS) - {_canonical_column(name) for name in header}
+        raise ValueError(f"{path} is missing columns: {sorted(missing)}")
+    names = {index: column for column, index in positions.items()}
+    # Everything is read as text, so validation sees counts and dates as
+    # exported and quarantines them verbatim; only empty cells are missing.
+    reader = pd.read_csv(
+        path,
+        usecols=list(names),
+        chunksize=chunksize,
+        dtype=str,
+        keep_default_na=False,
+        na_values=[""],
+    )
+    for chunk in reader:
+        # Columns selected by position come back in file order.
+        chunk.columns = [names[index] for index in sorted(names)]
+        yield chunk
+
+
+def _header_positions(row: Sequence) -> Optional[Dict[str, int]]:
+    """Return ``{column: position}`` for ``row`` if it is a header.
+
+    A header names every one of :data:`COLUMNS`; any :data:`GEO_COLUMNS`
+    it also names are included.
+    """
+
+    positions = {}
+    for idx, cell in enumerate(row):
+        column = _canonical_column(cell)
+        if column is not None and column not in positions:
+            positions[column] = idx
+    if not set(COLUMNS) <= set(positions):
+        return None
+    return {column: positions[column] for column in COLUMNS + GEO_COLUMNS if column in positions}
+
+
+def _iter_sheet_chunks(
+    rows: Iterator[Sequence], chunksize: int, scanned: Optional[List[Sequence]] = None
+) -> Optional[Iterator[pd.DataFrame]]:
+    """Locate the header in ``rows`` and return an iterator of row chunks.
+
+    Returns ``None`` when no header row is found within the first
+    :data:`HEADER_SCAN_ROWS` rows, so callers can try the next sheet. The
+    rows searched are appended to ``scanned``, if given.
+    """
+
+    positions = None
+    for _, row in zip(range(HEADER_SCAN_ROWS), rows):
+        if scanned is not None:
+            scanned.append(row)
+        positions = _header_positions(row)
+        if positions is not None:
+            break
+    if positions is None:
+        return None
+
+    columns, indexes = list(positions), list(positions.values())
+
+    def chunks():
+        buffer = []
+        for row in rows:
+            buffer.append(tuple(row[i] if i < len(row) else None for i in indexes))
+            if len(buffer) >= chunksize:
+                yield pd.DataFrame.from_records(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame.from_records(buffer, columns=columns)
+
+    return chunks()
+
+
+def _iter_xlsx_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Stream an XLSX workbook with openpyxl's read-only mode.
+
+    Read-only mode parses the sheet XML lazily as rows are requested, so the
+    workbook is never materialised as a full cell DOM.
+    """
+
+    from openpyxl import load_workbook
+
+    # openpyxl validates the file extension when given a path; passing the
+    # open handle lets it read XLSX content saved under a ``.csv`` name.
+    scanned = []
+    with open(path, "rb") as fh, warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="Workbook contains no default style")
+        workbook = load_workbook(fh, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                chunks = _iter_sheet_chunks(sheet.iter_rows(values_only=True), chunksize, scanned)
+                if chunks is not None:
+                    yield from chunks
+                    return
+        finally:
+            workbook.close()
+    raise _no_header_error(path, scanned)
+
+
+def _iter_xls_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Read a legacy XLS workbook with xlrd, loading one sheet at a time."""
+
+    try:
+        import xlrd
+    except ImportError as exc:
+        raise ImportError("Reading .xls exports requires the 'xlrd' package.") from exc
+
+    scanned = []
+    workbook = xlrd.open_workbook(path, on_demand=True)
+    try:
+        for name in workbook.sheet_names():
+            sheet = workbook.sheet_by_name(name)
+            rows = (
+                tuple(
+                    xlrd.xldate_as_datetime(cell.value, workbook.datemode)
+                    if cell.ctype == xlrd.XL_CELL_DATE
+                    else cell.value
+                    for cell in sheet.row(i)
+                )
+                for i in range(sheet.nrows)
+            )
+            chunks = _iter_sheet_chunks(rows, chunksize, scanned)
+            if chunks is not None:
+                yield from chunks
+                return
+            workbook.unload_sheet(name)
+    finally:
+        workbook.release_resources()
+    raise _no_header_error(path, scanned)
+
+
+def _no_header_error(path: str, scanned: Sequence[Sequence]) -> ValueError:
+    """Explain why no sheet of ``path`` could be read, given the rows searched."""
+
+    if any(cell is not None and _header_key(cell) == CROSS_TAB_HEADER for row in scanned for cell in row):
+        return ValueError(
+            f"{path} is a vehicle class x category cross-tab, which has no date or maker columns "
+            "and is not supported; export the maker-wise report instead."
+        )
+    return ValueError(f"No sheet in {path} has a {'/'.join(COLUMNS)} header row.")
+
+
+def _clean_chunk(df: pd.DataFrame) -> Validated:
+    geo = [column for column in GEO_COLUMNS if column in df.columns]
+    for column in geo:
+        df[column] = df[column].where(df[column].notna(), UNKNOWN_AREA).astype(str).str.strip()
+    return validate(df[COLUMNS + geo])
+
+
 def _load_vahan_records(path: str) -> Iterable[Tuple[str, str, str, int]]:
     """Return iterable of records parsed from the Vahan dataset.
 
     The expected dataset contains columns: ``date``, ``vehicle_category``,
-    ``maker`` and ``registrations``. Any rows missing these fields are
-    dropped. This helper uses :func:`pandas.read_csv` to load a CSV
-    dataset. If reading fails the caller should handle the exception.
+    ``maker`` and ``registrations`` (common header variants such as
+    ``Month`` or ``Manufacturer`` are accepted) and may be a CSV, XLSX or
+    XLS file regardless of its extension. Rows that fail validation (see
+    :mod:`src.validation`) are left out. The file is read lazily in chunks, so errors surface while the
+    records are being consumed and the caller should handle them there.
     """
 
-    df = pd.read_csv(path)
-    df = df.dropna(subset=["date", "vehicle_category", "maker", "registrations"])
-    df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
-    df["registrations"] = pd.to_numeric(df["registrations"], errors="coerce").fillna(0).astype(int)
-    return df[["date", "vehicle_category", "maker", "registrations"]].itertuples(index=False, name=None)
+    for chunk in _iter_vahan_chunks(path):
+        yield from chunk.valid[COLUMNS].itertuples(index=False, name=None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load a Vahan export into SQLite.")
+    parser.add_argument(
+        "--data", default=DATA_PATH, help="Vahan export, or a directory or glob of exports"
+    )
+    parser.add_argument("--db", default=DB_PATH, help="path of the SQLite database")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="rows per insert transaction")
+    parser.add_argument("--force", action="store_true", help="re-ingest even if the file is unchanged")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR, help="where to write the Parquet snapshot")
+    parser.add_argument("--no-snapshot", action="store_true", help="skip writing the Parquet snapshot")
+    parser.add_argument(
+        "--workers", type=int, help="processes parsing files in parallel (default: one per core)"
+    )
+    args = parser.parse_args(argv)
+    snapshot_dir = None if args.no_snapshot else args.snapshot_dir
+    init_db(args.db, args.data, args.chunksize, args.force, snapshot_dir, args.workers)
 
 
 if __name__ == "__main__":
-    init_db()
+    main()
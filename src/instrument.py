@@ -0,0 +1,175 @@
+"""Timing and memory spans around the ingest, transform and dashboard stages.
+
+Wrap a stage in :class:`span`, or decorate a function with it::
+
+    with span("ingest.refresh_rollups"):
+        refresh_rollups(conn)
+
+    @span("transform.compute_yoy_qoq")
+    def compute_yoy_qoq(df): ...
+
+Spans nest, and each finished one becomes a :class:`Span` record. Records go
+to the sink named by the ``VAHAN_METRICS`` environment variable. With
+``log``, each record is logged as one JSON object on the ``vahan.metrics``
+logger. Any other value is the path of a JSON Lines file that records are
+appended to. A thread that called :func:`start_recording` also gets the
+records in a list; the dashboard uses that for its debug panel. With no sink
+and no recording, a span costs two clock reads.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import ContextDecorator, contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+METRICS_ENV = "VAHAN_METRICS"
+
+logger = logging.getLogger("vahan.metrics")
+
+_STACK: ContextVar[Tuple[str, ...]] = ContextVar("vahan_span_stack", default=())
+_RECORDING: ContextVar[Optional[List["Span"]]] = ContextVar("vahan_span_recording", default=None)
+_FILE_LOCK = threading.Lock()
+
+
+@dataclass
+class Span:
+    """One finished stage: wall time and process memory around it."""
+
+    name: str
+    seconds: float
+    rss_mb: float
+    rss_delta_mb: float
+    peak_rss_mb: float
+    depth: int = 0
+    parent: Optional[str] = None
+    started: float = 0.0
+    pid: int = 0
+    fields: dict = field(default_factory=dict)
+
+
+class span(ContextDecorator):
+    """Time the enclosed block (or every call of a decorated function).
+
+    Keyword arguments, and anything added to ``fields`` inside the block,
+    are kept on the record (row counts, paths, cache hits). A block that
+    raises is recorded with the exception's type in ``fields["error"]``.
+    """
+
+    def __init__(self, name: str, **fields):
+        self.name = name
+        self.fields = fields
+
+    def _recreate_cm(self):
+        # A decorated function gets a fresh span per call, so concurrent and
+        # recursive calls do not share state.
+        return type(self)(self.name, **self.fields)
+
+    def __enter__(self) -> "span":
+        self._target = os.environ.get(METRICS_ENV)
+        self._recording = _RECORDING.get()
+        stack = _STACK.get()
+        self._parent = stack[-1] if stack else None
+        self._depth = len(stack)
+        self._token = _STACK.set(stack + (self.name,))
+        self._rss = current_rss_mb() if self._active else 0.0
+        self._started = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        _STACK.reset(self._token)
+        if not self._active:
+            return False
+        if exc_type is not None:
+            self.fields["error"] = exc_type.__name__
+        rss = current_rss_mb()
+        record = Span(
+            name=self.name,
+            seconds=seconds,
+            rss_mb=round(rss, 1),
+            rss_delta_mb=round(rss - self._rss, 1),
+            peak_rss_mb=round(peak_rss_mb(), 1),
+            depth=self._depth,
+            parent=self._parent,
+            started=self._started,
+            pid=os.getpid(),
+            fields=dict(self.fields),
+        )
+        if self._recording is not None:
+            self._recording.append(record)
+        if self._target:
+            _write(record, self._target)
+        return False
+
+    @property
+    def _active(self) -> bool:
+        return bool(self._target) or self._recording is not None
+
+
+def start_recording() -> List[Span]:
+    """Collect the spans finished from now on in this thread (or context).
+
+    Returns the list the records are appended to. A later call starts a
+    fresh list, which is how each dashboard rerun gets only its own spans.
+    """
+
+    spans: List[Span] = []
+    _RECORDING.set(spans)
+    return spans
+
+
+@contextmanager
+def recording() -> Iterator[List[Span]]:
+    """Collect the spans finished inside the ``with`` block."""
+
+    spans: List[Span] = []
+    token = _RECORDING.set(spans)
+    try:
+        yield spans
+    finally:
+        _RECORDING.reset(token)
+
+
+def current_rss_mb() -> float:
+    """Return the resident set size of this process in MiB.
+
+    Read from ``/proc`` where available; elsewhere the peak stands in.
+    """
+
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return peak_rss_mb()
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def peak_rss_mb() -> float:
+    """Return the peak resident set size of this process in MiB."""
+
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ``ru_maxrss`` is reported in bytes on macOS and kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _write(record: Span, target: str):
+    line = json.dumps(asdict(record), default=str)
+    if target == "log":
+        logger.info(line)
+        return
+    with _FILE_LOCK, open(target, "a", encoding="utf-8") as fh:
+        fh.write(line + "\n")
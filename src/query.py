@@ -0,0 +1,643 @@
+import json
+import sqlite3
+from dataclasses import dataclass, replace
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.ranking import movements, rank_makers
+from src.storage import month_key_to_timestamp
+from src.transform import (
+    AggregationContext,
+    growth_pct,
+    lag_start,
+    lagged_values,
+    period_ordinals,
+    windowed_metrics,
+    with_prior_totals,
+)
+
+# Layout of the in-memory fact frame: integer date keys, dictionary-coded
+# dimensions and 32-bit counts.
+FACT_DTYPES = {
+    "day": "int32",
+    "month_key": "int32",
+    "vehicle_category": "category",
+    "maker": "category",
+    "registrations": "int32",
+}
+
+# Makers in :attr:`Dimensions.top_makers`: the largest by registrations
+# over the last twelve months on file.
+TOP_MAKERS = 10
+
+# Monthly rollup holding each geographic level of :attr:`Filters.geo_level`.
+_GEO_ROLLUPS = {"rto": "rollup_rto_month", "state": "rollup_state_month"}
+
+
+@dataclass(frozen=True)
+class Filters:
+    """Dashboard selections expressed against the storage layout.
+
+    Months are ``year * 12 + month - 1`` ordinals and both bounds are
+    inclusive. ``None`` for any field means "no restriction", which lets
+    unrestricted queries use the category-level rollups directly. Setting
+    ``states`` or ``rtos`` moves every query onto the geographic rollups.
+    """
+
+    start_month: Optional[int] = None
+    end_month: Optional[int] = None
+    categories: Optional[Tuple[str, ...]] = None
+    makers: Optional[Tuple[str, ...]] = None
+    states: Optional[Tuple[str, ...]] = None
+    rtos: Optional[Tuple[str, ...]] = None
+
+    @property
+    def geo_level(self) -> Optional[str]:
+        """``"rto"`` or ``"state"`` for the finest area selected, else ``None``."""
+
+        if self.rtos is not None:
+            return "rto"
+        return "state" if self.states is not None else None
+
+    @classmethod
+    def from_selection(
+        cls,
+        start_date=None,
+        end_date=None,
+        categories: Optional[Sequence[str]] = None,
+        makers: Optional[Sequence[str]] = None,
+        states: Optional[Sequence[str]] = None,
+        rtos: Optional[Sequence[str]] = None,
+    ) -> "Filters":
+        return cls(
+            start_month=month_key(start_date) if start_date is not None else None,
+            end_month=month_key(end_date) if end_date is not None else None,
+            categories=tuple(sorted(categories)) if categories is not None else None,
+            makers=tuple(sorted(makers)) if makers is not None else None,
+            states=tuple(sorted(states)) if states is not None else None,
+            rtos=tuple(sorted(rtos)) if rtos is not None else None,
+        )
+
+
+@dataclass(frozen=True)
+class Dimensions:
+    """Values available for filtering, used to build the sidebar."""
+
+    categories: Tuple[str, ...]
+    makers: Tuple[str, ...]
+    start_month: Optional[int]
+    end_month: Optional[int]
+    states: Tuple[str, ...] = ()
+    # ``(state, rto)`` pairs, ordered by state and then RTO.
+    rtos: Tuple[Tuple[str, str], ...] = ()
+    # The :data:`TOP_MAKERS` largest makers, largest first.
+    top_makers: Tuple[str, ...] = ()
+
+
+def month_key(value) -> int:
+    """Return the month ordinal of a date-like ``value``."""
+
+    ts = pd.Timestamp(value)
+    return ts.year * 12 + ts.month - 1
+
+
+def read_dimensions(conn: sqlite3.Connection) -> Dimensions:
+    """Return the category and maker names and the month range on file."""
+
+    categories = tuple(name for (name,) in conn.execute("SELECT name FROM categories ORDER BY name"))
+    makers = tuple(name for (name,) in conn.execute("SELECT name FROM makers ORDER BY name"))
+    start, end = conn.execute(
+        "SELECT MIN(month_key), MAX(month_key) FROM registration_facts"
+    ).fetchone()
+    states = tuple(name for (name,) in conn.execute("SELECT name FROM states ORDER BY name"))
+    rtos = tuple(conn.execute(
+        "SELECT s.name, t.name FROM rtos AS t JOIN states AS s ON s.id = t.state_id ORDER BY s.name, t.name"
+    ))
+    top_makers = tuple(name for (name,) in conn.execute(
+        """
+        SELECT m.name FROM rollup_maker_month AS r JOIN makers AS m ON m.id = r.maker_id
+        WHERE r.month_key > ? - 12
+        GROUP BY r.maker_id ORDER BY SUM(r.registrations) DESC, m.name LIMIT ?
+        """,
+        (end if end is not None else 0, TOP_MAKERS),
+    ))
+    return Dimensions(categories, makers, start, end, states, rtos, top_makers)
+
+
+def read_facts(conn: sqlite3.Connection, filters: Filters = Filters()) -> pd.DataFrame:
+    """Return the raw rows matching ``filters`` in the compact layout.
+
+    The period range is answered from the ``(month_key, category_id, ...)``
+    covering index. Rows come back with ``day`` (``YYYYMMDD``) and
+    ``month_key`` as int32, ``vehicle_category`` and ``maker`` as
+    categoricals built straight from the dimension ids (no string is
+    decoded per row) and int32 ``registrations``; see :data:`FACT_DTYPES`
+    and :func:`expand_facts`. Rows are ordered by day, category and maker.
+    """
+
+    if filters.geo_level is None:
+        where, params = _where(filters, "r.month_key")
+        sql = f"""
+            SELECT r.day, r.month_key, r.category_id, r.maker_id, r.registrations
+            FROM registration_facts AS r
+            {where}
+        """
+    else:
+        # Summed over the selected areas back to the national grain.
+        where, params = _where(filters, "r.month_key", geo="rto")
+        sql = f"""
+            SELECT r.day, r.month_key, r.category_id, r.maker_id, SUM(r.registrations) AS registrations
+            FROM geo_facts AS r
+            {where}
+            GROUP BY r.month_key, r.day, r.category_id, r.maker_id
+        """
+    df = pd.read_sql(sql, conn, params=params)
+    df.insert(2, "vehicle_category", _decode(conn, "categories", df.pop("category_id")))
+    df.insert(3, "maker", _decode(conn, "makers", df.pop("maker_id")))
+    df = df.astype(FACT_DTYPES)
+    return df.sort_values(["day", "vehicle_category", "maker"], ignore_index=True)
+
+
+def expand_facts(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert compact facts into ``date``, ``vehicle_category``, ``maker``,
+    ``registrations`` and ``period`` columns with plain datetimes, for
+    exports and callers that want the readable layout."""
+
+    days = df["day"].to_numpy(dtype="int64")
+    date = pd.to_datetime(
+        pd.DataFrame({"year": days // 10000, "month": days // 100 % 100, "day": days % 100})
+    )
+    return pd.DataFrame({
+        "date": date.to_numpy(),
+        "vehicle_category": df["vehicle_category"].astype(object).to_numpy(),
+        "maker": df["maker"].astype(object).to_numpy(),
+        "registrations": df["registrations"].to_numpy(dtype="int64"),
+        "period": month_key_to_timestamp(df["month_key"]).to_numpy(),
+    })
+
+
+def read_monthly_totals(conn: sqlite3.Connection, filters: Filters = Filters()) -> pd.DataFrame:
+    """Return total registrations per month for ``filters``.
+
+    The aggregation runs in SQLite over the rollups, so the result has one
+    row per month whatever the size of the selection.
+    """
+
+    if filters.geo_level is not None:
+        table, level = _GEO_ROLLUPS[filters.geo_level], filters.geo_level
+    else:
+        table = "rollup_category_month" if filters.makers is None else "rollup_maker_month"
+        level = None
+    where, params = _where(filters, "r.month_key", geo=level)
+    df = pd.read_sql(
+        f"""
+        SELECT r.month_key, SUM(r.registrations) AS registrations
+        FROM {table} AS r
+        {where}
+        GROUP BY r.month_key
+        ORDER BY r.month_key
+        """,
+        conn,
+        params=params,
+    )
+    df.insert(0, "period", month_key_to_timestamp(df.pop("month_key")).values)
+    return df
+
+
+def read_maker_growth(conn: sqlite3.Connection, filters: Filters = Filters()):
+    """Read maker x category growth from the rollup tables.
+
+    Returns frames shaped like :func:`src.transform.compute_yoy_qoq`. Prior
+    periods come from the full history, so a YoY value is available even
+    when the prior year lies outside the selected range, and quarterly
+    figures are whole-quarter totals for every quarter the range touches.
+    An area selection is aggregated from the geographic monthly rollups.
+    """
+
+    if filters.geo_level is not None:
+        monthly, quarterly = _geo_context(conn, filters).maker_growth
+        return _trim_growth(monthly, quarterly, filters, ["maker", "vehicle_category"])
+
+    where, params = _where(filters, "r.month_key")
+    monthly = pd.read_sql(
+        f"""
+        SELECT r.month_key, c.name AS vehicle_category, m.name AS maker,
+               r.registrations, r.prev_year_regs AS registrations_prev_year
+        FROM rollup_maker_month AS r
+        JOIN categories AS c ON c.id = r.category_id
+        JOIN makers AS m ON m.id = r.maker_id
+        {where}
+        """,
+        conn,
+        params=params,
+    )
+    monthly = _with_periods(monthly)
+    monthly["yoy_pct"] = growth_pct(monthly["registrations"], monthly["registrations_prev_year"])
+    monthly = monthly.sort_values(["maker", "vehicle_category", "period"], ignore_index=True)
+
+    where, params = _where(filters, "r.quarter_key", quarterly=True)
+    quarterly = pd.read_sql(
+        f"""
+        SELECT r.quarter_key, c.name AS vehicle_category, m.name AS maker,
+               r.registrations, r.prev_q_regs
+        FROM rollup_maker_quarter AS r
+        JOIN categories AS c ON c.id = r.category_id
+        JOIN makers AS m ON m.id = r.maker_id
+        {where}
+        """,
+        conn,
+        params=params,
+    )
+    quarterly = _with_quarters(quarterly)
+    quarterly["qoq_pct"] = growth_pct(quarterly["registrations"], quarterly["prev_q_regs"])
+    quarterly = quarterly.sort_values(["maker", "vehicle_category", "quarter"], ignore_index=True)
+
+    monthly = monthly[
+        ["period", "vehicle_category", "maker", "registrations",
+         "registrations_prev_year", "yoy_pct", "quarter"]
+    ]
+    quarterly = quarterly[
+        ["quarter", "vehicle_category", "maker", "registrations", "prev_q_regs", "qoq_pct"]
+    ]
+    return monthly, quarterly
+
+
+def read_category_growth(conn: sqlite3.Connection, filters: Filters = Filters()):
+    """Read category growth from the rollup tables.
+
+    Returns frames shaped like :func:`src.transform.compute_category_growth`.
+    Without a maker restriction the category rollups are read as-is;
+    otherwise the maker rollups of the selected makers are summed, and the
+    prior periods are taken from those sums.
+    """
+
+    if filters.geo_level is not None:
+        monthly, quarterly = _geo_context(conn, filters).category_growth
+        return _trim_growth(monthly, quarterly, filters, ["vehicle_category"])
+
+    if filters.makers is None:
+        where, params = _where(filters, "r.month_key")
+        monthly = pd.read_sql(
+            f"""
+            SELECT r.month_key, c.name AS vehicle_category, r.registrations, r.prev_year_regs
+            FROM rollup_category_month AS r
+            JOIN categories AS c ON c.id = r.category_id
+            {where}
+            """,
+            conn,
+            params=params,
+        )
+        where, params = _where(filters, "r.quarter_key", quarterly=True)
+        quarterly = pd.read_sql(
+            f"""
+            SELECT r.quarter_key, c.name AS vehicle_category, r.registrations, r.prev_q_regs
+            FROM rollup_category_quarter AS r
+            JOIN categories AS c ON c.id = r.category_id
+            {where}
+            """,
+            conn,
+            params=params,
+        )
+    else:
+        # Prior totals come from the selected makers' summed series, so a
+        # maker with nothing in the current period still counts in the prior one.
+        monthly = _summed_with_prior(conn, filters, "rollup_maker_month", "month_key", 12, "prev_year_regs")
+        quarterly = _summed_with_prior(conn, filters, "rollup_maker_quarter", "quarter_key", 1, "prev_q_regs")
+
+    monthly = _with_periods(monthly)
+    monthly["yoy_pct"] = growth_pct(monthly["registrations"], monthly["prev_year_regs"])
+    monthly = monthly.sort_values(["vehicle_category", "period"], ignore_index=True)
+
+    quarterly = _with_quarters(quarterly)
+    quarterly["qoq_pct"] = growth_pct(quarterly["registrations"], quarterly["prev_q_regs"])
+    quarterly = quarterly.sort_values(["vehicle_category", "quarter"], ignore_index=True)
+
+    monthly = monthly[
+        ["period", "vehicle_category", "registrations", "quarter", "prev_year_regs", "yoy_pct"]
+    ]
+    quarterly = quarterly[["quarter", "vehicle_category", "registrations", "prev_q_regs", "qoq_pct"]]
+    return monthly, quarterly
+
+
+def read_windowed_metrics(conn: sqlite3.Connection, filters: Filters = Filters()):
+    """Read YTD, FYTD, trailing-window and share metrics from the rollups.
+
+    Returns frames shaped like :func:`src.transform.compute_windowed_metrics`.
+    Windows reach back into the full history whatever the date range. Maker
+    shares are always of the whole category; the category rows sum only the
+    selected makers, as in :func:`read_category_growth`.
+    """
+
+    monthly = _with_periods(_read_maker_months(
+        conn, Filters(categories=filters.categories, states=filters.states, rtos=filters.rtos)
+    ))
+    makers = windowed_metrics(monthly, ("vehicle_category", "maker"), share_of=("vehicle_category",))
+    if filters.makers is not None:
+        monthly = monthly[monthly["maker"].isin(filters.makers)]
+        makers = makers[makers["maker"].isin(filters.makers)]
+    categories = windowed_metrics(
+        monthly.groupby(["period", "vehicle_category"], as_index=False)["registrations"].sum()
+    )
+
+    def in_range(df):
+        keys = period_ordinals(df["period"])
+        mask = np.ones(len(df), dtype=bool)
+        if filters.start_month is not None:
+            mask &= keys >= filters.start_month
+        if filters.end_month is not None:
+            mask &= keys <= filters.end_month
+        return df[mask].reset_index(drop=True)
+
+    return in_range(makers), in_range(categories)
+
+
+def read_geo_totals(
+    conn: sqlite3.Connection, filters: Filters = Filters(), level: str = "state"
+) -> pd.DataFrame:
+    """Registrations per state (or per RTO, with ``level="rto"``) and month.
+
+    Read from the geographic rollups, restricted by every field of
+    ``filters``. Returns ``period``, ``state`` (and ``rto``),
+    ``registrations``, ``prev_year_regs`` and ``yoy_pct``, ordered by area
+    and month; the prior year comes from the full history.
+    """
+
+    if level not in _GEO_ROLLUPS:
+        raise ValueError(f"Unknown geographic level: {level!r}")
+    names = ["state"] if level == "state" else ["state", "rto"]
+    source = "rto" if level == "rto" or filters.rtos is not None else "state"
+    if source == "rto":
+        joins = """
+            JOIN rtos AS t ON t.id = r.rto_id
+            JOIN states AS s ON s.id = t.state_id
+        """
+    else:
+        joins = "JOIN states AS s ON s.id = r.state_id"
+    group = "s.id" if level == "state" else "t.id"
+    start = None if filters.start_month is None else filters.start_month - 12
+    where, params = _where(replace(filters, start_month=start), "r.month_key", geo=source)
+    df = pd.read_sql(
+        f"""
+        SELECT r.month_key, s.name AS state{", t.name AS rto" if level == "rto" else ""},
+               SUM(r.registrations) AS registrations
+        FROM {_GEO_ROLLUPS[source]} AS r
+        {joins}
+        {where}
+        GROUP BY {group}, r.month_key
+        """,
+        conn,
+        params=params,
+    )
+    keys = df["month_key"].to_numpy("int64")
+    codes = df.groupby(names, sort=False).ngroup().to_numpy()
+    previous = lagged_values(codes, keys, df["registrations"].to_numpy("float64"), 12)
+    df["prev_year_regs"] = pd.Series(previous, index=df.index).fillna(0).astype("int64")
+    df["yoy_pct"] = growth_pct(df["registrations"], df["prev_year_regs"])
+    if filters.start_month is not None:
+        df = df[keys >= filters.start_month]
+    df = df.sort_values([*names, "month_key"], ignore_index=True)
+    df.insert(0, "period", month_key_to_timestamp(df.pop("month_key")).values)
+    return df
+
+
+def read_rankings(
+    conn: sqlite3.Connection, filters: Filters = Filters(), month: Optional[int] = None
+) -> pd.DataFrame:
+    """Maker ranks and market shares within each category for one month.
+
+    ``month`` defaults to the latest month on file up to
+    ``filters.end_month``. Ranks and shares are of the whole category, so
+    ``filters.makers`` only narrows the rows returned. Nationally they are
+    read from ``rollup_maker_rank``; an area selection is ranked in memory
+    (see :func:`src.ranking.rank_makers`) from its rollup over the month and
+    the year before it. Returns ``period``, ``vehicle_category``, ``maker``,
+    ``registrations`` and :data:`src.ranking.RANK_COLUMNS`, by category and
+    rank.
+    """
+
+    if month is None:
+        where, params = _where(Filters(end_month=filters.end_month), "r.month_key")
+        month = conn.execute(f"SELECT MAX(r.month_key) FROM rollup_maker_rank AS r {where}", params).fetchone()[0]
+    if month is None:
+        # Nothing on file: every read below comes back empty.
+        month = -1
+    if filters.geo_level is None:
+        where, params = _where(replace(filters, start_month=month, end_month=month), "r.month_key")
+        ranked = movements(pd.read_sql(
+            f"""
+            SELECT r.month_key, c.name AS vehicle_category, m.name AS maker, r.registrations,
+                   r.rank, r.prev_rank, r.share_pct, r.prev_share_pct, r.prev_year_share_pct
+            FROM rollup_maker_rank AS r
+            JOIN categories AS c ON c.id = r.category_id
+            JOIN makers AS m ON m.id = r.maker_id
+            {where}
+            """,
+            conn,
+            params=params,
+        ))
+    else:
+        ranked = rank_makers(_read_maker_months(
+            conn, replace(filters, start_month=month - 12, end_month=month, makers=None)
+        ))
+        ranked = ranked[ranked["month_key"] == month]
+        if filters.makers is not None:
+            ranked = ranked[ranked["maker"].isin(filters.makers)]
+    ranked = ranked.sort_values(["vehicle_category", "rank", "maker"], ignore_index=True)
+    ranked.insert(0, "period", month_key_to_timestamp(ranked.pop("month_key")).values)
+    return ranked
+
+
+def read_anomalies(
+    conn: sqlite3.Connection, filters: Filters = Filters(), limit: Optional[int] = None
+) -> pd.DataFrame:
+    """Read the stored anomaly scan (see :mod:`src.anomaly`) for ``filters``.
+
+    Rows are shaped like :func:`src.anomaly.scan`, newest month first and
+    strongest first within a month; ``limit`` caps the number returned.
+    """
+
+    where, params = _where(filters, "r.month_key")
+    if limit is not None:
+        params.append(limit)
+    df = pd.read_sql(
+        f"""
+        SELECT r.month_key, c.name AS vehicle_category, m.name AS maker,
+               r.kind, r.score, r.registrations, r.expected
+        FROM anomalies AS r
+        JOIN categories AS c ON c.id = r.category_id
+        JOIN makers AS m ON m.id = r.maker_id
+        {where}
+        ORDER BY r.month_key DESC, abs(r.score) DESC
+        {"LIMIT ?" if limit is not None else ""}
+        """,
+        conn,
+        params=params,
+    )
+    df.insert(0, "period", month_key_to_timestamp(df.pop("month_key")).values)
+    return df
+
+
+def _where(filters: Filters, key_column: str, quarterly: bool = False, geo: Optional[str] = None):
+    """Return a ``WHERE`` clause and its parameters for ``filters``.
+
+    Name lists are bound as a single JSON parameter and expanded with
+    ``json_each`` so the statement text does not depend on selection size.
+    ``geo`` names the area column of the table, ``"rto"`` (``r.rto_id``) or
+    ``"state"`` (``r.state_id``); without it the area filters are ignored.
+    """
+
+    clauses: List[str] = []
+    params: List = []
+    if filters.start_month is not None:
+        clauses.append(f"{key_column} >= ?")
+        params.append(filters.start_month // 3 if quarterly else filters.start_month)
+    if filters.end_month is not None:
+        clauses.append(f"{key_column} <= ?")
+        params.append(filters.end_month // 3 if quarterly else filters.end_month)
+    if filters.categories is not None:
+        clauses.append(
+            "r.category_id IN (SELECT id FROM categories"
+            " WHERE name IN (SELECT value FROM json_each(?)))"
+        )
+        params.append(json.dumps(filters.categories))
+    if filters.makers is not None:
+        clauses.append(
+            "r.maker_id IN (SELECT id FROM makers"
+            " WHERE name IN (SELECT value FROM json_each(?)))"
+        )
+        params.append(json.dumps(filters.makers))
+    if geo == "state" and filters.states is not None:
+        clauses.append(
+            "r.state_id IN (SELECT id FROM states"
+            " WHERE name IN (SELECT value FROM json_each(?)))"
+        )
+        params.append(json.dumps(filters.states))
+    elif geo == "rto" and filters.geo_level is not None:
+        areas = []
+        if filters.states is not None:
+            areas.append("s.name IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(filters.states))
+        if filters.rtos is not None:
+            areas.append("t.name IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(filters.rtos))
+        clauses.append(
+            "r.rto_id IN (SELECT t.id FROM rtos AS t JOIN states AS s ON s.id = t.state_id"
+            " WHERE " + " AND ".join(areas) + ")"
+        )
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    return where, params
+
+
+def _summed_with_prior(
+    conn: sqlite3.Connection, filters: Filters, table: str, key_column: str, lag: int, prev_column: str
+) -> pd.DataFrame:
+    """Category totals of the selected makers from a maker rollup, with the
+    total ``lag`` periods earlier in ``prev_column``.
+
+    The range is widened by ``lag`` periods so the prior total of the first
+    selected period is read, then cut back.
+    """
+
+    quarterly = key_column == "quarter_key"
+    widened = replace(filters, start_month=lag_start(filters.start_month, lag, quarterly))
+    where, params = _where(widened, f"r.{key_column}", quarterly=quarterly)
+    df = pd.read_sql(
+        f"""
+        SELECT r.{key_column}, c.name AS vehicle_category, SUM(r.registrations) AS registrations
+        FROM {table} AS r
+        JOIN categories AS c ON c.id = r.category_id
+        {where}
+        GROUP BY r.{key_column}, c.name
+        """,
+        conn,
+        params=params,
+    )
+    return with_prior_totals(
+        df, df[key_column].to_numpy("int64"), lag, prev_column, filters.start_month, quarterly
+    )
+
+
+def _read_maker_months(conn: sqlite3.Connection, filters: Filters) -> pd.DataFrame:
+    """Monthly registrations per category and maker for ``filters``.
+
+    Served from ``rollup_maker_month``, or summed over the selected areas
+    of the geographic rollup for an area selection.
+    """
+
+    level = filters.geo_level
+    if level is None:
+        table, registrations, group = "rollup_maker_month", "r.registrations", ""
+    else:
+        table, registrations = _GEO_ROLLUPS[level], "SUM(r.registrations)"
+        group = "GROUP BY r.month_key, r.category_id, r.maker_id"
+    where, params = _where(filters, "r.month_key", geo=level)
+    return pd.read_sql(
+        f"""
+        SELECT r.month_key, c.name AS vehicle_category, m.name AS maker,
+               {registrations} AS registrations
+        FROM {table} AS r
+        JOIN categories AS c ON c.id = r.category_id
+        JOIN makers AS m ON m.id = r.maker_id
+        {where}
+        {group}
+        """,
+        conn,
+        params=params,
+    )
+
+
+def _geo_context(conn: sqlite3.Connection, filters: Filters) -> AggregationContext:
+    """Aggregation context over the selected areas' maker months.
+
+    The range is widened to whole quarters and the year before, so every
+    prior period of the selected range is in the context.
+    """
+
+    start, end = filters.start_month, filters.end_month
+    widened = replace(
+        filters,
+        start_month=None if start is None else start // 3 * 3 - 12,
+        end_month=None if end is None else end // 3 * 3 + 2,
+    )
+    return AggregationContext(_read_maker_months(conn, widened))
+
+
+def _trim_growth(monthly: pd.DataFrame, quarterly: pd.DataFrame, filters: Filters, order: List[str]):
+    """Cut :func:`_geo_context` growth frames back to the selected range."""
+
+    months = period_ordinals(monthly["period"])
+    quarters = period_ordinals(quarterly["quarter"], "Q")
+    keep_month = np.ones(len(monthly), dtype=bool)
+    keep_quarter = np.ones(len(quarterly), dtype=bool)
+    if filters.start_month is not None:
+        keep_month &= months >= filters.start_month
+        keep_quarter &= quarters >= filters.start_month // 3
+    if filters.end_month is not None:
+        keep_month &= months <= filters.end_month
+        keep_quarter &= quarters <= filters.end_month // 3
+    return (
+        monthly[keep_month].sort_values([*order, "period"], ignore_index=True),
+        quarterly[keep_quarter].sort_values([*order, "quarter"], ignore_index=True),
+    )
+
+
+def _decode(conn: sqlite3.Connection, table: str, ids: pd.Series) -> pd.Categorical:
+    """Map dimension ids onto a categorical whose categories are sorted names."""
+
+    names = conn.execute(f"SELECT id, name FROM {table} ORDER BY name").fetchall()
+    lookup = np.full(max((i for i, _ in names), default=0) + 1, -1, dtype="int32")
+    lookup[[i for i, _ in names]] = np.arange(len(names), dtype="int32")
+    return pd.Categorical.from_codes(lookup[ids.to_numpy()], categories=[n for _, n in names])
+
+
+def _with_periods(df: pd.DataFrame) -> pd.DataFrame:
+    df["period"] = month_key_to_timestamp(df.pop("month_key")).values
+    df["quarter"] = df["period"].dt.to_period("Q").dt.to_timestamp()
+    return df
+
+
+def _with_quarters(df: pd.DataFrame) -> pd.DataFrame:
+    df["quarter"] = month_key_to_timestamp(df.pop("quarter_key") * 3).values
+    return df
@@ -0,0 +1,109 @@
+"""Market share and rank movement of makers within their category.
+
+Ranks and shares are precomputed per month in ``rollup_maker_rank`` as part
+of the rollup refresh (see ``REFRESH_ROLLUPS_SQL`` in :mod:`src.storage`),
+so the dashboard reads one month's ranking instead of ranking the whole
+maker universe on every rerun. :func:`rank_makers` computes the same
+columns in memory, for selections the precomputed table does not cover
+such as a state or RTO.
+
+Views of a ranking only ever show its top or bottom few rows, so
+:func:`top_k` selects them with a partial sort (``numpy.argpartition``):
+linear in the number of makers, with only the ``k`` rows kept sorted.
+"""
+
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.transform import lagged_values, period_ordinals
+
+# Columns added by :func:`rank_makers` and :func:`movements`, in output order.
+RANK_COLUMNS = [
+    "rank",
+    "prev_rank",
+    "rank_change",
+    "share_pct",
+    "share_change_bps",
+    "share_yoy_bps",
+]
+
+
+def rank_makers(monthly: pd.DataFrame, market: Sequence[str] = ("vehicle_category",)) -> pd.DataFrame:
+    """Rank makers by registrations within each ``market`` and month.
+
+    ``monthly`` has ``period`` (or an integer ``month_key``), ``maker``,
+    the ``market`` columns and ``registrations``, one row per maker,
+    market and month. Ranks follow SQL ``RANK()``: ties share the better
+    rank and leave a gap. Adds :data:`RANK_COLUMNS`; see :func:`movements`.
+    """
+
+    frame = monthly.reset_index(drop=True)
+    time = "period" if "period" in frame.columns else "month_key"
+    ordinals = period_ordinals(frame[time]) if time == "period" else frame[time].to_numpy("int64")
+    values = frame["registrations"].to_numpy("float64")
+
+    keys = pd.DataFrame({"month": ordinals, **{column: frame[column] for column in market}})
+    group = keys.groupby(list(keys.columns), sort=False, observed=True).ngroup().to_numpy()
+    totals = np.bincount(group, weights=values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = values / totals[group] * 100
+
+    # One sort by group and falling volume; a row's rank is the position of
+    # the first row in its group with the same volume.
+    order = np.lexsort((-values, group))
+    ordered_group, ordered_values = group[order], values[order]
+    position = np.arange(len(order))
+    starts = np.ones(len(order), dtype=bool)
+    starts[1:] = ordered_group[1:] != ordered_group[:-1]
+    ties = starts.copy()
+    ties[1:] |= ordered_values[1:] != ordered_values[:-1]
+    first_of_tie = np.maximum.accumulate(np.where(ties, position, 0))
+    group_start = np.maximum.accumulate(np.where(starts, position, 0))
+    rank = np.empty(len(order), dtype="int64")
+    rank[order] = first_of_tie - group_start + 1
+
+    series = frame.groupby([*market, "maker"], sort=False, observed=True).ngroup().to_numpy()
+    frame["rank"] = rank
+    frame["prev_rank"] = lagged_values(series, ordinals, rank.astype("float64"), 1)
+    frame["share_pct"] = share
+    frame["prev_share_pct"] = lagged_values(series, ordinals, share, 1)
+    frame["prev_year_share_pct"] = lagged_values(series, ordinals, share, 12)
+    return movements(frame)
+
+
+def movements(ranked: pd.DataFrame) -> pd.DataFrame:
+    """Derive the changes from a ranking's previous rank and shares.
+
+    ``rank_change`` is positive when a maker moved up; ``share_change_bps``
+    and ``share_yoy_bps`` are the change in share, in basis points, from the
+    previous month and from the same month a year earlier. All three are
+    ``NaN`` when the maker had no registrations in that earlier month. The
+    ``prev_share_pct`` and ``prev_year_share_pct`` inputs are dropped.
+    """
+
+    previous = ("prev_rank", "prev_share_pct", "prev_year_share_pct")
+    ranked = ranked.astype({column: "float64" for column in previous})
+    ranked["rank_change"] = ranked["prev_rank"] - ranked["rank"]
+    ranked["share_change_bps"] = (ranked["share_pct"] - ranked.pop("prev_share_pct")) * 100
+    ranked["share_yoy_bps"] = (ranked["share_pct"] - ranked.pop("prev_year_share_pct")) * 100
+    others = [column for column in ranked.columns if column not in RANK_COLUMNS]
+    return ranked[others + RANK_COLUMNS]
+
+
+def top_k(df: pd.DataFrame, k: int, by: str = "registrations", largest: bool = True) -> pd.DataFrame:
+    """The ``k`` rows of ``df`` with the largest (or smallest) ``by``, best first.
+
+    Rows where ``by`` is missing are skipped. Selection is a partial sort,
+    so the cost is linear in ``len(df)`` plus ``k log k``.
+    """
+
+    values = df[by].to_numpy("float64")
+    rows = np.flatnonzero(~np.isnan(values))
+    keys = -values[rows] if largest else values[rows]
+    if len(rows) > k > 0:
+        keep = np.argpartition(keys, k - 1)[:k]
+        rows, keys = rows[keep], keys[keep]
+    rows = rows[np.argsort(keys, kind="stable")][: max(k, 0)]
+    return df.iloc[rows]
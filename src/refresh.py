@@ -0,0 +1,194 @@
+"""Background refresh: ingest new exports from a drop directory.
+
+A :class:`RefreshWorker` thread polls the drop directory and runs
+:func:`refresh_once` off the request path: new or changed files are
+ingested, the rollups and anomaly scan are rebuilt, and the new data
+version is published (see :func:`src.ingest.publish`), all in one
+transaction. Until it commits, readers keep serving the previous published
+version, with its rows, rollups, anomalies and Parquet snapshot; then they
+pick up the new one on their next query::
+
+    python src/refresh.py --drop-dir data/drop --interval 30
+
+The dashboard starts a worker itself when ``VAHAN_DROP_DIR`` is set. Any
+number of processes may run workers against one database; a lock file next
+to it lets one of them ingest at a time and the others skip the pass.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+# Allow running as ``python src/refresh.py`` from the project root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.ingest import CHUNK_SIZE, IngestStats, ingest_files, publish, resolve_sources
+from src.instrument import span
+from src.snapshot import SNAPSHOT_DIR
+from src.storage import DB_PATH, connect, ensure_schema, published_version, staged
+
+DROP_ENV = "VAHAN_DROP_DIR"
+
+# Seconds between passes over the drop directory.
+POLL_SECONDS = 30.0
+
+# Files modified more recently than this are assumed to be still copying
+# and are left for a later pass.
+SETTLE_SECONDS = 5.0
+
+logger = logging.getLogger("vahan.refresh")
+
+
+@span("refresh.pass")
+def refresh_once(
+    drop_dir: str,
+    db_path: str = DB_PATH,
+    snapshot_dir: Optional[str] = SNAPSHOT_DIR,
+    chunksize: int = CHUNK_SIZE,
+    workers: Optional[int] = 1,
+    settle: float = SETTLE_SECONDS,
+) -> Optional[IngestStats]:
+    """Ingest the settled files under ``drop_dir`` and publish the result.
+
+    Files already ingested unchanged are skipped cheaply, so the whole
+    directory is offered on every pass; the published version only moves
+    when the data changed. Returns the ingest stats, or ``None`` when
+    another process holds the refresh lock.
+    """
+
+    now = time.time()
+    paths = [path for path in resolve_sources(drop_dir) if now - os.stat(path).st_mtime >= settle]
+    with _refresh_lock(db_path) as held:
+        if not held:
+            return None
+        conn = connect(db_path)
+        try:
+            ensure_schema(conn)
+            before = published_version(conn)
+            # The pass is one transaction, committed with the version it
+            # publishes; publishing also picks up months left dirty, or
+            # artefacts left stale, by a pass that stopped part way, and is
+            # a no-op when all is current.
+            with staged(conn):
+                stats = ingest_files(conn, paths, chunksize=chunksize, workers=workers) if paths else IngestStats()
+                for source, error in stats.failed:
+                    logger.warning("Could not ingest %s (%s).", source, error)
+                version = publish(conn, snapshot_dir)
+            if stats.changed or version != before:
+                logger.info("Published data version %s: %s", version, stats)
+        finally:
+            conn.close()
+    return stats
+
+
+class RefreshWorker(threading.Thread):
+    """Daemon thread running :func:`refresh_once` every ``interval`` seconds.
+
+    A failed pass is logged and kept in ``last_error``; the next pass tries
+    again. Files are parsed in this process by default, since forking a
+    pool from a threaded server is unsafe.
+    """
+
+    def __init__(
+        self,
+        drop_dir: str,
+        db_path: str = DB_PATH,
+        snapshot_dir: Optional[str] = SNAPSHOT_DIR,
+        interval: float = POLL_SECONDS,
+        **options,
+    ):
+        super().__init__(name="vahan-refresh", daemon=True)
+        self.drop_dir = drop_dir
+        self.db_path = db_path
+        self.snapshot_dir = snapshot_dir
+        self.interval = interval
+        self.options = options
+        self.passes = 0
+        self.last_stats: Optional[IngestStats] = None
+        self.last_error: Optional[str] = None
+        self.last_run: Optional[float] = None
+        self._stopping = threading.Event()
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                stats = refresh_once(self.drop_dir, self.db_path, self.snapshot_dir, **self.options)
+            except Exception as exc:
+                logger.exception("Refresh of %s failed.", self.drop_dir)
+                self.last_error = f"{type(exc).__name__}: {exc}"
+            else:
+                if stats is not None:
+                    self.last_stats, self.last_error = stats, None
+            self.passes += 1
+            self.last_run = time.time()
+            self._stopping.wait(self.interval)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop after the current pass and wait up to ``timeout`` seconds for it."""
+
+        self._stopping.set()
+        self.join(timeout)
+
+
+@contextmanager
+def _refresh_lock(db_path: str) -> Iterator[bool]:
+    """Hold the database's refresh lock without waiting; yield whether it was taken."""
+
+    if fcntl is None:
+        yield True
+        return
+    with open(db_path + ".refresh.lock", "a") as fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest new Vahan exports from a drop directory.")
+    parser.add_argument(
+        "--drop-dir",
+        default=os.environ.get(DROP_ENV),
+        required=DROP_ENV not in os.environ,
+        help=f"directory of exports to watch (default: ${DROP_ENV})",
+    )
+    parser.add_argument("--db", default=DB_PATH, help="path of the SQLite database")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR, help="where to write the Parquet snapshot")
+    parser.add_argument("--interval", type=float, default=POLL_SECONDS, help="seconds between passes")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="rows per insert transaction")
+    parser.add_argument(
+        "--workers", type=int, help="processes parsing files in parallel (default: one per core)"
+    )
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    options = dict(chunksize=args.chunksize, workers=args.workers)
+    if args.once:
+        refresh_once(args.drop_dir, args.db, args.snapshot_dir, **options)
+        return
+    worker = RefreshWorker(args.drop_dir, args.db, args.snapshot_dir, args.interval, **options)
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(1.0)
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
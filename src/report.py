@@ -0,0 +1,307 @@
+"""Run the dashboard analytics without Streamlit.
+
+The growth tables for the whole history are read from the rollups once and
+every filter preset is answered from them in memory, so a nightly job can
+produce any number of reports for the cost of a single load. Presets that
+select states or RTOs are read from the geographic rollups instead::
+
+    python src/report.py --presets presets.json --output-dir reports --formats json,csv
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.data_processing import get_key_insight
+from src.filters import FilterIndex
+from src.query import Filters, read_category_growth, read_maker_growth, read_monthly_totals
+from src.storage import DB_PATH, connect, data_version
+from src.transform import growth_pct, lag_start, with_prior_totals
+
+FORMATS = ("json", "csv", "parquet")
+
+# Tables written for every preset, in output order.
+TABLES = (
+    "category_yoy",
+    "category_qoq",
+    "top_makers_yoy",
+    "top_makers_qoq",
+    "trend",
+    "category_trend",
+)
+
+
+@dataclass
+class Report:
+    """Everything the dashboard shows for one filter selection."""
+
+    name: str
+    filters: Filters
+    latest_period: Optional[pd.Timestamp] = None
+    latest_total: int = 0
+    total_yoy: Optional[float] = None
+    insight: Optional[str] = None
+    tables: Dict[str, pd.DataFrame] = field(default_factory=dict)
+
+    def summary(self) -> dict:
+        return {
+            "name": self.name,
+            "filters": {
+                "start_month": self.filters.start_month,
+                "end_month": self.filters.end_month,
+                "categories": self.filters.categories,
+                "makers": self.filters.makers,
+                "states": self.filters.states,
+                "rtos": self.filters.rtos,
+            },
+            "latest_period": self.latest_period.strftime("%Y-%m") if self.latest_period is not None else None,
+            "latest_total": self.latest_total,
+            "total_yoy": self.total_yoy,
+            "insight": self.insight,
+        }
+
+
+class GrowthTables:
+    """Full-history growth tables, filtered in memory per preset.
+
+    :meth:`select` returns the same frames as running
+    :func:`src.query.read_maker_growth`, :func:`src.query.read_category_growth`
+    and :func:`src.query.read_monthly_totals` with the given filters.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.version = data_version(conn)
+        self.monthly, self.quarterly = read_maker_growth(conn)
+        self.cat_month, self.cat_quarter = read_category_growth(conn)
+        self._monthly = FilterIndex(self.monthly, _month_keys(self.monthly["period"]))
+        self._quarterly = FilterIndex(self.quarterly, _month_keys(self.quarterly["quarter"]) // 3, quarterly=True)
+        self._cat_month = FilterIndex(self.cat_month, _month_keys(self.cat_month["period"]))
+        self._cat_quarter = FilterIndex(
+            self.cat_quarter, _month_keys(self.cat_quarter["quarter"]) // 3, quarterly=True
+        )
+
+    def select(self, filters: Filters):
+        """Return ``(monthly, quarterly, cat_month, cat_quarter, trend)``.
+
+        Contiguous maker selections (one maker over a range, say) are views
+        of the full tables rather than copies, so treat the frames as
+        read-only.
+        """
+
+        monthly = self._monthly.select(filters)
+        quarterly = self._quarterly.select(filters)
+
+        if filters.makers is None:
+            cat_month = self._cat_month.select(filters)
+            cat_quarter = self._cat_quarter.select(filters)
+        else:
+            # Mirrors the SQL path: sum the selected makers' rollups, reading
+            # back far enough for the prior period of the first one.
+            cat_month = _summed_with_prior(self._monthly, filters, "period", 12, "prev_year_regs")
+            cat_month["quarter"] = cat_month["period"].dt.to_period("Q").dt.to_timestamp()
+            cat_month["yoy_pct"] = growth_pct(cat_month["registrations"], cat_month["prev_year_regs"])
+            cat_month = cat_month[
+                ["period", "vehicle_category", "registrations", "quarter", "prev_year_regs", "yoy_pct"]
+            ]
+            cat_quarter = _summed_with_prior(self._quarterly, filters, "quarter", 1, "prev_q_regs")
+            cat_quarter["qoq_pct"] = growth_pct(cat_quarter["registrations"], cat_quarter["prev_q_regs"])
+
+        cat_month = cat_month.sort_values(["vehicle_category", "period"], ignore_index=True)
+        cat_quarter = cat_quarter.sort_values(["vehicle_category", "quarter"], ignore_index=True)
+        trend = cat_month.groupby("period", as_index=False)["registrations"].sum()
+        return (
+            monthly.set_axis(pd.RangeIndex(len(monthly)), copy=False),
+            quarterly.set_axis(pd.RangeIndex(len(quarterly)), copy=False),
+            cat_month,
+            cat_quarter,
+            trend,
+        )
+
+
+def summarize(
+    name: str,
+    filters: Filters,
+    monthly: pd.DataFrame,
+    quarterly: pd.DataFrame,
+    cat_month: pd.DataFrame,
+    cat_quarter: pd.DataFrame,
+    trend: pd.DataFrame,
+) -> Report:
+    """Derive the dashboard's headline figures and tables.
+
+    The inputs are the frames returned by the ``read_*`` query functions
+    (or :meth:`GrowthTables.select`) for ``filters``.
+    """
+
+    report = Report(name, filters)
+    if cat_month.empty:
+        return report
+
+    latest_period = cat_month["period"].max()
+    cat_latest = cat_month[cat_month["period"] == latest_period]
+    latest_total = int(cat_latest["registrations"].sum())
+    # Each category's prior-year total, also for categories with nothing in
+    # the latest month (their prior year is only in range as its own rows).
+    prior_year = cat_month.loc[cat_month["period"] == latest_period - pd.DateOffset(years=1)]
+    total_prev_year = (
+        cat_latest.set_index("vehicle_category")["prev_year_regs"]
+        .combine_first(prior_year.set_index("vehicle_category")["registrations"])
+        .sum()
+    )
+
+    report.latest_period = latest_period
+    report.latest_total = latest_total
+    if total_prev_year > 0:
+        report.total_yoy = round(100 * (latest_total - total_prev_year) / total_prev_year, 2)
+
+    latest_q = cat_quarter["quarter"].max()
+    report.tables = {
+        "category_yoy": cat_latest[["vehicle_category", "registrations", "prev_year_regs", "yoy_pct"]],
+        "category_qoq": cat_quarter.loc[
+            cat_quarter["quarter"] == latest_q,
+            ["vehicle_category", "registrations", "prev_q_regs", "qoq_pct"],
+        ],
+        "top_makers_yoy": monthly.loc[
+            monthly["period"] == latest_period,
+            ["maker", "vehicle_category", "registrations", "registrations_prev_year", "yoy_pct"],
+        ].sort_values("yoy_pct", ascending=False),
+        "top_makers_qoq": quarterly.loc[
+            quarterly["quarter"] == latest_q,
+            ["maker", "vehicle_category", "registrations", "prev_q_regs", "qoq_pct"],
+        ].sort_values("qoq_pct", ascending=False),
+        "trend": trend,
+        "category_trend": cat_month[["period", "vehicle_category", "registrations"]],
+    }
+    report.insight = get_key_insight(cat_month.assign(date=cat_month["period"]))
+    return report
+
+
+def preset_filters(preset: dict) -> Filters:
+    """Build :class:`Filters` from a preset such as
+    ``{"name": "ev", "start": "2024-01", "categories": ["E-RICKSHAW"]}``,
+    optionally narrowed with ``"states"`` and ``"rtos"``."""
+
+    return Filters.from_selection(
+        preset.get("start"),
+        preset.get("end"),
+        preset.get("categories"),
+        preset.get("makers"),
+        preset.get("states"),
+        preset.get("rtos"),
+    )
+
+
+def run_presets(conn: sqlite3.Connection, presets: Sequence[dict]) -> List[Report]:
+    """Load the growth tables once and summarize every preset from them.
+
+    The national tables cannot be narrowed to an area, so presets with
+    states or RTOs are read from the geographic rollups one by one.
+    """
+
+    tables = GrowthTables(conn)
+    reports = []
+    for preset in presets:
+        filters = preset_filters(preset)
+        if filters.geo_level is None:
+            frames = tables.select(filters)
+        else:
+            frames = (
+                *read_maker_growth(conn, filters),
+                *read_category_growth(conn, filters),
+                read_monthly_totals(conn, filters),
+            )
+        reports.append(summarize(preset["name"], filters, *frames))
+    return reports
+
+
+def write_report(report: Report, output_dir: str, formats: Sequence[str] = ("json",)) -> str:
+    """Write ``report`` under ``output_dir/<name>/`` and return that directory.
+
+    ``summary.json`` always holds the headline figures; each table is
+    written once per requested format.
+    """
+
+    target = os.path.join(output_dir, _slug(report.name))
+    os.makedirs(target, exist_ok=True)
+    with open(os.path.join(target, "summary.json"), "w") as fh:
+        json.dump(report.summary(), fh, indent=2)
+    for table in TABLES:
+        df = report.tables.get(table)
+        if df is None:
+            continue
+        path = os.path.join(target, table)
+        if "json" in formats:
+            df.to_json(path + ".json", orient="records", date_format="iso", indent=2)
+        if "csv" in formats:
+            df.to_csv(path + ".csv", index=False)
+        if "parquet" in formats:
+            df.to_parquet(path + ".parquet", index=False)
+    return target
+
+
+def _summed_with_prior(
+    index: FilterIndex, filters: Filters, time: str, lag: int, prev_column: str
+) -> pd.DataFrame:
+    """Category totals of the selected makers, with the total ``lag``
+    periods earlier in ``prev_column``; the in-memory counterpart of the
+    SQL sums behind :func:`src.query.read_category_growth`."""
+
+    quarterly = time == "quarter"
+    widened = replace(filters, start_month=lag_start(filters.start_month, lag, quarterly))
+    sums = index.select(widened).groupby([time, "vehicle_category"], as_index=False, observed=True).agg(
+        registrations=("registrations", "sum")
+    )
+    ordinals = _month_keys(sums[time]) // (3 if quarterly else 1)
+    return with_prior_totals(sums, ordinals, lag, prev_column, filters.start_month, quarterly)
+
+
+def _month_keys(periods: pd.Series):
+    return periods.dt.year.to_numpy() * 12 + periods.dt.month.to_numpy() - 1
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "report"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write dashboard reports for filter presets.")
+    parser.add_argument("--db", default=DB_PATH, help="path of the SQLite database")
+    parser.add_argument(
+        "--presets",
+        help="JSON file with a list of presets (name, start, end, categories, makers); "
+        "defaults to a single unfiltered report",
+    )
+    parser.add_argument("--output-dir", default="reports", help="where to write the reports")
+    parser.add_argument("--formats", default="json", help=f"comma separated subset of {', '.join(FORMATS)}")
+    args = parser.parse_args(argv)
+
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown formats: {', '.join(sorted(unknown))}")
+    if args.presets:
+        with open(args.presets) as fh:
+            presets = json.load(fh)
+    else:
+        presets = [{"name": "all"}]
+
+    conn = connect(args.db)
+    try:
+        reports = run_presets(conn, presets)
+    finally:
+        conn.close()
+    for report in reports:
+        target = write_report(report, args.output_dir, formats)
+        print(f"{report.name}: {report.insight or 'no data'} -> {target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import itertools
+import os
+import shutil
+import sqlite3
+from typing import Iterator, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from src.query import FACT_DTYPES, Filters, read_facts
+from src.storage import data_version
+
+SNAPSHOT_DIR = "data/snapshot"
+
+# Rows fetched from SQLite per Arrow record batch while writing.
+BATCH_ROWS = 100_000
+
+SNAPSHOT_SCHEMA = pa.schema([
+    ("date", pa.date32()),
+    ("month_key", pa.int32()),
+    ("maker", pa.string()),
+    ("registrations", pa.int64()),
+    ("year", pa.int16()),
+    ("vehicle_category", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("year", pa.int16()), ("vehicle_category", pa.string())]),
+    flavor="hive",
+)
+
+# Partition values come back dictionary-encoded, and so does ``maker``:
+# Parquet already stores it dictionary-encoded on disk, so reading it as an
+# Arrow dictionary skips materialising one string per row.
+READ_PARTITIONING = ds.HivePartitioning.discover(
+    infer_dictionary=True,
+    schema=pa.schema([("year", pa.int16()), ("vehicle_category", pa.dictionary(pa.int32(), pa.string()))]),
+)
+READ_FORMAT = ds.ParquetFileFormat(read_options={"dictionary_columns": ["maker"]})
+
+FACTS_SQL = """
+    SELECT r.day, r.month_key, m.name, r.registrations, c.name
+    FROM registration_facts AS r
+    JOIN categories AS c ON c.id = r.category_id
+    JOIN makers AS m ON m.id = r.maker_id
+    WHERE r.month_key >= ? AND r.month_key < ?
+    ORDER BY r.month_key, r.category_id, r.maker_id
+"""
+
+
+def snapshot_version(root: str = SNAPSHOT_DIR) -> Optional[int]:
+    """Return the data version of the published snapshot, if any."""
+
+    try:
+        with open(os.path.join(root, "CURRENT")) as fh:
+            return int(fh.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(conn: sqlite3.Connection, root: str = SNAPSHOT_DIR) -> int:
+    """Write the facts as a Parquet dataset partitioned by year and category.
+
+    Only the years whose months were refreshed since the snapshot under
+    ``root`` was written (``snapshot_dirty_months``) are read back from
+    SQLite; the other year partitions are hard-linked from that snapshot,
+    whose files are never modified. Without one, every year is written.
+    Rows are streamed in record batches, so memory stays bounded by
+    :data:`BATCH_ROWS`. The dataset is written to a scratch directory,
+    renamed to one named after the current data version and only then
+    published by atomically replacing the ``CURRENT`` pointer. The version
+    it replaces is kept, so readers still on it can go on reading until
+    they move to the new one. Returns the version written.
+    """
+
+    version = data_version(conn)
+    previous = snapshot_version(root)
+    final = os.path.join(root, f"v{version}")
+    target = final + ".tmp"
+    shutil.rmtree(target, ignore_errors=True)
+    os.makedirs(root, exist_ok=True)
+
+    # Months still awaiting a rollup refresh count as changed too.
+    dirty = [
+        month_key
+        for (month_key,) in conn.execute(
+            "SELECT month_key FROM snapshot_dirty_months UNION SELECT month_key FROM rollup_dirty_months"
+        )
+    ]
+    written = conn.execute("SELECT value FROM meta WHERE key = 'snapshot_version'").fetchone()
+    base = os.path.join(root, f"v{previous}")
+    if previous is not None and written is not None and written[0] == previous and os.path.isdir(base):
+        years = sorted({month_key // 12 for month_key in dirty})
+        os.makedirs(target)
+        for name in os.listdir(base):
+            if name.startswith("year=") and int(name[5:]) not in years:
+                shutil.copytree(os.path.join(base, name), os.path.join(target, name), copy_function=_link)
+        ranges = [(year * 12, year * 12 + 12) for year in years]
+    else:
+        low, high = conn.execute("SELECT MIN(month_key), MAX(month_key) FROM registration_facts").fetchone()
+        ranges = [] if low is None else [(low, high + 1)]
+
+    # Batches are pulled from SQLite on this thread (the connection is not
+    # shareable) and each is appended as its own set of partition files.
+    batches = itertools.chain.from_iterable(_fact_batches(conn, start, stop) for start, stop in ranges)
+    for index, batch in enumerate(batches):
+        ds.write_dataset(
+            pa.Table.from_batches([batch]),
+            target,
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template=f"part-{version}-{index}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+    os.makedirs(target, exist_ok=True)
+
+    shutil.rmtree(final, ignore_errors=True)
+    os.replace(target, final)
+    pointer = os.path.join(root, "CURRENT.tmp")
+    with open(pointer, "w") as fh:
+        fh.write(str(version))
+    os.replace(pointer, os.path.join(root, "CURRENT"))
+    with conn:
+        conn.executemany("DELETE FROM snapshot_dirty_months WHERE month_key = ?", ((key,) for key in dirty))
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('snapshot_version', ?)", (version,))
+
+    for name in os.listdir(root):
+        if name.startswith("v") and name[1:].isdigit() and int(name[1:]) not in (version, previous):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    return version
+
+
+def read_snapshot(
+    root: str = SNAPSHOT_DIR,
+    filters: Filters = Filters(),
+    columns: Optional[Sequence[str]] = None,
+    version: Optional[int] = None,
+) -> pd.DataFrame:
+    """Read the published snapshot, or a kept ``version``, pruning partitions and columns.
+
+    Files are memory-mapped. The year and category filters skip whole
+    partition directories, the month and maker filters are checked against
+    row-group statistics before any page is decoded, and only ``columns``
+    are read. ``vehicle_category`` and ``maker`` come back as categoricals.
+    """
+
+    if version is None:
+        version = snapshot_version(root)
+    if version is None or not os.path.isdir(os.path.join(root, f"v{version}")):
+        raise FileNotFoundError(f"No snapshot of version {version} under {root}.")
+    dataset = ds.dataset(
+        os.path.join(os.path.abspath(root), f"v{version}"),
+        format=READ_FORMAT,
+        partitioning=READ_PARTITIONING,
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+    table = dataset.to_table(
+        columns=list(columns) if columns is not None else None,
+        filter=_expression(filters),
+    )
+    return table.to_pandas(date_as_object=False)
+
+
+def load_facts(
+    conn: sqlite3.Connection,
+    filters: Filters = Filters(),
+    root: str = SNAPSHOT_DIR,
+    version: Optional[int] = None,
+) -> pd.DataFrame:
+    """Return the rows matching ``filters``, preferring the Parquet snapshot.
+
+    The snapshot is used only when one was written for ``version`` (the
+    current data version by default) and is still kept; otherwise the rows
+    are read from SQLite, as are area selections, which the national
+    snapshot cannot answer. Both paths return the compact layout of
+    :func:`src.query.read_facts`.
+    """
+
+    if version is None:
+        version = data_version(conn)
+    if filters.geo_level is not None or not os.path.isdir(os.path.join(root, f"v{version}")):
+        return read_facts(conn, filters)
+    df = read_snapshot(
+        root, filters, ["date", "month_key", "vehicle_category", "maker", "registrations"], version
+    )
+    date = df.pop("date")
+    df.insert(0, "day", date.dt.year * 10000 + date.dt.month * 100 + date.dt.day)
+    for column in ("vehicle_category", "maker"):
+        # Dictionaries are unified across files in arbitrary order; sort them
+        # so codes order like names, as they do from SQLite.
+        df[column] = df[column].cat.set_categories(sorted(df[column].cat.categories))
+    df = df.astype(FACT_DTYPES)
+    return df.sort_values(["day", "vehicle_category", "maker"], ignore_index=True)
+
+
+def _link(source: str, destination: str):
+    # Partition files are immutable, so versions can share them.
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def _fact_batches(conn: sqlite3.Connection, start: int, stop: int) -> Iterator[pa.RecordBatch]:
+    cursor = conn.execute(FACTS_SQL, (start, stop))
+    while True:
+        rows = cursor.fetchmany(BATCH_ROWS)
+        if not rows:
+            return
+        day, month_key, maker, registrations, category = zip(*rows)
+        days = pd.to_datetime(pd.Series(day, dtype="int64").astype(str), format="%Y%m%d")
+        keys = pd.Series(month_key, dtype="int32")
+        yield pa.RecordBatch.from_arrays(
+            [
+                pa.array(days.to_numpy().astype("datetime64[D]"), type=pa.date32()),
+                pa.array(keys, type=pa.int32()),
+                pa.array(maker, type=pa.string()),
+                pa.array(registrations, type=pa.int64()),
+                pa.array(keys // 12, type=pa.int16()),
+                pa.array(category, type=pa.string()),
+            ],
+            schema=SNAPSHOT_SCHEMA,
+        )
+
+
+def _expression(filters: Filters):
+    expression = None
+
+    def conjoin(term):
+        nonlocal expression
+        expression = term if expression is None else expression & term
+
+    if filters.start_month is not None:
+        conjoin(ds.field("year") >= filters.start_month // 12)
+        conjoin(ds.field("month_key") >= filters.start_month)
+    if filters.end_month is not None:
+        conjoin(ds.field("year") <= filters.end_month // 12)
+        conjoin(ds.field("month_key") <= filters.end_month)
+    if filters.categories is not None:
+        conjoin(ds.field("vehicle_category").isin(list(filters.categories)))
+    if filters.makers is not None:
+        conjoin(ds.field("maker").isin(list(filters.makers)))
+    return expression
@@ -0,0 +1,534 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+DB_PATH = "data/vahan.db"
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "db", "schema.sql")
+
+FACT_UPSERT_SQL = """
+    INSERT INTO registration_facts (day, month_key, category_id, maker_id, registrations)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (day, category_id, maker_id) DO UPDATE
+    SET registrations = excluded.registrations
+    WHERE registrations <> excluded.registrations
+"""
+
+GEO_FACT_UPSERT_SQL = """
+    INSERT INTO geo_facts (month_key, rto_id, category_id, maker_id, day, registrations)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (month_key, rto_id, category_id, maker_id, day) DO UPDATE
+    SET registrations = excluded.registrations
+    WHERE registrations <> excluded.registrations
+"""
+
+# Name used for a missing state or RTO in exports with a geographic breakdown.
+UNKNOWN_AREA = "Unknown"
+
+# Moves rows from the pre-dimension ``registrations`` table (renamed to
+# ``registrations_legacy``) into the integer-coded layout. Rows are replayed
+# in insertion order so the latest duplicate of a natural key wins.
+MIGRATE_LEGACY_SQL = """
+INSERT OR IGNORE INTO categories (name)
+SELECT DISTINCT vehicle_category FROM registrations_legacy;
+
+INSERT OR IGNORE INTO makers (name)
+SELECT DISTINCT maker FROM registrations_legacy;
+
+INSERT OR REPLACE INTO registration_facts (day, month_key, category_id, maker_id, registrations)
+SELECT
+    CAST(replace(substr(r.date, 1, 10), '-', '') AS INTEGER),
+    CAST(substr(r.date, 1, 4) AS INTEGER) * 12 + CAST(substr(r.date, 6, 2) AS INTEGER) - 1,
+    c.id,
+    m.id,
+    r.registrations
+FROM registrations_legacy AS r
+JOIN categories AS c ON c.name = r.vehicle_category
+JOIN makers AS m ON m.name = r.maker
+ORDER BY r.rowid;
+
+DROP TABLE registrations_legacy;
+"""
+
+
+# Rebuilds the rollup rows of every month in ``rollup_dirty_months`` (and the
+# quarters containing them) from the facts, then re-derives the prior-period
+# columns of those periods and of the periods that use them as their prior.
+REFRESH_ROLLUPS_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS dirty_quarters (quarter_key INTEGER PRIMARY KEY);
+DELETE FROM temp.dirty_quarters;
+INSERT OR IGNORE INTO temp.dirty_quarters SELECT month_key / 3 FROM rollup_dirty_months;
+
+DELETE FROM rollup_maker_month
+WHERE month_key IN (SELECT month_key FROM rollup_dirty_months);
+
+INSERT INTO rollup_maker_month (month_key, category_id, maker_id, registrations)
+SELECT month_key, category_id, maker_id, SUM(registrations)
+FROM registration_facts
+WHERE month_key IN (SELECT month_key FROM rollup_dirty_months)
+GROUP BY month_key, category_id, maker_id;
+
+UPDATE rollup_maker_month AS r
+SET prev_year_regs = (
+    SELECT p.registrations FROM rollup_maker_month AS p
+    WHERE p.month_key = r.month_key - 12
+      AND p.category_id = r.category_id
+      AND p.maker_id = r.maker_id
+)
+WHERE month_key IN (
+    SELECT month_key FROM rollup_dirty_months
+    UNION SELECT month_key + 12 FROM rollup_dirty_months
+);
+
+DELETE FROM rollup_category_month
+WHERE month_key IN (SELECT month_key FROM rollup_dirty_months);
+
+INSERT INTO rollup_category_month (month_key, category_id, registrations)
+SELECT month_key, category_id, SUM(registrations)
+FROM rollup_maker_month
+WHERE month_key IN (SELECT month_key FROM rollup_dirty_months)
+GROUP BY month_key, category_id;
+
+UPDATE rollup_category_month AS r
+SET prev_year_regs = (
+    SELECT p.registrations FROM rollup_category_month AS p
+    WHERE p.month_key = r.month_key - 12 AND p.category_id = r.category_id
+)
+WHERE month_key IN (
+    SELECT month_key FROM rollup_dirty_months
+    UNION SELECT month_key + 12 FROM rollup_dirty_months
+);
+
+DELETE FROM rollup_maker_rank
+WHERE month_key IN (SELECT month_key FROM rollup_dirty_months);
+
+INSERT INTO rollup_maker_rank (month_key, category_id, rank, maker_id, registrations, share_pct)
+SELECT
+    month_key,
+    category_id,
+    RANK() OVER (PARTITION BY month_key, category_id ORDER BY registrations DESC),
+    maker_id,
+    registrations,
+    100.0 * registrations / SUM(registrations) OVER (PARTITION BY month_key, category_id)
+FROM rollup_maker_month
+WHERE month_key IN (SELECT month_key FROM rollup_dirty_months);
+
+UPDATE rollup_maker_rank AS r
+SET
+    (prev_rank, prev_share_pct) = (
+        SELECT p.rank, p.share_pct FROM rollup_maker_rank AS p
+        WHERE p.category_id = r.category_id
+          AND p.maker_id = r.maker_id
+          AND p.month_key = r.month_key - 1
+    ),
+    prev_year_share_pct = (
+        SELECT p.share_pct FROM rollup_maker_rank AS p
+        WHERE p.category_id = r.category_id
+          AND p.maker_id = r.maker_id
+          AND p.month_key = r.month_key - 12
+    )
+WHERE month_key IN (
+    SELECT month_key FROM rollup_dirty_months
+    UNION SELECT month_key + 1 FROM rollup_dirty_months
+    UNION SELECT month_key + 12 FROM rollup_dirty_months
+);
+
+DELETE FROM rollup_maker_quarter
+WHERE quarter_key IN (SELECT quarter_key FROM temp.dirty_quarters);
+
+INSERT INTO rollup_maker_quarter (quarter_key, category_id, maker_id, registrations)
+SELECT month_key / 3, category_id, maker_id, SUM(registrations)
+FROM rollup_maker_month
+WHERE month_key IN (
+    SELECT quarter_key * 3 FROM temp.dirty_quarters
+    UNION SELECT quarter_key * 3 + 1 FROM temp.dirty_quarters
+    UNION SELECT quarter_key * 3 + 2 FROM temp.dirty_quarters
+)
+GROUP BY month_key / 3, category_id, maker_id;
+
+UPDATE rollup_maker_quarter AS r
+SET
+    prev_q_regs = (
+        SELECT p.registrations FROM rollup_maker_quarter AS p
+        WHERE p.quarter_key = r.quarter_key - 1
+          AND p.category_id = r.category_id
+          AND p.maker_id = r.maker_id
+    ),
+    prev_year_regs = (
+        SELECT p.registrations FROM rollup_maker_quarter AS p
+        WHERE p.quarter_key = r.quarter_key - 4
+          AND p.category_id = r.category_id
+          AND p.maker_id = r.maker_id
+    )
+WHERE quarter_key IN (
+    SELECT quarter_key FROM temp.dirty_quarters
+    UNION SELECT quarter_key + 1 FROM temp.dirty_quarters
+    UNION SELECT quarter_key + 4 FROM temp.dirty_quarters
+);
+
+DELETE FROM rollup_category_quarter
+WHERE quarter_key IN (SELECT quarter_key FROM temp.dirty_quarters);
+
+INSERT INTO rollup_category_quarter (quarter_key, category_id, registrations)
+SELECT quarter_key, category_id, SUM(registrations)
+FROM rollup_maker_quarter
+WHERE quarter_key IN (SELECT quarter_key FROM temp.dirty_quarters)
+GROUP BY quarter_key, category_id;
+
+UPDATE rollup_category_quarter AS r
+SET
+    prev_q_regs = (
+        SELECT p.registrations FROM rollup_category_quarter AS p
+        WHERE p.quarter_key = r.quarter_key - 1 AND p.category_id = r.category_id
+    ),
+    prev_year_regs = (
+        SELECT p.registrations FROM rollup_category_quarter AS p
+        WHERE p.quarter_key = r.quarter_key - 4 AND p.category_id = r.category_id
+    )
+WHERE quarter_key IN (
+    SELECT quarter_key FROM temp.dirty_quarters
+    UNION SELECT quarter_key + 1 FROM temp.dirty_quarters
+    UNION SELECT quarter_key + 4 FROM temp.dirty_quarters
+);
+
+DELETE FROM rollup_rto_month
+WHERE month_key IN (SELECT month_key FROM rollup_dirty_months);
+
+INSERT INTO rollup_rto_month (rto_id, month_key, category_id, maker_id, registrations)
+SELECT rto_id, month_key, category_id, maker_id, SUM(registrations)
+FROM geo_facts
+WHERE month_key IN (SELECT month_key FROM rollup_dirty_months)
+GROUP BY month_key, rto_id, category_id, maker_id;
+
+DELETE FROM rollup_state_month
+WHERE month_key IN (SELECT month_key FROM rollup_dirty_months);
+
+INSERT INTO rollup_state_month (state_id, month_key, category_id, maker_id, registrations)
+SELECT t.state_id, r.month_key, r.category_id, r.maker_id, SUM(r.registrations)
+FROM rollup_rto_month AS r
+JOIN rtos AS t ON t.id = r.rto_id
+WHERE r.month_key IN (SELECT month_key FROM rollup_dirty_months)
+GROUP BY t.state_id, r.month_key, r.category_id, r.maker_id;
+
+INSERT OR IGNORE INTO snapshot_dirty_months (month_key)
+SELECT month_key FROM rollup_dirty_months;
+
+DELETE FROM rollup_dirty_months;
+
+UPDATE meta SET value = value + 1 WHERE key = 'data_version';
+"""
+
+
+def _statements(script: str) -> List[str]:
+    statements, current = [], ""
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ""
+    return statements
+
+
+REFRESH_ROLLUPS_STATEMENTS = _statements(REFRESH_ROLLUPS_SQL)
+
+
+class VersionChanged(Exception):
+    """Raised by :func:`pinned` when the published version has moved on."""
+
+    def __init__(self, expected: int, current: int):
+        super().__init__(f"data version {expected} is no longer published (now {current})")
+        self.expected = expected
+        self.current = current
+
+
+class Connection(sqlite3.Connection):
+    """Connection whose commits can be held back by :func:`staged`.
+
+    While held, ``commit()`` keeps the transaction open and a ``with conn:``
+    block becomes a savepoint (rolled back if the block raises), so code
+    that commits its own work can run unchanged inside one larger
+    transaction. ``rollback()`` discards everything staged so far and
+    keeps holding.
+    """
+
+    held = 0
+
+    def commit(self):
+        if not self.held:
+            super().commit()
+
+    def rollback(self):
+        super().rollback()
+        if self.held:
+            self.execute("BEGIN")
+
+    def __enter__(self):
+        if self.held:
+            self.execute("SAVEPOINT held_block")
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.held:
+            return super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            self.execute("ROLLBACK TO held_block")
+        self.execute("RELEASE held_block")
+        return False
+
+
+@contextmanager
+def staged(conn: Connection) -> Iterator[Connection]:
+    """Hold every write made on ``conn`` in the block in one transaction.
+
+    The transaction commits when the outermost block ends and rolls back if
+    it raises. In WAL mode other connections keep reading the last committed
+    state until then, so a whole ingest pass (facts, rollups, anomalies and
+    the published version) becomes visible to readers at once. Blocks nest.
+    """
+
+    if conn.held:
+        conn.held += 1
+        try:
+            yield conn
+        finally:
+            conn.held -= 1
+        return
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN")
+    conn.held = 1
+    try:
+        yield conn
+    except BaseException:
+        conn.held = 0
+        conn.rollback()
+        raise
+    conn.held = 0
+    conn.commit()
+
+
+@contextmanager
+def pinned(db_path: str = DB_PATH, version: Optional[int] = None) -> Iterator[Connection]:
+    """Open ``db_path`` for reads that all see the same published state.
+
+    The reads share one read transaction, so a publish committed meanwhile
+    is not seen half-way. With ``version``, :class:`VersionChanged` is raised
+    if that is no longer the published version, so nothing newer is read (or
+    cached) under it.
+    """
+
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN")
+        current = published_version(conn)
+        if version is not None and current != version:
+            raise VersionChanged(version, current)
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def connect(db_path: str = DB_PATH) -> Connection:
+    """Open ``db_path`` in WAL mode so dashboard readers never block ingest."""
+
+    conn = sqlite3.connect(db_path, factory=Connection)
+    conn.execute("PRAGMA journal_mode = WAL")
+    # With WAL, NORMAL only syncs at checkpoints and is still crash-safe.
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """Create the storage layout from ``schema.sql``, migrating if needed.
+
+    Databases created before the dimension tables existed have a plain
+    ``registrations`` table; its rows are moved into ``registration_facts``
+    and the table is replaced by the compatibility view, all in a single
+    transaction.
+    """
+
+    with open(SCHEMA_PATH) as fh:
+        ddl = fh.read()
+    legacy = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'registrations'"
+    ).fetchone()
+    script = ["BEGIN;"]
+    if legacy:
+        script.append("ALTER TABLE registrations RENAME TO registrations_legacy;")
+    script.append(ddl)
+    if legacy:
+        script.append(MIGRATE_LEGACY_SQL)
+    script.append("COMMIT;")
+    conn.executescript("\n".join(script))
+
+
+def refresh_rollups(conn: sqlite3.Connection) -> int:
+    """Bring the rollup tables up to date with ``registration_facts``.
+
+    Only months marked in ``rollup_dirty_months`` are recomputed, so a
+    monthly refresh touches a handful of periods rather than the whole
+    history. Any refresh also bumps the data version. Returns the number of
+    months refreshed.
+    """
+
+    dirty = conn.execute("SELECT COUNT(*) FROM rollup_dirty_months").fetchone()[0]
+    if dirty:
+        # Statement by statement rather than ``executescript``, which would
+        # commit a transaction held open by :func:`staged`.
+        with conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            for statement in REFRESH_ROLLUPS_STATEMENTS:
+                conn.execute(statement)
+    return dirty
+
+
+def data_version(conn: sqlite3.Connection) -> int:
+    """Return a counter that increases whenever the registrations change."""
+
+    return conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()[0]
+
+
+def published_version(conn: sqlite3.Connection) -> int:
+    """Return the data version readers should serve.
+
+    This is the version last passed to :func:`publish_version`, or the
+    current data version for a database that has never been published.
+    """
+
+    row = conn.execute("SELECT value FROM meta WHERE key = 'published_version'").fetchone()
+    return row[0] if row else data_version(conn)
+
+
+def publish_version(conn: sqlite3.Connection) -> int:
+    """Make the current data version the published one and return it."""
+
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value)"
+            " SELECT 'published_version', value FROM meta WHERE key = 'data_version'"
+        )
+    return published_version(conn)
+
+
+def day_keys(dates: pd.Series) -> pd.Series:
+    """Convert ``YYYY-MM-DD`` strings to ``YYYYMMDD`` integers."""
+
+    return dates.str.slice(0, 10).str.replace("-", "", regex=False).astype("int64")
+
+
+def month_keys(days: pd.Series) -> pd.Series:
+    """Convert ``YYYYMMDD`` integers to ``year * 12 + month - 1`` ordinals."""
+
+    return days // 10000 * 12 + days // 100 % 100 - 1
+
+
+def month_key_to_timestamp(keys) -> pd.Series:
+    """Convert month ordinals back to month-start timestamps."""
+
+    months = np.asarray(keys, dtype="int64") - 1970 * 12
+    return pd.Series(months.astype("datetime64[M]").astype("datetime64[ns]"))
+
+
+def dimension_ids(conn: sqlite3.Connection, table: str, names: Iterable[str]) -> Dict[str, int]:
+    """Return ``{name: id}`` for ``table``, adding any missing ``names``."""
+
+    conn.executemany(
+        f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", ((name,) for name in names)
+    )
+    return dict(conn.execute(f"SELECT name, id FROM {table}"))
+
+
+def rto_ids(conn: sqlite3.Connection, areas: pd.DataFrame) -> Dict[tuple, int]:
+    """Return ``{(state, rto): id}``, adding any missing states and RTOs."""
+
+    state_ids = dimension_ids(conn, "states", areas["state"].unique())
+    pairs = areas[["state", "rto"]].drop_duplicates()
+    conn.executemany(
+        "INSERT OR IGNORE INTO rtos (state_id, name) VALUES (?, ?)",
+        zip(pairs["state"].map(state_ids), pairs["rto"]),
+    )
+    return {
+        (state, rto): rto_id
+        for rto_id, state, rto in conn.execute(
+            "SELECT t.id, s.name, t.name FROM rtos AS t JOIN states AS s ON s.id = t.state_id"
+        )
+    }
+
+
+def upsert_frame(conn: sqlite3.Connection, df: pd.DataFrame) -> int:
+    """Upsert ``date/vehicle_category/maker/registrations`` rows.
+
+    Dimension names are translated to integer ids once per distinct value,
+    and only facts that are new or whose count changed are written. Frames
+    with ``state`` and/or ``rto`` columns are written to ``geo_facts``
+    instead, whose triggers keep the national facts equal to the sum over
+    RTOs; a missing state or RTO is stored as :data:`UNKNOWN_AREA`. Returns
+    the number of fact rows written. The caller owns the transaction.
+    """
+
+    if "state" in df.columns or "rto" in df.columns:
+        return _upsert_geo_frame(conn, df)
+
+    category_ids = dimension_ids(conn, "categories", df["vehicle_category"].unique())
+    maker_ids = dimension_ids(conn, "makers", df["maker"].unique())
+    days = day_keys(df["date"])
+    facts = pd.DataFrame({
+        "day": days,
+        "month_key": month_keys(days),
+        "category_id": df["vehicle_category"].map(category_ids),
+        "maker_id": df["maker"].map(maker_ids),
+        "registrations": df["registrations"].astype("int64"),
+    })
+    # ``rowcount`` sums ``sqlite3_changes`` over the batch, which excludes
+    # the rows written by the dirty-month triggers.
+    return conn.executemany(FACT_UPSERT_SQL, facts.itertuples(index=False, name=None)).rowcount
+
+
+def _upsert_geo_frame(conn: sqlite3.Connection, df: pd.DataFrame) -> int:
+    areas = pd.DataFrame({
+        column: df[column].fillna(UNKNOWN_AREA) if column in df.columns else UNKNOWN_AREA
+        for column in ("state", "rto")
+    }, index=df.index)
+    category_ids = dimension_ids(conn, "categories", df["vehicle_category"].unique())
+    maker_ids = dimension_ids(conn, "makers", df["maker"].unique())
+    area_ids = rto_ids(conn, areas)
+    days = day_keys(df["date"])
+    facts = pd.DataFrame({
+        "month_key": month_keys(days),
+        "rto_id": pd.Series(area_ids).reindex(pd.MultiIndex.from_frame(areas)).to_numpy(),
+        "category_id": df["vehicle_category"].map(category_ids),
+        "maker_id": df["maker"].map(maker_ids),
+        "day": days,
+        "registrations": df["registrations"].astype("int64"),
+    })
+    return conn.executemany(GEO_FACT_UPSERT_SQL, facts.itertuples(index=False, name=None)).rowcount
+
+
+def delete_rows(conn: sqlite3.Connection, rows: Iterable[tuple]):
+    """Delete exact ``(date, vehicle_category, maker, registrations)`` rows.
+
+    Rows whose count has since been overwritten are left alone, as are
+    dimension entries still referenced by other facts.
+    """
+
+    conn.executemany(
+        """
+        DELETE FROM registration_facts
+        WHERE day = CAST(replace(?, '-', '') AS INTEGER)
+          AND category_id = (SELECT id FROM categories WHERE name = ?)
+          AND maker_id = (SELECT id FROM makers WHERE name = ?)
+          AND registrations = ?
+        """,
+        rows,
+    )
+    conn.execute(
+        "DELETE FROM categories WHERE id NOT IN (SELECT DISTINCT category_id FROM registration_facts)"
+    )
+    conn.execute(
+        "DELETE FROM makers WHERE id NOT IN (SELECT DISTINCT maker_id FROM registration_facts)"
+    )
@@ -1,7 +1,424 @@
+from functools import cached_property
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
 import pandas as pd
 
+from src.instrument import span
+from src.storage import month_key_to_timestamp
+
+# First month of the Indian financial year (April-March).
+FISCAL_YEAR_START = 4
+
+# Area levels of :func:`compute_geo_rollups`, finest first, and the columns
+# that identify an area at each of them.
+GEO_LEVELS = {"rto": ["state", "rto"], "state": ["state"], "national": []}
+
+# Columns added by :func:`windowed_metrics`, in output order.
+WINDOW_COLUMNS = [
+    "ytd",
+    "ytd_yoy_pct",
+    "fytd",
+    "fytd_yoy_pct",
+    "trailing_3m",
+    "trailing_12m",
+    "trailing_12m_yoy_pct",
+    "share_pct",
+    "share_12m_pct",
+]
+
+
+def period_ordinals(periods: pd.Series, freq: str = "M") -> np.ndarray:
+    """Encode period starts as consecutive integers.
+
+    Months become ``year * 12 + month - 1`` (the ``month_key`` used in
+    storage) and quarters ``year * 4 + quarter - 1``, so the period ``lag``
+    steps earlier is always ``ordinal - lag`` regardless of gaps in the data.
+    """
+
+    ordinals = periods.dt.year.to_numpy(dtype="int64") * 12 + periods.dt.month.to_numpy(dtype="int64") - 1
+    return ordinals // 3 if freq == "Q" else ordinals
+
+
+def lagged_values(codes: np.ndarray, ordinals: np.ndarray, values: np.ndarray, lag: int) -> np.ndarray:
+    """Return, for every row, the value of the same series ``lag`` periods back.
+
+    ``codes`` numbers the series ``0..S-1`` and ``ordinals`` are period
+    ordinals. Values are scattered into a dense ``S x span`` grid once and
+    each lag is a single vectorised gather, so any number of lags costs
+    O(n) each instead of a hash merge. Periods without a row yield ``NaN``;
+    in particular a missing quarter is never bridged to the one before it.
+    """
+
+    result = np.full(len(values), np.nan)
+    if not len(values):
+        return result
+    start = ordinals.min()
+    span = int(ordinals.max() - start) + 1
+    grid = np.full(int(codes.max() + 1) * span, np.nan)
+    position = codes * span + (ordinals - start)
+    grid[position] = values
+    prior = ordinals - lag
+    has_prior = (prior >= start) & (prior < start + span)
+    result[has_prior] = grid[position[has_prior] - lag]
+    return result
+
+
+def lag_start(start_month: Optional[int], lag: int, quarterly: bool = False) -> Optional[int]:
+    """First month to read so the period at ``start_month`` has the one ``lag`` periods back."""
+
+    return None if start_month is None else start_month - lag * (3 if quarterly else 1)
+
+
+def with_prior_totals(
+    sums: pd.DataFrame,
+    ordinals: np.ndarray,
+    lag: int,
+    prev_column: str,
+    start_month: Optional[int] = None,
+    quarterly: bool = False,
+) -> pd.DataFrame:
+    """Add each category's total ``lag`` periods back to per-category totals.
+
+    ``sums`` has one ``registrations`` row per period and
+    ``vehicle_category``, read from :func:`lag_start`; ``ordinals`` are its
+    period ordinals. The prior totals go in ``prev_column`` and the rows
+    before ``start_month`` are then dropped.
+    """
+
+    codes = sums.groupby("vehicle_category", sort=False, observed=True).ngroup().to_numpy()
+    sums[prev_column] = lagged_values(codes, ordinals, sums["registrations"].to_numpy("float64"), lag)
+    if start_month is not None:
+        sums = sums[ordinals >= (start_month // 3 if quarterly else start_month)]
+    return sums.reset_index(drop=True)
+
+
+def growth_pct(current: pd.Series, previous: pd.Series) -> pd.Series:
+    """Percentage change, ``NaN`` when the previous value is missing or zero."""
+
+    return ((current - previous) / previous * 100).where(previous.ne(0))
+
+
+@span("transform.windowed_metrics")
+def windowed_metrics(
+    monthly: pd.DataFrame,
+    by: Sequence[str] = ("vehicle_category",),
+    share_of: Sequence[str] = (),
+) -> pd.DataFrame:
+    """Add cumulative, trailing and share metrics to monthly series.
+
+    ``monthly`` has one row per series (``by``) and ``period`` with its
+    ``registrations``. Every series is scattered into a dense
+    ``series x month`` grid of cumulative sums, so each window is one
+    subtraction per row whatever its length. The columns added are
+    :data:`WINDOW_COLUMNS`:
+
+    * ``ytd``: calendar year to date. ``fytd``: financial year to date,
+      April to March.
+    * ``trailing_3m`` and ``trailing_12m``: sums of the last 3 or 12 months,
+      including this one.
+    * ``*_yoy_pct``: growth against the same window a year earlier.
+    * ``share_pct`` and ``share_12m_pct``: the series' share of the month
+      and of the trailing year, within the market named by ``share_of``
+      (all series when empty).
+
+    Months without a row count as zero. A window reaching back before the
+    first month of ``monthly`` is ``NaN`` rather than a partial sum.
+    Rows come back sorted by ``by`` and then by period.
+    """
+
+    frame = monthly[["period", *by, "registrations"]].copy()
+    if frame.empty:
+        for column in WINDOW_COLUMNS:
+            frame[column] = pd.Series(dtype="float64")
+        return frame
+
+    ordinals = period_ordinals(frame["period"])
+    start = ordinals.min()
+    width = int(ordinals.max() - start) + 1
+    months = ordinals - start
+    values = frame["registrations"].to_numpy(dtype="float64")
+
+    def cumulative(codes):
+        grid = np.zeros((int(codes.max()) + 1, width + 1))
+        np.add.at(grid, (codes, months + 1), values)
+        return np.cumsum(grid, axis=1)
+
+    def window(totals, codes, length, lag=0):
+        end = months + 1 - lag
+        begin = end - length
+        result = np.full(len(frame), np.nan)
+        known = begin >= 0
+        result[known] = totals[codes[known], end[known]] - totals[codes[known], begin[known]]
+        return result
+
+    series = _codes(frame, by)
+    market = _codes(frame, share_of)
+    totals = cumulative(series)
+    market_totals = cumulative(market)
+
+    ytd_length = ordinals % 12 + 1
+    fytd_length = (ordinals - (FISCAL_YEAR_START - 1)) % 12 + 1
+    for name, length in (("ytd", ytd_length), ("fytd", fytd_length), ("trailing_12m", 12)):
+        frame[name] = window(totals, series, length)
+        previous = pd.Series(window(totals, series, length, lag=12), index=frame.index)
+        frame[f"{name}_yoy_pct"] = growth_pct(frame[name], previous)
+    frame["trailing_3m"] = window(totals, series, 3)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        frame["share_pct"] = values / window(market_totals, market, 1) * 100
+        frame["share_12m_pct"] = frame["trailing_12m"] / window(market_totals, market, 12) * 100
+    frame = frame[["period", *by, "registrations", *WINDOW_COLUMNS]]
+    return frame.sort_values([*by, "period"], ignore_index=True)
+
+
+def _codes(frame: pd.DataFrame, by: Sequence[str]) -> np.ndarray:
+    if not by:
+        return np.zeros(len(frame), dtype="int64")
+    return frame.groupby(list(by), sort=False, observed=True).ngroup().to_numpy()
+
+
+class AggregationContext:
+    """Monthly aggregates shared by the transform functions.
+
+    The input is scanned once: periods are parsed a single time and the rows
+    are reduced to a monthly cube keyed by period, category and (when
+    present) maker. Every view - category, maker, totals, YoY, QoQ and the
+    key insight - is derived lazily from that cube and cached, so asking for
+    several of them costs one pass over the raw rows.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        DataFrame containing ``registrations``, ``date`` or an integer
+        ``month_key`` (the compact layout of :func:`src.query.read_facts`),
+        either ``vehicle_category`` or ``category`` and optionally
+        ``maker``. Categorical dimensions are grouped by their codes and
+        stay categorical in every view.
+    """
+
+    @span("transform.aggregate")
+    def __init__(self, df: pd.DataFrame):
+        if "vehicle_category" in df.columns:
+            category_col = "vehicle_category"
+        elif "category" in df.columns:
+            category_col = "category"
+        else:
+            raise ValueError("No category column found in dataframe.")
+
+        if "registrations" not in df.columns or not {"date", "month_key"} & set(df.columns):
+            raise ValueError("DataFrame must contain 'date' (or 'month_key') and 'registrations' columns.")
+
+        self.has_maker = "maker" in df.columns
+
+        # Group on the integer month ordinal; timestamps are only built for
+        # the aggregated rows.
+        if "date" in df.columns:
+            date = pd.to_datetime(df["date"])
+            month = (date.dt.year * 12 + date.dt.month - 1).rename("month_key")
+        else:
+            month = df["month_key"]
+        keys = [month, df[category_col].rename("vehicle_category")]
+        if self.has_maker:
+            keys.append(df["maker"])
+        cube = df["registrations"].groupby(keys, observed=True).sum().reset_index()
+        cube.insert(0, "period", month_key_to_timestamp(cube.pop("month_key")).values)
+        cube["registrations"] = cube["registrations"].astype("int64")
+        self.cube = cube
+        self._aggregates: Dict[Tuple[str, Tuple[str, ...]], pd.DataFrame] = {}
+
+    @property
+    def latest_period(self) -> pd.Timestamp:
+        return self.cube["period"].max()
+
+    @cached_property
+    def totals(self) -> pd.DataFrame:
+        """Total registrations per month."""
+
+        return self.cube.groupby("period", as_index=False)["registrations"].sum()
+
+    @cached_property
+    def category_cube(self) -> pd.DataFrame:
+        """Registrations per month and category."""
+
+        if not self.has_maker:
+            return self.cube
+        return self.cube.groupby(["period", "vehicle_category"], as_index=False, observed=True)[
+            "registrations"
+        ].sum()
+
+    @span("transform.growth")
+    def growth(
+        self,
+        lag: int = 1,
+        freq: str = "M",
+        by: Sequence[str] = ("vehicle_category",),
+    ) -> pd.DataFrame:
+        """Registrations per series and period with the value ``lag`` periods back.
 
-def compute_yoy_qoq(df: pd.DataFrame):
+        Parameters
+        ----------
+        lag: int
+            Number of periods to look back: 12 months or 4 quarters for YoY,
+            1 quarter for QoQ, 1 month for MoM and so on.
+        freq: str
+            ``"M"`` for months (``period`` column) or ``"Q"`` for quarters
+            (``quarter`` column).
+        by: sequence of str
+            Columns identifying a series, e.g. ``("maker", "vehicle_category")``.
+            The result is sorted by these columns and then by time.
+
+        Returns
+        -------
+        pd.DataFrame
+            The aggregated rows with ``prev_regs`` and ``growth_pct`` added.
+        """
+
+        time_col = "quarter" if freq == "Q" else "period"
+        frame = self._aggregate(freq, tuple(by)).copy()
+        if by:
+            codes = frame.groupby(list(by), sort=False, observed=True).ngroup().to_numpy()
+        else:
+            codes = np.zeros(len(frame), dtype="int64")
+        frame["prev_regs"] = lagged_values(
+            codes,
+            period_ordinals(frame[time_col], freq),
+            frame["registrations"].to_numpy(dtype="float64"),
+            lag,
+        )
+        frame["growth_pct"] = growth_pct(frame["registrations"], frame["prev_regs"])
+        return frame.sort_values([*by, time_col])
+
+    def _aggregate(self, freq: str, by: Tuple[str, ...]) -> pd.DataFrame:
+        key = (freq, by)
+        if key not in self._aggregates:
+            source = self.cube if "maker" in by or not self.has_maker else self.category_cube
+            if freq == "Q":
+                quarter = source["period"].dt.to_period("Q").dt.to_timestamp().rename("quarter")
+                frame = (
+                    source.groupby([quarter, *(source[c] for c in by)], observed=True)["registrations"]
+                    .sum()
+                    .reset_index()
+                )
+            elif set(by) == set(source.columns) - {"period", "registrations"}:
+                # Already at the requested grain.
+                frame = source
+            else:
+                frame = source.groupby(["period", *by], as_index=False, observed=True)["registrations"].sum()
+            self._aggregates[key] = frame
+        return self._aggregates[key]
+
+    @cached_property
+    def maker_growth(self):
+        """Maker x category monthly YoY and quarterly QoQ frames."""
+
+        if not self.has_maker:
+            raise ValueError("No maker column found in dataframe.")
+
+        by = ("maker", "vehicle_category")
+        monthly = self.growth(12, "M", by).rename(
+            columns={"prev_regs": "registrations_prev_year", "growth_pct": "yoy_pct"}
+        )
+        monthly["quarter"] = monthly["period"].dt.to_period("Q").dt.to_timestamp()
+        quarterly = self.growth(1, "Q", by).rename(
+            columns={"prev_regs": "prev_q_regs", "growth_pct": "qoq_pct"}
+        )
+        monthly = monthly[
+            ["period", "vehicle_category", "maker", "registrations",
+             "registrations_prev_year", "yoy_pct", "quarter"]
+        ]
+        quarterly = quarterly[
+            ["quarter", "vehicle_category", "maker", "registrations", "prev_q_regs", "qoq_pct"]
+        ]
+        return monthly, quarterly
+
+    @cached_property
+    def category_growth(self):
+        """Category monthly YoY and quarterly QoQ frames."""
+
+        by = ("vehicle_category",)
+        monthly = self.growth(12, "M", by).rename(
+            columns={"prev_regs": "prev_year_regs", "growth_pct": "yoy_pct"}
+        )
+        monthly["quarter"] = monthly["period"].dt.to_period("Q").dt.to_timestamp()
+        quarterly = self.growth(1, "Q", by).rename(
+            columns={"prev_regs": "prev_q_regs", "growth_pct": "qoq_pct"}
+        )
+        monthly = monthly[
+            ["period", "vehicle_category", "registrations", "quarter", "prev_year_regs", "yoy_pct"]
+        ]
+        quarterly = quarterly[["quarter", "vehicle_category", "registrations", "prev_q_regs", "qoq_pct"]]
+        return monthly, quarterly
+
+    def windowed(
+        self, by: Sequence[str] = ("vehicle_category",), share_of: Sequence[str] = ()
+    ) -> pd.DataFrame:
+        """:func:`windowed_metrics` of the monthly aggregates for ``by``."""
+
+        if "maker" in by and not self.has_maker:
+            raise ValueError("No maker column found in dataframe.")
+        return windowed_metrics(self._aggregate("M", tuple(by)), by, share_of)
+
+    def period_total(self, period: pd.Timestamp) -> int:
+        totals = self.totals
+        return totals.loc[totals["period"] == period, "registrations"].sum()
+
+    def yoy_comparison(self) -> pd.DataFrame:
+        """Per-category latest month against the same month a year earlier."""
+
+        cube = self.category_cube
+        latest_period = self.latest_period
+        prev_year_period = latest_period - pd.DateOffset(years=1)
+
+        current = cube[cube["period"] == latest_period].set_index("vehicle_category")["registrations"]
+        previous = cube[cube["period"] == prev_year_period].set_index("vehicle_category")["registrations"]
+
+        result = (
+            pd.DataFrame({
+                "registrations": current,
+                "prev_year_regs": previous,
+            })
+            .fillna(0)
+        )
+
+        result["yoy_pct"] = (
+            (result["registrations"] - result["prev_year_regs"]) / result["prev_year_regs"] * 100
+        ).where(result["prev_year_regs"].ne(0))
+
+        return result.rename_axis("vehicle_category").reset_index()
+
+    def key_insight(self) -> str:
+        """Headline growth sentence for the latest month."""
+
+        latest_period = self.latest_period
+        latest_total = self.period_total(latest_period)
+        prev_total = self.period_total(latest_period - pd.DateOffset(years=1))
+
+        cube = self.category_cube
+        top_category = (
+            cube[cube["period"] == latest_period]
+            .set_index("vehicle_category")["registrations"]
+            .idxmax()
+        )
+
+        if prev_total:
+            yoy_growth = (latest_total - prev_total) / prev_total * 100
+            growth_str = f"{yoy_growth:.2f}%"
+            metric = "Year-over-year"
+        else:
+            prev_month_total = self.period_total(latest_period - pd.DateOffset(months=1))
+            mom_growth = (
+                (latest_total - prev_month_total) / prev_month_total * 100
+                if prev_month_total
+                else float("nan")
+            )
+            growth_str = f"{mom_growth:.2f}%" if pd.notnull(mom_growth) else "N/A"
+            metric = "Month-over-month"
+
+        return f"{metric} growth is {growth_str} with {top_category} leading the registrations."
+
+
+@span("transform.compute_yoy_qoq")
+def compute_yoy_qoq(df: pd.DataFrame, context: Optional[AggregationContext] = None):
     """Return monthly and quarterly aggregates with YoY/QoQ percentages.
 
     Parameters
@@ -9,6 +426,9 @@ def compute_yoy_qoq(df: pd.DataFrame):
     df: pd.DataFrame
         DataFrame containing at least the columns ``date``, ``vehicle_category``,
         ``maker`` and ``registrations``.
+    context: AggregationContext, optional
+        Previously built context for ``df``; reusing one skips re-parsing
+        and re-aggregating the rows.
 
     Returns
     -------
@@ -16,64 +436,13 @@ def compute_yoy_qoq(df: pd.DataFrame):
         A tuple with the monthly and quarterly aggregated data.
     """
 
-    # Ensure we don't mutate the input DataFrame
-    df = df.copy()
+    context = context or AggregationContext(df)
+    monthly, quarterly = context.maker_growth
+    return monthly.copy(), quarterly.copy()
 
-    # Calculate the month start for each record
-    df["period"] = pd.to_datetime(df["date"]).dt.to_period("M").dt.to_timestamp()
 
-    # Monthly aggregation per maker and category
-    monthly = (
-        df.groupby(["period", "vehicle_category", "maker"], as_index=False)[
-            "registrations"
-        ]
-        .sum()
-        .sort_values(["maker", "vehicle_category", "period"])
-    )
-
-    # Year over year percentage change.
-    # Using ``shift(12)`` assumes there are 12 consecutive monthly rows for each
-    # maker/category combination.  The dataset in this project can have missing
-    # months which would result in NaNs even when there is data for the same
-    # month in the previous year.  To make the calculation robust we instead
-    # align each row with the matching period from the previous year using a
-    # merge on the shifted period.
-
-    prev_year = monthly[["maker", "vehicle_category", "period", "registrations"]].copy()
-    prev_year["period"] = prev_year["period"] + pd.DateOffset(years=1)
-    prev_year = prev_year.rename(columns={"registrations": "registrations_prev_year"})
-    monthly = monthly.merge(
-        prev_year,
-        on=["maker", "vehicle_category", "period"],
-        how="left",
-    )
-    monthly = monthly.sort_values(["maker", "vehicle_category", "period"])
-    monthly["yoy_pct"] = (
-        (monthly["registrations"] - monthly["registrations_prev_year"]) / monthly["registrations_prev_year"]
-        * 100
-    ).where(monthly["registrations_prev_year"].ne(0))
-
-    # Quarterly aggregation and QoQ change
-    monthly["quarter"] = monthly["period"].dt.to_period("Q").dt.to_timestamp()
-    quarterly = (
-        monthly.groupby(["quarter", "vehicle_category", "maker"], as_index=False)[
-            "registrations"
-        ]
-        .sum()
-        .sort_values(["maker", "vehicle_category", "quarter"])
-    )
-    quarterly["prev_q_regs"] = (
-        quarterly.groupby(["maker", "vehicle_category"])["registrations"].shift(1)
-    )
-    quarterly["qoq_pct"] = (
-        (quarterly["registrations"] - quarterly["prev_q_regs"]) / quarterly["prev_q_regs"]
-        * 100
-    ).where(quarterly["prev_q_regs"].ne(0))
-
-    return monthly, quarterly
-
-
-def compute_category_growth(df: pd.DataFrame):
+@span("transform.compute_category_growth")
+def compute_category_growth(df: pd.DataFrame, context: Optional[AggregationContext] = None):
     """Aggregate registrations by vehicle category and compute YoY/QoQ.
 
     Parameters
@@ -81,6 +450,8 @@ def compute_category_growth(df: pd.DataFrame):
     df: pd.DataFrame
         DataFrame containing columns ``date``, ``vehicle_category`` and
         ``registrations``.
+    context: AggregationContext, optional
+        Previously built context for ``df``.
 
     Returns
     -------
@@ -89,38 +460,70 @@ def compute_category_growth(df: pd.DataFrame):
         with QoQ percentage.
     """
 
-    df = df.copy()
-    df["period"] = pd.to_datetime(df["date"]).dt.to_period("M").dt.to_timestamp()
-
-    monthly = (
-        df.groupby(["period", "vehicle_category"], as_index=False)["registrations"]
-        .sum()
-        .sort_values(["vehicle_category", "period"])
-    )
-    monthly["quarter"] = monthly["period"].dt.to_period("Q").dt.to_timestamp()
-
-    # Similar to ``compute_yoy_qoq`` we avoid ``shift(12)`` to handle missing
-    # months.  We join on the period offset by one year which ensures that a
-    # YoY value is produced whenever data for the same month in the previous
-    # year exists, even if intermediate months are absent.
-    prev_year = monthly[["vehicle_category", "period", "registrations"]].copy()
-    prev_year["period"] = prev_year["period"] + pd.DateOffset(years=1)
-    prev_year = prev_year.rename(columns={"registrations": "prev_year_regs"})
-    monthly = monthly.merge(prev_year, on=["vehicle_category", "period"], how="left")
-    monthly = monthly.sort_values(["vehicle_category", "period"])
-    monthly["yoy_pct"] = (
-        (monthly["registrations"] - monthly["prev_year_regs"]) / monthly["prev_year_regs"] * 100
-    ).where(monthly["prev_year_regs"].ne(0))
-
-    quarterly = (
-        monthly.groupby(["quarter", "vehicle_category"], as_index=False)["registrations"]
-        .sum()
-        .sort_values(["vehicle_category", "quarter"])
-    )
-    quarterly["prev_q_regs"] = quarterly.groupby("vehicle_category")["registrations"].shift(1)
-    quarterly["qoq_pct"] = (
-        (quarterly["registrations"] - quarterly["prev_q_regs"]) / quarterly["prev_q_regs"] * 100
-    ).where(quarterly["prev_q_regs"].ne(0))
-
-    return monthly, quarterly
+    context = context or AggregationContext(df)
+    monthly, quarterly = context.category_growth
+    return monthly.copy(), quarterly.copy()
+
+
+@span("transform.compute_windowed_metrics")
+def compute_windowed_metrics(df: pd.DataFrame, context: Optional[AggregationContext] = None):
+    """Return YTD, FYTD, trailing-window and share metrics per month.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        DataFrame containing columns ``date``, ``vehicle_category``,
+        ``maker`` and ``registrations``.
+    context: AggregationContext, optional
+        Previously built context for ``df``.
+
+    Returns
+    -------
+    tuple(pd.DataFrame, pd.DataFrame)
+        Maker x category rows, with shares within each category, and
+        category rows, with shares of the whole market; see
+        :func:`windowed_metrics` for the columns.
+    """
+
+    context = context or AggregationContext(df)
+    makers = context.windowed(("vehicle_category", "maker"), share_of=("vehicle_category",))
+    categories = context.windowed(("vehicle_category",))
+    return makers, categories
+
+
+@span("transform.compute_geo_rollups")
+def compute_geo_rollups(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Monthly registrations per category and maker at every area level.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        Rows with ``date`` (or ``month_key``), ``vehicle_category``,
+        ``maker``, ``state``, ``rto`` and ``registrations``.
+
+    Returns
+    -------
+    dict
+        A frame per key of :data:`GEO_LEVELS`, with ``period``, the level's
+        area columns, ``vehicle_category``, ``maker`` and ``registrations``.
+        The raw rows are grouped once, to RTOs; every coarser level is
+        summed from the level below it, as the storage rollups are.
+    """
 
+    if "date" in df.columns:
+        date = pd.to_datetime(df["date"])
+        month = (date.dt.year * 12 + date.dt.month - 1).rename("month_key")
+    else:
+        month = df["month_key"]
+    keys = [month, df["state"], df["rto"], df["vehicle_category"], df["maker"]]
+    finer = df["registrations"].groupby(keys, observed=True).sum().reset_index()
+    rollups = {}
+    for level, areas in GEO_LEVELS.items():
+        finer = finer.groupby(
+            ["month_key", *areas, "vehicle_category", "maker"], as_index=False, observed=True
+        )["registrations"].sum()
+        rollup = finer.copy()
+        rollup.insert(0, "period", month_key_to_timestamp(rollup.pop("month_key")).values)
+        rollup["registrations"] = rollup["registrations"].astype("int64")
+        rollups[level] = rollup
+    return rollups
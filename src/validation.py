@@ -0,0 +1,204 @@
+"""Ingest-time validation of export chunks.
+
+Each chunk read from an export is checked by :func:`validate` before it is
+written. Every rule is one vectorised pass over the chunk's columns, so
+validation costs about as much as parsing it, whatever the number of rows:
+
+* ``missing``: a date, category, maker or count is empty.
+* ``bad_date`` / ``date_out_of_range``: the date does not parse, or lies
+  before :data:`MIN_DATE` or after today.
+* ``bad_count`` / ``count_out_of_range``: the count is not a whole number,
+  or is negative or above :data:`MAX_REGISTRATIONS`.
+* ``duplicate``: an earlier row with the same natural key (date, category,
+  canonical maker and, when present, state and RTO) in the chunk; the last
+  row wins, as it would in the upsert.
+
+Maker names are canonicalised first (see :func:`canonical_maker`), so
+``HONDA MOTORCYCLE & SCOOTER INDIA PVT LTD`` and ``Honda`` are one maker
+and their rows are duplicates of each other. Rejected rows keep their raw
+values and the rule that rejected them, and are stored in the
+``quarantine`` table by :func:`quarantine_rows`.
+"""
+
+import re
+import sqlite3
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["date", "vehicle_category", "maker", "registrations"]
+
+RULES = (
+    "missing",
+    "bad_date",
+    "date_out_of_range",
+    "bad_count",
+    "count_out_of_range",
+    "duplicate",
+)
+
+# Earliest date accepted; Vahan has no registrations before it.
+MIN_DATE = pd.Timestamp("1990-01-01")
+
+# Largest count accepted for a single row. Anything above is a parse error
+# (merged cells, digits run together), not a real month.
+MAX_REGISTRATIONS = 10_000_000
+
+# Words dropped from the end of a maker name before it is looked up.
+LEGAL_SUFFIXES = frozenset({
+    "PVT", "PRIVATE", "LTD", "LIMITED", "CO", "COMPANY", "CORP", "CORPORATION",
+    "INC", "INDIA", "IND", "P", "L",
+})
+
+# Canonical maker names, keyed by the normalised form of each spelling seen
+# in Vahan exports (see :func:`maker_key`).
+MAKER_ALIASES = {
+    "HONDA": "Honda",
+    "HONDA MOTORCYCLE SCOOTER": "Honda",
+    "HONDA CARS": "Honda",
+    "MARUTI": "Maruti",
+    "MARUTI SUZUKI": "Maruti",
+    "HYUNDAI": "Hyundai",
+    "HYUNDAI MOTOR": "Hyundai",
+    "TATA": "Tata",
+    "TATA MOTORS": "Tata",
+    "TATA MOTORS PASSENGER VEHICLES": "Tata",
+    "SUZUKI": "Suzuki",
+    "SUZUKI MOTORCYCLE": "Suzuki",
+    "YAMAHA": "Yamaha",
+    "INDIA YAMAHA MOTOR": "Yamaha",
+    "HERO MOTOCORP": "Hero MotoCorp",
+    "BAJAJ AUTO": "Bajaj",
+    "TVS MOTOR": "TVS",
+    "MAHINDRA MAHINDRA": "Mahindra",
+    "ROYAL ENFIELD A UNIT OF EICHER MOTORS": "Royal Enfield",
+}
+
+
+@dataclass
+class Validated:
+    """A chunk split into rows to write and rows to quarantine.
+
+    ``valid`` has :data:`COLUMNS` (plus any area columns) with ISO date
+    strings, canonical makers and integer counts. ``rejected`` has the same
+    columns as raw strings plus ``rule``, the first rule each row broke.
+    """
+
+    valid: pd.DataFrame
+    rejected: pd.DataFrame
+
+
+def validate(df: pd.DataFrame, today: Optional[pd.Timestamp] = None) -> Validated:
+    """Check every row of ``df`` against :data:`RULES`.
+
+    ``df`` has :data:`COLUMNS` as read from an export, and optionally
+    ``state`` and ``rto``. Rows with all of :data:`COLUMNS` empty (spacer
+    and footer rows) are dropped without being quarantined.
+    """
+
+    df = df.reset_index(drop=True)
+    today = pd.Timestamp.now().normalize() if today is None else pd.Timestamp(today)
+    areas = [column for column in ("state", "rto") if column in df.columns]
+
+    blank = pd.DataFrame({column: _blank(df[column]) for column in COLUMNS})
+    rule = pd.Series(None, index=df.index, dtype="object")
+
+    def flag(mask, name):
+        rule.mask(rule.isna() & mask, name, inplace=True)
+
+    flag(blank.any(axis=1), "missing")
+
+    dates = pd.to_datetime(df["date"], errors="coerce")
+    flag(dates.isna(), "bad_date")
+    flag((dates < MIN_DATE) | (dates > today), "date_out_of_range")
+
+    counts = df["registrations"]
+    if counts.dtype == object:
+        # Excel exports format counts with Indian digit grouping: "23,30,160".
+        counts = counts.astype(str).str.replace(",", "", regex=False).str.strip()
+    counts = pd.to_numeric(counts, errors="coerce")
+    flag(counts.isna() | (counts % 1 != 0), "bad_count")
+    flag((counts < 0) | (counts > MAX_REGISTRATIONS), "count_out_of_range")
+
+    clean = pd.DataFrame({
+        "date": dates.dt.strftime("%Y-%m-%d"),
+        "vehicle_category": df["vehicle_category"].astype(str).str.strip(),
+        "maker": canonical_makers(df["maker"].astype(str)),
+        "registrations": counts,
+    })
+    for column in areas:
+        clean[column] = df[column]
+    # Among rows that passed, the last of each natural key wins.
+    keys = ["date", "vehicle_category", "maker", *areas]
+    flag(rule.isna() & clean[keys].where(rule.isna()).duplicated(keep="last"), "duplicate")
+
+    spacer = blank.all(axis=1)
+    valid = clean[rule.isna() & ~spacer].astype({"registrations": "int64"})
+    rejected = df.loc[rule.notna() & ~spacer, COLUMNS + areas]
+    rejected = rejected.astype("string").astype(object).where(rejected.notna(), None)
+    rejected["rule"] = rule[rejected.index]
+    return Validated(valid.reset_index(drop=True), rejected.reset_index(drop=True))
+
+
+def canonical_makers(names: pd.Series) -> pd.Series:
+    """Map maker names onto their canonical spelling.
+
+    Each distinct name is looked up once, so the cost follows the number of
+    makers rather than the number of rows.
+    """
+
+    codes, uniques = pd.factorize(names)
+    canonical = np.array([canonical_maker(name) for name in uniques], dtype=object)
+    return pd.Series(canonical[codes] if len(uniques) else codes.astype(object), index=names.index)
+
+
+@lru_cache(maxsize=65536)
+def canonical_maker(name: str) -> str:
+    """Return the canonical spelling of a maker, or ``name`` tidied up.
+
+    Names are compared by :func:`maker_key`; known spellings map to the
+    names in :data:`MAKER_ALIASES`, anything else keeps its own spelling
+    with surrounding and repeated spaces removed.
+    """
+
+    return MAKER_ALIASES.get(maker_key(name), " ".join(name.split()))
+
+
+def maker_key(name: str) -> str:
+    """Normalise a maker name: upper case, punctuation and "AND" removed,
+    trailing legal suffixes such as ``PVT LTD`` dropped."""
+
+    words = [word for word in re.sub(r"[^0-9A-Z]+", " ", name.upper()).split() if word != "AND"]
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def quarantine_rows(conn: sqlite3.Connection, source: str, rejected: pd.DataFrame) -> int:
+    """Store rejected rows of ``source`` in ``quarantine``; the caller owns the transaction."""
+
+    if rejected.empty:
+        return 0
+    rows = rejected.reindex(columns=[*COLUMNS, "state", "rto", "rule"])
+    rows = rows.astype(object).where(rows.notna(), None)
+    conn.executemany(
+        "INSERT INTO quarantine (source, date, vehicle_category, maker, registrations, state, rto, rule)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        ((source, *row) for row in rows.itertuples(index=False, name=None)),
+    )
+    return len(rows)
+
+
+def clear_quarantine(conn: sqlite3.Connection, sources: Sequence[str]):
+    """Forget the rejected rows of ``sources`` before they are re-ingested."""
+
+    conn.executemany("DELETE FROM quarantine WHERE source = ?", ((source,) for source in sources))
+
+
+def _blank(values: pd.Series) -> pd.Series:
+    if values.dtype != object:
+        return values.isna()
+    return values.isna() | values.astype(str).str.strip().eq("")
@@ -0,0 +1,77 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Ensure src is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.anomaly import refresh_anomalies, scan
+from src.query import Filters, read_anomalies
+from src.storage import connect, ensure_schema, refresh_rollups, upsert_frame
+from src.transform import compute_yoy_qoq
+
+MONTHS = pd.date_range("2019-01-01", periods=60, freq="MS")
+
+
+def _rows(seed=0):
+    """Five years of monthly registrations for four makers.
+
+    ``Steady`` peaks every October and is otherwise noise; ``Spike`` jumps
+    once, ``Gone`` stops reporting and ``Shift`` moves to a new level.
+    """
+
+    rng = np.random.default_rng(seed)
+    base = 1_000 + 400 * (MONTHS.month == 10) + rng.normal(0, 20, (4, len(MONTHS)))
+    base[1, 40] *= 3
+    base[3, 36:] += 300
+    frames = []
+    for maker, values in zip(["Steady", "Spike", "Gone", "Shift"], base.round()):
+        frame = pd.DataFrame({"date": MONTHS, "maker": maker, "registrations": values.astype(int)})
+        frames.append(frame[~((maker == "Gone") & (frame["date"] >= MONTHS[50]))])
+    return pd.concat(frames, ignore_index=True).assign(vehicle_category="4W")
+
+
+def test_scan_flags_spikes_collapses_and_breaks():
+    monthly, _ = compute_yoy_qoq(_rows())
+    found = scan(monthly)
+
+    # Rows are newest first, so the first row of each pair wins.
+    flagged = {}
+    for row in found.itertuples():
+        flagged.setdefault((row.maker, row.kind), row.period)
+    # The first October has no earlier year to say it is seasonal.
+    assert set(found.loc[found["period"] > MONTHS[11], "maker"]) == {"Spike", "Gone", "Shift"}
+    assert flagged[("Spike", "spike")] == MONTHS[40]
+    assert found[found["kind"] == "collapse"]["period"].min() == MONTHS[50]
+    assert flagged[("Shift", "break")] == MONTHS[41]
+    assert found[found["maker"] == "Shift"]["kind"].tolist().count("break") == 1
+    assert found["period"].is_monotonic_decreasing
+    spike = found[found["kind"] == "spike"].iloc[0]
+    assert spike["score"] > 3 and spike["registrations"] > 2 * spike["expected"]
+
+
+def test_scan_without_history_is_empty():
+    monthly, _ = compute_yoy_qoq(_rows().head(5))
+    assert scan(monthly).empty
+    assert list(scan(monthly.iloc[:0]).columns) == [
+        "period", "vehicle_category", "maker", "kind", "score", "registrations", "expected"
+    ]
+
+
+def test_refresh_stores_scan_per_data_version(tmp_path):
+    rows = _rows()
+    conn = connect(str(tmp_path / "vahan.db"))
+    ensure_schema(conn)
+    with conn:
+        upsert_frame(conn, rows.assign(date=rows["date"].dt.strftime("%Y-%m-%d")))
+    refresh_rollups(conn)
+
+    stored = refresh_anomalies(conn)
+    assert stored and refresh_anomalies(conn) is None
+    monthly, _ = compute_yoy_qoq(rows)
+    pd.testing.assert_frame_equal(read_anomalies(conn), scan(monthly), check_dtype=False)
+    assert set(read_anomalies(conn, Filters(makers=("Spike",)))["maker"]) == {"Spike"}
+    assert len(read_anomalies(conn, limit=2)) == 2
+    conn.close()
@@ -0,0 +1,138 @@
+import http.client
+import json
+import os
+import sys
+import threading
+
+import pandas as pd
+import pytest
+
+# Ensure src is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.api import AnalyticsService, NotFound, make_server
+from src.ingest import publish
+from src.storage import connect, ensure_schema, refresh_rollups, upsert_frame
+
+ROWS = pd.DataFrame({
+    "date": ["2024-01-01", "2024-01-01", "2024-02-01", "2025-01-01", "2025-01-01", "2025-02-01"],
+    "vehicle_category": ["2W", "4W", "2W", "2W", "4W", "2W"],
+    "maker": ["A", "B", "A", "A", "B", "C"],
+    "registrations": [100, 200, 110, 150, 220, 40],
+})
+
+
+def _db(tmp_path, rows=ROWS):
+    path = str(tmp_path / "vahan.db")
+    conn = connect(path)
+    ensure_schema(conn)
+    with conn:
+        upsert_frame(conn, rows)
+    refresh_rollups(conn)
+    publish(conn, None)
+    conn.close()
+    return path
+
+
+def _json(body):
+    return json.loads(body)
+
+
+def test_service_answers_from_shared_tables(tmp_path):
+    service = AnalyticsService(_db(tmp_path), check_interval=0)
+
+    _, body = service.get("/growth/makers", {"start": ["2025-01"], "top": ["1"], "by": ["yoy_pct"]})
+    _, insight = service.get("/insight", {"categories": ["2W"]})
+    _, ranks = service.get("/rankings", {"month": ["2025-01"]})
+
+    rows = _json(body)["rows"]
+    assert [(row["maker"], row["yoy_pct"]) for row in rows] == [("A", 50.0)]
+    assert _json(insight)["latest_total"] == 40 and _json(insight)["filters"]["categories"] == ["2W"]
+    assert [row["maker"] for row in _json(ranks)["rows"]] == ["A", "B"]
+
+    with pytest.raises(NotFound):
+        service.get("/nope", {})
+    with pytest.raises(ValueError):
+        service.get("/trend", {"colour": ["red"]})
+    with pytest.raises(ValueError):
+        service.get("/growth/makers", {"top": ["3"], "by": ["maker"]})
+
+
+def test_etag_follows_published_version(tmp_path):
+    path = _db(tmp_path)
+    service = AnalyticsService(path, check_interval=0)
+
+    etag, body = service.get("/trend", {"makers": ["A", "C"]})
+    same, _ = service.get("/trend", {"makers": ["C", "A"]})
+    assert same == etag
+    assert service.get("/trend", {"makers": ["A", "C"]}, etag) == (etag, None)
+    assert service.get("/trend", {}, etag)[1] is not None
+
+    conn = connect(path)
+    with conn:
+        upsert_frame(conn, ROWS.assign(registrations=ROWS["registrations"] * 2))
+    refresh_rollups(conn)
+    publish(conn, None)
+    conn.close()
+
+    new_etag, new_body = service.get("/trend", {"makers": ["A", "C"]}, etag)
+    assert new_etag != etag
+    totals = [row["registrations"] for row in _json(new_body)["rows"]]
+    assert totals == [2 * row["registrations"] for row in _json(body)["rows"]]
+
+
+
+def test_reads_never_mix_versions(tmp_path):
+    path = _db(tmp_path)
+    service = AnalyticsService(path, check_interval=3600)
+    _, before = service.get("/rankings", {"month": ["2025-01"]})
+
+    conn = connect(path)
+    with conn:
+        upsert_frame(conn, ROWS.assign(registrations=ROWS["registrations"] * 2))
+    refresh_rollups(conn)
+    publish(conn, None)
+    conn.close()
+
+    # Not due for a version check yet, but a read of the new rows is answered
+    # (and cached) under the new version, never under the old one.
+    _, after = service.get("/rankings", {"month": ["2024-01"]})
+    assert _json(after)["version"] > _json(before)["version"]
+    assert service.published().version == _json(after)["version"]
+
+
+def test_http_server_serves_concurrent_conditional_requests(tmp_path):
+    server = make_server(port=0, service=AnalyticsService(_db(tmp_path)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    def get(path, headers=None):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        try:
+            conn.request("GET", path, headers=headers or {})
+            response = conn.getresponse()
+            return response.status, response.getheader("ETag"), response.read()
+        finally:
+            conn.close()
+
+    try:
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get("/growth/categories?freq=quarter")))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert {status for status, _, _ in results} == {200}
+        assert len({body for _, _, body in results}) == 1
+
+        etag = results[0][1]
+        assert get("/growth/categories?freq=quarter", {"If-None-Match": etag})[:2] == (304, etag)
+        status, _, body = get("/insight?start=not-a-month")
+        assert status == 400 and "error" in _json(body)
+        assert get("/missing")[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -1,4 +1,5 @@
 import os
+import shutil
 import sqlite3
 import pandas as pd
 import sys
@@ -7,6 +8,7 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from src.ingest import init_db, DB_PATH
+from src.snapshot import SNAPSHOT_DIR
 
 
 def setup_module(module):
@@ -17,6 +19,7 @@ def setup_module(module):
 def teardown_module(module):
     if os.path.exists(DB_PATH):
         os.remove(DB_PATH)
+    shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
 
 
 def test_db_exists():
@@ -0,0 +1,54 @@
+import os
+import sys
+import threading
+
+import pandas as pd
+
+# Ensure the repo root is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks import synthetic
+from benchmarks.loadtest import build_db, run_load, warm
+from benchmarks.run import STAGES, compare, parse_size, run_suite
+from src.api import AnalyticsService, make_server
+
+
+def test_generator_is_deterministic_and_unique():
+    df = synthetic.frame(5_000, seed=7)
+    chunked = pd.concat(synthetic.generate(5_000, seed=7, chunk_rows=777), ignore_index=True)
+
+    assert len(df) == 5_000
+    assert list(df.columns) == synthetic.COLUMNS
+    assert df.equals(chunked)
+    assert not df.duplicated(["date", "state", "vehicle_category", "maker"]).any()
+    assert not synthetic.frame(5_000, seed=8).equals(df)
+
+
+def test_parse_size():
+    assert parse_size("10k") == 10_000
+    assert parse_size("1M") == 1_000_000
+    assert parse_size("2500") == 2_500
+
+
+def test_run_suite_reports_every_stage(tmp_path):
+    report = run_suite([500], workdir=str(tmp_path), inline=True)
+
+    assert [r["stage"] for r in report["results"]] == STAGES
+    assert all(r["seconds"] >= 0 and r["peak_rss_mb"] >= 0 for r in report["results"])
+    assert compare(report, report)
+
+
+def test_load_test_reports_latency_percentiles(tmp_path):
+    server = make_server(port=0, service=AnalyticsService(build_db(str(tmp_path), 2_000)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        warm(base_url)
+        result = run_load(base_url, rate=200, duration=0.5, concurrency=4)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert result["requests"] == 100 and result["errors"] == 0
+    assert set(result["statuses"]) <= {"200", "304"}
+    assert 0 <= result["p50_ms"] <= result["p99_ms"] <= result["max_ms"]
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pandas as pd
+
+# Ensure src is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.cache import ResultCache
+from src.query import Filters
+
+
+def test_cache_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    filters = Filters.from_selection("2024-01-01", "2024-12-01", makers=["B", "A"])
+    df = pd.DataFrame({"registrations": [1, 2]})
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return df
+
+    first = ResultCache(path).get_or_compute("facts", 1, filters, compute)
+    # Another process sees the same entry, and maker order does not matter.
+    same = Filters.from_selection("2024-01-01", "2024-12-01", makers=["A", "B"])
+    second = ResultCache(path).get_or_compute("facts", 1, same, compute)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert len(calls) == 1
+
+
+def test_cache_invalidated_by_data_version(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.db"))
+    cache.put("trend", 1, None, "old")
+    assert cache.get("trend", 2) is None
+
+    cache.put("trend", 2, None, "new")
+    cache.put("trend", 1, None, "stale writer")
+    assert cache.get("trend", 1) is None
+    assert cache.get("trend", 2) == "new"
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.db"), max_bytes=2500)
+    cache.put("a", 1, None, b"x" * 1000)
+    cache.put("b", 1, None, b"x" * 1000)
+    cache.get("a", 1)
+    cache.put("c", 1, None, b"x" * 1000)
+
+    assert cache.get("a", 1) is not None
+    assert cache.get("b", 1) is None
+    assert cache.get("c", 1) is not None
+    assert cache.size() <= 2500
@@ -0,0 +1,55 @@
+import os
+import sys
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+# Ensure src is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.dashboard.charts import OTHER, downsample, payload_bytes, top_n
+
+
+def test_top_n_buckets_the_rest():
+    df = pd.DataFrame({
+        "maker": pd.Categorical(["A", "B", "C", "D"]),
+        "vehicle_category": ["2W", "2W", "4W", "4W"],
+        "registrations": [400, 300, 20, 10],
+        "registrations_prev_year": [200, 300, 10, np.nan],
+        "yoy_pct": [100.0, 0.0, 100.0, np.nan],
+    })
+
+    capped, bucketed = top_n(
+        df, 2, labels=("maker", "vehicle_category"), previous="registrations_prev_year", pct="yoy_pct"
+    )
+
+    assert bucketed == 2
+    assert capped["maker"].tolist() == ["A", "B", OTHER]
+    other = capped.iloc[-1]
+    assert (other["registrations"], other["registrations_prev_year"]) == (30, 10)
+    assert other["yoy_pct"] == 200.0
+    assert top_n(df, 10)[1] == 0
+
+
+def test_downsample_long_ranges():
+    periods = pd.date_range("2010-01-01", periods=180, freq="MS")
+    df = pd.DataFrame({
+        "period": np.repeat(periods, 2),
+        "vehicle_category": ["2W", "4W"] * 180,
+        "registrations": 1,
+    })
+
+    same, freq = downsample(df, max_points=200)
+    assert freq == "month" and same is df
+    quarterly, freq = downsample(df, by=["vehicle_category"])
+    assert freq == "quarter"
+    assert len(quarterly) == 120 and (quarterly["registrations"] == 3).all()
+    yearly, freq = downsample(df, by=["vehicle_category"], max_points=10)
+    assert freq == "year" and yearly["registrations"].sum() == 360
+
+
+def test_payload_bytes_grows_with_data():
+    small = alt.Chart(pd.DataFrame({"x": range(10)})).mark_bar().encode(x="x:Q")
+    large = alt.Chart(pd.DataFrame({"x": range(1_000)})).mark_bar().encode(x="x:Q")
+    assert 0 < payload_bytes(small) < payload_bytes(large)
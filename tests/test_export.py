@@ -0,0 +1,65 @@
+import io
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Ensure src is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src import export
+from src.export import build_export, stream_export
+from src.query import FACT_DTYPES
+
+FACTS = pd.DataFrame({
+    "day": [20250101, 20250101, 20250215],
+    "month_key": [24300, 24300, 24301],
+    "vehicle_category": ["2W", "4W", "2W"],
+    "maker": ["A", "B", "A"],
+    "registrations": [100, 200, 150],
+}).astype(FACT_DTYPES)
+
+EXPECTED = pd.DataFrame({
+    "date": pd.to_datetime(["2025-01-01", "2025-01-01", "2025-02-15"]),
+    "vehicle_category": ["2W", "4W", "2W"],
+    "maker": ["A", "B", "A"],
+    "registrations": [100, 200, 150],
+    "period": pd.to_datetime(["2025-01-01", "2025-01-01", "2025-02-01"]),
+})
+
+
+@pytest.mark.parametrize("fmt", ["csv.gz", "parquet", "xlsx"])
+def test_export_round_trip(fmt):
+    data = build_export(FACTS, fmt, chunk_rows=2).read()
+
+    if fmt == "csv.gz":
+        df = pd.read_csv(io.BytesIO(data), compression="gzip", parse_dates=["date", "period"])
+    elif fmt == "parquet":
+        df = pd.read_parquet(io.BytesIO(data))
+        df[["date", "period"]] = df[["date", "period"]].apply(pd.to_datetime)
+    else:
+        df = pd.read_excel(io.BytesIO(data))
+    pd.testing.assert_frame_equal(df, EXPECTED, check_dtype=False)
+
+
+def test_large_export_spills_and_streams():
+    spool = build_export(FACTS, "csv.gz", spill_bytes=10)
+    assert spool._rolled
+    spool.close()
+
+    blocks = list(stream_export(FACTS, "csv.gz", block_bytes=16))
+    assert all(len(block) <= 16 for block in blocks)
+    assert b"".join(blocks) == build_export(FACTS, "csv.gz").read()
+
+
+def test_xlsx_splits_sheets(monkeypatch):
+    monkeypatch.setattr(export, "XLSX_SHEET_ROWS", 2)
+    sheets = pd.read_excel(io.BytesIO(build_export(FACTS, "xlsx").read()), sheet_name=None)
+
+    assert [len(df) for df in sheets.values()] == [2, 1]
+
+
+def test_empty_export_has_header():
+    df = pd.read_csv(io.BytesIO(build_export(FACTS.iloc[:0], "csv.gz").read()), compression="gzip")
+    assert list(df.columns) == list(EXPECTED.columns) and df.empty
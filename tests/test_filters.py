@@ -0,0 +1,83 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Ensure src is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.filters import FilterIndex
+from src.query import Filters
+
+
+def _facts(rows=5_000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "month_key": np.sort(rng.integers(24_000, 24_060, rows)).astype("int32"),
+        "vehicle_category": pd.Categorical(rng.choice(["2W", "3W", "4W", "LMV"], rows)),
+        "maker": pd.Categorical(rng.choice([f"M{i:03d}" for i in range(300)], rows)),
+        "registrations": rng.integers(0, 1_000, rows).astype("int32"),
+    })
+    return df
+
+
+def _expected(df, filters):
+    mask = pd.Series(True, index=df.index)
+    if filters.start_month is not None:
+        mask &= df["month_key"] >= filters.start_month
+    if filters.end_month is not None:
+        mask &= df["month_key"] <= filters.end_month
+    if filters.categories is not None:
+        mask &= df["vehicle_category"].isin(filters.categories)
+    if filters.makers is not None:
+        mask &= df["maker"].isin(filters.makers)
+    return df[mask]
+
+
+def test_select_matches_boolean_mask():
+    df = _facts()
+    index = FilterIndex(df)
+    makers = [f"M{i:03d}" for i in range(300)]
+    for filters in (
+        Filters(),
+        Filters(24_010, 24_020),
+        Filters(makers=("M001",)),
+        Filters(24_005, None, ("2W", "LMV"), tuple(makers[:10])),
+        Filters(None, 24_030, ("3W",), tuple(makers[5:])),
+        Filters(categories=("4W", "missing")),
+        Filters(24_100, None),
+    ):
+        pd.testing.assert_frame_equal(index.select(filters), _expected(df, filters))
+
+
+def test_range_only_selection_is_a_slice():
+    df = _facts()
+    index = FilterIndex(df)
+
+    rows = index.positions(Filters(24_010, 24_020))
+    assert isinstance(rows, slice)
+    assert np.shares_memory(index.select(Filters(24_010, 24_020))["registrations"].to_numpy(), df["registrations"].to_numpy())
+
+
+def test_unordered_frame_and_quarter_keys():
+    df = _facts().sample(frac=1, random_state=1)
+    df["vehicle_category"] = df["vehicle_category"].astype(str)
+    quarters = FilterIndex(df, df["month_key"].to_numpy() // 3, quarterly=True)
+    filters = Filters(24_012, 24_020, categories=("2W",))
+
+    got = quarters.select(filters)
+    keys = df["month_key"] // 3
+    expected = df[(keys >= 24_012 // 3) & (keys <= 24_020 // 3) & (df["vehicle_category"] == "2W")]
+    pd.testing.assert_frame_equal(got, expected)
+
+
+def test_contiguous_selection_is_a_view():
+    df = _facts().sort_values(["maker", "month_key"], ignore_index=True)
+    index = FilterIndex(df)
+    filters = Filters(24_010, 24_020, makers=("M007",))
+
+    got = index.select(filters)
+    assert isinstance(index.positions(filters), slice)
+    assert np.shares_memory(got["registrations"].to_numpy(), df["registrations"].to_numpy())
+    pd.testing.assert_frame_equal(got, _expected(df, filters))
@@ -1,11 +1,23 @@
 import os
 import sys
+import sqlite3
+
 import pandas as pd
+import pytest
 
 # Ensure src is importable
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from src.ingest import _load_vahan_records
+from src.ingest import (
+    SAMPLE_DATA,
+    _load_vahan_records,
+    ingest_file,
+    ingest_files,
+    ingest_stream,
+    init_db,
+    resolve_sources,
+)
+from src.storage import ensure_schema
 
 
 def test_load_vahan_records_csv(tmp_path):
@@ -23,3 +35,237 @@ def test_load_vahan_records_csv(tmp_path):
         ("2025-01-01", "2W", "A", 100),
         ("2025-02-01", "4W", "B", 200),
     ]
+
+
+def test_load_vahan_records_csv_keeps_first_of_duplicate_aliases(tmp_path):
+    csv_file = tmp_path / "export.csv"
+    csv_file.write_text(
+        "Date,Vehicle Category,Maker,Registrations,Total,Month\n"
+        "2025-01-01,2W,A,100,999,2024-12-01\n"
+    )
+
+    records = list(_load_vahan_records(str(csv_file)))
+    assert records == [("2025-01-01", "2W", "A", 100)]
+
+
+def test_ingest_stream_commits_in_chunks(tmp_path):
+    df = pd.DataFrame({
+        "date": ["2025-01-01"] * 5,
+        "vehicle_category": ["2W"] * 5,
+        "maker": ["A", "B", "C", "D", "E"],
+        "registrations": [1, 2, 3, 4, 5],
+    })
+    csv_file = tmp_path / "sample.csv"
+    df.to_csv(csv_file, index=False)
+    db_file = tmp_path / "vahan.db"
+
+    conn = sqlite3.connect(db_file)
+    ensure_schema(conn)
+    stats = ingest_stream(conn, str(csv_file), chunksize=2)
+    total = conn.execute("SELECT SUM(registrations) FROM registrations").fetchone()[0]
+    conn.close()
+
+    assert (stats.rows, stats.chunks) == (5, 3)
+    assert stats.rows_per_sec > 0
+    assert total == 15
+
+
+def test_load_vahan_records_xlsx_by_content(tmp_path):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Maker wise registrations (2025)"])
+    sheet.append([])
+    sheet.append(["S No", "Month", "Vehicle Category Group", "Manufacturer", "Registrations"])
+    sheet.append([1, "2025-01-01", "2W", "A", "1,200"])
+    sheet.append([2, "2025-02-01", "4W", "B", 23])
+    xlsx_file = tmp_path / "export.csv"
+    workbook.save(xlsx_file)
+
+    records = list(_load_vahan_records(str(xlsx_file)))
+    assert records == [
+        ("2025-01-01", "2W", "A", 1200),
+        ("2025-02-01", "4W", "B", 23),
+    ]
+
+
+def test_load_vahan_records_xlsx_without_header(tmp_path):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    workbook.active.append(["S No", "Vehicle Class", "TOTAL"])
+    xlsx_file = tmp_path / "export.xlsx"
+    workbook.save(xlsx_file)
+
+    with pytest.raises(ValueError):
+        list(_load_vahan_records(str(xlsx_file)))
+
+
+def test_vehicle_class_cross_tab_is_reported_as_unsupported(tmp_path, capsys):
+    from openpyxl import Workbook
+
+    # Same layout as the shipped data/vahan.csv: yearly totals by vehicle
+    # class x category, with no date or maker columns.
+    pad = "\xa0" * 20
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Vehicle Class Wise Vehicle Category Group Data  For All State (2025)"])
+    sheet.append(["S No", f"{pad} Vehicle Class {pad}", "Vehicle Category Group"])
+    sheet.append([None, None, "FOUR WHEELER"])
+    sheet.append([])
+    sheet.append(["", "", "4WIC", "LMV", "MMV", "HMV", "TOTAL"])
+    sheet.append(["1", "ADAPTED VEHICLE", "1,964", "0", "0", "0", "1,964"])
+    sheet.append(["2", "MOTOR CAR", "0", "23,30,160", "0", "0", "23,30,160"])
+    export = tmp_path / "vahan.csv"
+    workbook.save(export)
+
+    with pytest.raises(ValueError, match="cross-tab.*not supported"):
+        list(_load_vahan_records(str(export)))
+
+    db = tmp_path / "vahan.db"
+    init_db(str(db), str(export), snapshot_dir=None)
+    conn = sqlite3.connect(db)
+    rows = conn.execute("SELECT COUNT(*) FROM registrations").fetchone()[0]
+    conn.close()
+    assert rows == len(SAMPLE_DATA)
+    assert "not supported" in capsys.readouterr().out
+
+
+def test_ingest_file_is_incremental(tmp_path):
+    df = pd.DataFrame({
+        "date": ["2025-01-01", "2025-01-01"],
+        "vehicle_category": ["2W", "4W"],
+        "maker": ["A", "B"],
+        "registrations": [100, 200],
+    })
+    csv_file = tmp_path / "sample.csv"
+    df.to_csv(csv_file, index=False)
+    conn = sqlite3.connect(tmp_path / "vahan.db")
+    ensure_schema(conn)
+
+    first = ingest_file(conn, str(csv_file))
+    again = ingest_file(conn, str(csv_file))
+
+    df.loc[1, "registrations"] = 250
+    df.loc[2] = ["2025-02-01", "2W", "A", 120]
+    df.to_csv(csv_file, index=False)
+    refreshed = ingest_file(conn, str(csv_file))
+    rows = conn.execute(
+        "SELECT date, maker, registrations FROM registrations ORDER BY date, maker"
+    ).fetchall()
+    conn.close()
+
+    assert first.changed == 2
+    assert again.skipped
+    assert (refreshed.rows, refreshed.changed) == (3, 2)
+    assert rows == [
+        ("2025-01-01", "A", 100),
+        ("2025-01-01", "B", 250),
+        ("2025-02-01", "A", 120),
+    ]
+
+
+def test_ingest_files_in_parallel_with_manifest(tmp_path):
+    exports = tmp_path / "exports"
+    for month, state in [("01", "DL"), ("01", "KA"), ("02", "DL")]:
+        (exports / f"2025-{month}").mkdir(parents=True, exist_ok=True)
+        pd.DataFrame({
+            "date": [f"2025-{month}-01"],
+            "vehicle_category": ["2W"],
+            "maker": [f"{state} maker"],
+            "registrations": [int(month) * 100],
+        }).to_csv(exports / f"2025-{month}" / f"{state}.csv", index=False)
+    (exports / "broken.csv").write_text("foo,bar\n1,2\n")
+    conn = sqlite3.connect(tmp_path / "vahan.db")
+    ensure_schema(conn)
+
+    sources = resolve_sources(str(exports))
+    first = ingest_files(conn, sources, workers=2)
+    again = ingest_files(conn, resolve_sources(str(exports / "**" / "*.csv")), workers=2)
+    rows = conn.execute("SELECT date, maker, registrations FROM registrations ORDER BY date, maker").fetchall()
+    manifest = dict(conn.execute("SELECT source, status FROM ingest_manifest"))
+    conn.close()
+
+    assert len(sources) == 4
+    assert (first.files, first.rows) == (4, 3)
+    assert [os.path.basename(source) for source, _ in first.failed] == ["broken.csv"]
+    assert again.rows == 0
+    assert rows == [
+        ("2025-01-01", "DL maker", 100),
+        ("2025-01-01", "KA maker", 100),
+        ("2025-02-01", "DL maker", 200),
+    ]
+    assert sorted(manifest.values()) == ["failed", "skipped", "skipped", "skipped"]
+
+
+def test_ingest_files_rolls_back_a_file_that_fails_mid_stream(tmp_path):
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    header = "date,vehicle_category,maker,registrations\n"
+    good = "".join(f"2025-0{m}-01,2W,A,{m * 10}\n" for m in range(1, 7))
+    (exports / "good.csv").write_text(header + good)
+    # The unterminated quote only fails after three chunks have been streamed.
+    (exports / "partial.csv").write_text(header + good.replace(",A,", ",B,") + "\"2025-07-01,2W,B,70\n")
+    conn = sqlite3.connect(tmp_path / "vahan.db")
+    ensure_schema(conn)
+
+    stats = ingest_files(conn, resolve_sources(str(exports)), chunksize=2, workers=2)
+    makers = conn.execute("SELECT maker, COUNT(*) FROM registrations GROUP BY maker").fetchall()
+    quarantined = conn.execute("SELECT COUNT(*) FROM quarantine").fetchone()[0]
+    conn.close()
+
+    assert (stats.rows, stats.chunks) == (6, 3)
+    assert [os.path.basename(source) for source, _ in stats.failed] == ["partial.csv"]
+    assert makers == [("A", 6)]
+    assert quarantined == 0
+
+
+def test_ingest_file_keeps_state_and_rto(tmp_path):
+    csv_file = tmp_path / "rto.csv"
+    pd.DataFrame({
+        "Date": ["2025-01-01", "2025-01-01", "2025-01-01"],
+        "Vehicle Category": ["2W", "2W", "2W"],
+        "Maker": ["A", "A", "A"],
+        "State Name": ["Karnataka", "Karnataka", None],
+        "RTO Office": ["Bengaluru", "Mysuru", "Pune"],
+        "Registrations": [100, 50, 25],
+    }).to_csv(csv_file, index=False)
+    conn = sqlite3.connect(tmp_path / "vahan.db")
+    ensure_schema(conn)
+
+    stats = ingest_file(conn, str(csv_file))
+    national = conn.execute("SELECT registrations FROM registrations").fetchall()
+    areas = conn.execute(
+        "SELECT s.name, t.name, SUM(g.registrations) FROM geo_facts AS g"
+        " JOIN rtos AS t ON t.id = g.rto_id JOIN states AS s ON s.id = t.state_id"
+        " GROUP BY t.id ORDER BY s.name, t.name"
+    ).fetchall()
+    conn.close()
+
+    assert stats.changed == 3
+    assert national == [(175,)]
+    assert areas == [("Karnataka", "Bengaluru", 100), ("Karnataka", "Mysuru", 50), ("Unknown", "Pune", 25)]
+
+
+def test_ingest_file_quarantines_rejected_rows(tmp_path):
+    csv_file = tmp_path / "dirty.csv"
+    pd.DataFrame({
+        "date": ["2025-01-01", "2025-01-01", "2025-02-01", "2099-01-01"],
+        "vehicle_category": ["2W", "2W", "2W", "2W"],
+        "maker": ["HONDA MOTORCYCLE & SCOOTER INDIA PVT LTD", "Honda", "Honda", "Honda"],
+        "registrations": ["100", "120", "n/a", "5"],
+    }).to_csv(csv_file, index=False)
+    conn = sqlite3.connect(tmp_path / "vahan.db")
+    ensure_schema(conn)
+
+    stats = ingest_file(conn, str(csv_file))
+    ingest_file(conn, str(csv_file), force=True)
+    rows = conn.execute("SELECT date, maker, registrations FROM registrations").fetchall()
+    quarantined = conn.execute("SELECT rule, registrations FROM quarantine ORDER BY id").fetchall()
+    conn.close()
+
+    assert (stats.rows, stats.rejected) == (1, 3)
+    assert rows == [("2025-01-01", "Honda", 120)]
+    # Re-ingesting the file replaces its quarantined rows.
+    assert quarantined == [("duplicate", "100"), ("bad_count", "n/a"), ("date_out_of_range", "5")]
@@ -0,0 +1,72 @@
+import json
+import logging
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Ensure src is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.instrument import METRICS_ENV, recording, span
+from src.transform import compute_yoy_qoq
+
+
+@span("test.decorated")
+def _decorated(fail=False):
+    with span("test.inner", rows=3):
+        if fail:
+            raise ValueError("boom")
+
+
+def test_spans_nest_and_record_errors():
+    with recording() as spans:
+        with span("test.outer") as outer:
+            _decorated()
+            outer.fields["files"] = 2
+        with pytest.raises(ValueError):
+            _decorated(fail=True)
+
+    assert [record.name for record in spans] == [
+        "test.inner", "test.decorated", "test.outer", "test.inner", "test.decorated"
+    ]
+    inner, decorated, outer = spans[:3]
+    assert (inner.depth, inner.parent, inner.fields) == (2, "test.decorated", {"rows": 3})
+    assert (outer.depth, outer.parent, outer.fields) == (0, None, {"files": 2})
+    assert outer.seconds >= decorated.seconds >= inner.seconds >= 0
+    assert spans[-1].fields == {"error": "ValueError"} and spans[-1].depth == 0
+    assert all(record.rss_mb > 0 for record in spans)
+
+
+def test_transform_stages_are_recorded():
+    df = pd.DataFrame({
+        "date": ["2024-01-01", "2025-01-01"],
+        "vehicle_category": ["2W", "2W"],
+        "maker": ["A", "A"],
+        "registrations": [100, 150],
+    })
+    with recording() as spans:
+        compute_yoy_qoq(df)
+
+    names = [record.name for record in spans]
+    assert names[-1] == "transform.compute_yoy_qoq"
+    assert {"transform.aggregate", "transform.growth"} <= set(names)
+
+
+def test_metrics_file_and_log_sinks(tmp_path, monkeypatch, caplog):
+    path = tmp_path / "metrics.jsonl"
+    monkeypatch.setenv(METRICS_ENV, str(path))
+    with span("test.file", source="a.csv"):
+        pass
+    _decorated()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["name"] for r in records] == ["test.file", "test.inner", "test.decorated"]
+    assert records[0]["fields"] == {"source": "a.csv"} and records[0]["pid"] == os.getpid()
+
+    monkeypatch.setenv(METRICS_ENV, "log")
+    with caplog.at_level(logging.INFO, logger="vahan.metrics"):
+        with span("test.log"):
+            pass
+    assert json.loads(caplog.records[-1].getMessage())["name"] == "test.log"
@@ -0,0 +1,196 @@
+import os
+import sys
+
+import pandas as pd
+
+# Ensure src is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.query import (
+    Filters,
+    expand_facts,
+    read_category_growth,
+    read_dimensions,
+    read_facts,
+    read_geo_totals,
+    read_maker_growth,
+    read_monthly_totals,
+    read_rankings,
+    read_windowed_metrics,
+)
+from src.storage import connect, ensure_schema, refresh_rollups, upsert_frame
+from src.transform import compute_category_growth, compute_windowed_metrics, compute_yoy_qoq
+
+ROWS = pd.DataFrame({
+    "date": ["2024-01-01", "2024-01-01", "2024-02-01", "2025-01-01", "2025-01-01", "2025-02-01"],
+    "vehicle_category": ["2W", "4W", "2W", "2W", "4W", "2W"],
+    "maker": ["A", "B", "A", "A", "B", "C"],
+    "registrations": [100, 200, 110, 150, 220, 40],
+})
+
+
+def _db(tmp_path):
+    conn = connect(str(tmp_path / "vahan.db"))
+    ensure_schema(conn)
+    with conn:
+        upsert_frame(conn, ROWS)
+    refresh_rollups(conn)
+    return conn
+
+
+def test_read_maker_growth_matches_transform(tmp_path):
+    conn = _db(tmp_path)
+    monthly, quarterly = read_maker_growth(conn)
+    conn.close()
+    expected, expected_q = compute_yoy_qoq(ROWS)
+
+    pd.testing.assert_series_equal(monthly["yoy_pct"], expected["yoy_pct"].reset_index(drop=True))
+    assert list(monthly.columns) == list(expected.columns)
+    assert list(quarterly.columns) == list(expected_q.columns)
+
+
+def test_read_category_growth_with_maker_filter(tmp_path):
+    conn = _db(tmp_path)
+    filters = Filters.from_selection("2025-01-01", "2025-02-01", makers=["A", "B"])
+    monthly, _ = read_category_growth(conn, filters)
+    unfiltered, _ = read_category_growth(conn)
+    conn.close()
+    expected, _ = compute_category_growth(ROWS[ROWS["maker"] != "C"])
+
+    jan = monthly[monthly["period"] == pd.Timestamp("2025-01-01")].set_index("vehicle_category")
+    assert jan.loc["2W", "yoy_pct"] == 50.0
+    assert jan.loc["4W", "yoy_pct"] == 10.0
+    # The 2024 rows are outside the range but still provide the prior year.
+    assert monthly["period"].min() == pd.Timestamp("2025-01-01")
+    assert set(monthly["registrations"]) <= set(expected["registrations"])
+    feb = unfiltered[unfiltered["period"] == pd.Timestamp("2025-02-01")]
+    assert feb["registrations"].tolist() == [40]
+
+
+def test_read_dimensions_and_facts(tmp_path):
+    conn = _db(tmp_path)
+    dims = read_dimensions(conn)
+    facts = read_facts(conn, Filters.from_selection("2025-01-01", None, ["2W"]))
+    totals = read_monthly_totals(conn, Filters.from_selection(makers=["A", "C"]))
+    conn.close()
+
+    assert dims.categories == ("2W", "4W")
+    assert dims.makers == ("A", "B", "C")
+    assert dims.top_makers == ("B", "A", "C")
+    assert (dims.start_month, dims.end_month) == (2024 * 12, 2025 * 12 + 1)
+    assert facts.dtypes.astype(str).to_dict() == {
+        "day": "int32",
+        "month_key": "int32",
+        "vehicle_category": "category",
+        "maker": "category",
+        "registrations": "int32",
+    }
+    assert facts[["day", "maker", "registrations"]].values.tolist() == [
+        [20250101, "A", 150],
+        [20250201, "C", 40],
+    ]
+    expanded = expand_facts(facts)
+    assert expanded["date"].dt.strftime("%Y-%m-%d").tolist() == ["2025-01-01", "2025-02-01"]
+    assert expanded["period"].tolist() == [pd.Timestamp("2025-01-01"), pd.Timestamp("2025-02-01")]
+    assert totals["registrations"].tolist() == [100, 110, 150, 40]
+
+
+def test_read_windowed_metrics_matches_transform(tmp_path):
+    conn = _db(tmp_path)
+    makers, categories = read_windowed_metrics(conn)
+    expected_makers, expected_categories = compute_windowed_metrics(ROWS)
+    pd.testing.assert_frame_equal(makers, expected_makers, check_dtype=False)
+    pd.testing.assert_frame_equal(categories, expected_categories, check_dtype=False)
+
+    # Maker shares stay within the whole category; history before the range counts.
+    selected, _ = read_windowed_metrics(conn, Filters(start_month=2025 * 12, makers=("A",)))
+    conn.close()
+    expected = expected_makers[
+        (expected_makers["maker"] == "A") & (expected_makers["period"] >= "2025-01-01")
+    ]
+    pd.testing.assert_frame_equal(selected, expected.reset_index(drop=True), check_dtype=False)
+
+
+def test_geo_filters_read_the_area_rollups(tmp_path):
+    rows = pd.concat([
+        ROWS.assign(state="KA", rto="KA01"),
+        ROWS.assign(state="MH", rto="MH01", registrations=ROWS["registrations"] * 2),
+    ], ignore_index=True)
+    conn = connect(str(tmp_path / "vahan.db"))
+    ensure_schema(conn)
+    with conn:
+        upsert_frame(conn, rows)
+    refresh_rollups(conn)
+
+    dims = read_dimensions(conn)
+    filters = Filters(start_month=2025 * 12, states=("MH",))
+    monthly, quarterly = read_maker_growth(conn, filters)
+    cat_month, _ = read_category_growth(conn, Filters(rtos=("KA01",)))
+    facts = read_facts(conn, filters)
+    totals = read_geo_totals(conn, Filters(start_month=2025 * 12), level="state")
+    by_rto = read_geo_totals(conn, Filters(states=("KA",)), level="rto")
+    national = read_monthly_totals(conn)
+    conn.close()
+
+    assert dims.states == ("KA", "MH") and dims.rtos == (("KA", "KA01"), ("MH", "MH01"))
+    expected, expected_q = compute_yoy_qoq(rows[rows["state"] == "MH"])
+    expected = expected[expected["period"] >= "2025-01-01"].reset_index(drop=True)
+    pd.testing.assert_frame_equal(monthly, expected, check_dtype=False, check_categorical=False)
+    assert list(quarterly.columns) == list(expected_q.columns)
+    assert cat_month["registrations"].tolist() == [100, 110, 150, 40, 200, 220]
+    assert facts["registrations"].sum() == 2 * 410
+    assert national["registrations"].tolist() == [900, 330, 1110, 120]
+    assert totals[["state", "registrations", "prev_year_regs"]].values.tolist() == [
+        ["KA", 370, 300], ["KA", 40, 110], ["MH", 740, 600], ["MH", 80, 220],
+    ]
+    assert list(by_rto.columns) == ["period", "state", "rto", "registrations", "prev_year_regs", "yoy_pct"]
+    assert set(by_rto["rto"]) == {"KA01"}
+
+
+def test_read_rankings(tmp_path):
+    rows = ROWS.assign(state="KA", rto="KA01")
+    conn = _db(tmp_path)
+    latest = read_rankings(conn)
+    january = read_rankings(conn, Filters(end_month=2025 * 12, makers=("A",)))
+    with conn:
+        upsert_frame(conn, rows)
+    refresh_rollups(conn)
+    by_state = read_rankings(conn, Filters(end_month=2025 * 12, states=("KA",)))
+    conn.close()
+
+    assert latest[["vehicle_category", "maker", "rank", "share_pct"]].values.tolist() == [["2W", "C", 1, 100.0]]
+    assert latest["prev_rank"].isna().all()
+    assert january[["maker", "registrations", "rank", "share_pct", "share_yoy_bps"]].values.tolist() == [
+        ["A", 150, 1, 100.0, 0.0],
+    ]
+    assert january["period"].tolist() == [pd.Timestamp("2025-01-01")]
+    assert by_state[["vehicle_category", "maker", "rank", "share_yoy_bps"]].values.tolist() == [
+        ["2W", "A", 1, 0.0], ["4W", "B", 1, 0.0],
+    ]
+
+
+def test_category_growth_counts_makers_missing_from_the_current_period(tmp_path):
+    rows = pd.DataFrame({
+        "date": ["2024-03-01", "2024-03-01", "2024-06-01", "2025-03-01"],
+        "vehicle_category": ["2W"] * 4,
+        "maker": ["A", "B", "B", "A"],
+        "registrations": [100, 100, 80, 100],
+    })
+    conn = connect(str(tmp_path / "vahan.db"))
+    ensure_schema(conn)
+    with conn:
+        upsert_frame(conn, rows)
+    refresh_rollups(conn)
+    filters = Filters.from_selection("2024-04-01", None, makers=["A", "B"])
+    monthly, quarterly = read_category_growth(conn, filters)
+    conn.close()
+    expected, expected_q = compute_category_growth(rows)
+
+    march = monthly[monthly["period"] == pd.Timestamp("2025-03-01")]
+    assert march[["registrations", "prev_year_regs", "yoy_pct"]].values.tolist() == [[100, 200, -50.0]]
+    # The 2024 Q1 total (200) is outside the range but is Q2's prior quarter.
+    assert quarterly["prev_q_regs"].tolist()[0] == 200
+    expected = expected[expected["period"] >= "2024-04-01"].reset_index(drop=True)
+    pd.testing.assert_series_equal(monthly["yoy_pct"], expected["yoy_pct"], check_names=False)
+    expected_q = expected_q[expected_q["quarter"] >= "2024-04-01"].reset_index(drop=True)
+    pd.testing.assert_series_equal(quarterly["qoq_pct"], expected_q["qoq_pct"], check_names=False)
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Ensure src is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ranking import RANK_COLUMNS, movements, rank_makers, top_k
+from src.storage import connect, ensure_schema, refresh_rollups, upsert_frame
+
+
+def _rows(rng, months, makers=40):
+    dates = [f"{year}-{month:02d}-01" for year, month in months]
+    grid = pd.MultiIndex.from_product(
+        [dates, ["2W", "4W"], [f"M{i:02d}" for i in range(makers)]],
+        names=["date", "vehicle_category", "maker"],
+    ).to_frame(index=False)
+    # Few distinct volumes, so ranks tie often.
+    grid["registrations"] = rng.integers(1, 8, len(grid)) * 10
+    return grid.sample(frac=0.8, random_state=1).reset_index(drop=True)
+
+
+def _stored(conn):
+    stored = movements(pd.read_sql(
+        """
+        SELECT r.month_key, c.name AS vehicle_category, m.name AS maker, r.registrations,
+               r.rank, r.prev_rank, r.share_pct, r.prev_share_pct, r.prev_year_share_pct
+        FROM rollup_maker_rank AS r
+        JOIN categories AS c ON c.id = r.category_id
+        JOIN makers AS m ON m.id = r.maker_id
+        """,
+        conn,
+    ))
+    expected = rank_makers(pd.read_sql(
+        """
+        SELECT r.month_key, c.name AS vehicle_category, m.name AS maker, r.registrations
+        FROM rollup_maker_month AS r
+        JOIN categories AS c ON c.id = r.category_id
+        JOIN makers AS m ON m.id = r.maker_id
+        """,
+        conn,
+    ))
+    order = ["month_key", "vehicle_category", "maker"]
+    return (
+        stored.sort_values(order, ignore_index=True),
+        expected.sort_values(order, ignore_index=True),
+    )
+
+
+def test_rank_makers_matches_stored_ranks(tmp_path):
+    rng = np.random.default_rng(7)
+    conn = connect(str(tmp_path / "vahan.db"))
+    ensure_schema(conn)
+    with conn:
+        upsert_frame(conn, _rows(rng, [(2024, m) for m in range(1, 13)] + [(2025, 1), (2025, 2)]))
+    refresh_rollups(conn)
+    stored, expected = _stored(conn)
+    pd.testing.assert_frame_equal(stored, expected, check_dtype=False)
+    assert stored["rank"].min() == 1 and stored["rank"].duplicated().any()
+
+    # Rewriting one month re-ranks it and refreshes the movements of the
+    # month after it and of the same month a year on.
+    with conn:
+        upsert_frame(conn, _rows(rng, [(2024, 1)]))
+    refresh_rollups(conn)
+    stored, expected = _stored(conn)
+    conn.close()
+    pd.testing.assert_frame_equal(stored, expected, check_dtype=False)
+    assert list(stored.columns[-len(RANK_COLUMNS):]) == RANK_COLUMNS
+
+
+def test_top_k_matches_full_sort():
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({"maker": [f"M{i}" for i in range(500)], "share": rng.normal(size=500)})
+    df.loc[::50, "share"] = np.nan
+    ranked = df.dropna().sort_values("share", ascending=False, kind="stable")
+
+    pd.testing.assert_frame_equal(top_k(df, 10, by="share"), ranked.head(10))
+    pd.testing.assert_frame_equal(top_k(df, 10, by="share", largest=False), ranked[::-1].head(10))
+    assert len(top_k(df, 1000, by="share")) == len(ranked)
+    assert top_k(df, 0, by="share").empty
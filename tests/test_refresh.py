@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+# Ensure src is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import src.ingest
+from src.query import Filters
+from src.refresh import RefreshWorker, refresh_once
+from src.snapshot import load_facts, snapshot_version
+from src.storage import connect, data_version, published_version
+
+
+def _drop(directory, name, registrations, age=60):
+    path = directory / f"{name}.csv"
+    pd.DataFrame({
+        "date": [f"2025-{name}-01", f"2025-{name}-15"],
+        "vehicle_category": ["2W", "2W"],
+        "maker": ["A", "A"],
+        "registrations": registrations,
+    }).to_csv(path, index=False)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_refresh_publishes_new_version_and_keeps_old_snapshot(tmp_path):
+    drop, db, root = tmp_path / "drop", str(tmp_path / "vahan.db"), str(tmp_path / "snapshot")
+    drop.mkdir()
+    _drop(drop, "01", [10, 20])
+
+    assert refresh_once(str(drop), db, root).changed == 2
+    conn = connect(db)
+    first = published_version(conn)
+    assert first == data_version(conn) == snapshot_version(root)
+
+    # A file still being copied waits for a later pass.
+    _drop(drop, "02", [5, 5], age=0)
+    refresh_once(str(drop), db, root)
+    assert published_version(conn) == first
+
+    _drop(drop, "02", [5, 5])
+    refresh_once(str(drop), db, root)
+    second = published_version(conn)
+    assert second > first and snapshot_version(root) == second
+    # Readers still on the previous version read its snapshot until they rerun.
+    old = load_facts(conn, Filters(), root, version=first)
+    new = load_facts(conn, Filters(), root, version=second)
+    conn.close()
+    assert old["registrations"].sum() == 30 and new["registrations"].sum() == 40
+
+
+def test_worker_refreshes_in_background(tmp_path):
+    drop, db = tmp_path / "drop", str(tmp_path / "vahan.db")
+    drop.mkdir()
+    _drop(drop, "01", [10, 20])
+
+    worker = RefreshWorker(str(drop), db, str(tmp_path / "snapshot"), interval=0.05)
+    worker.start()
+    deadline = time.time() + 30
+    while worker.last_stats is None and time.time() < deadline:
+        time.sleep(0.05)
+    worker.stop(timeout=30)
+
+    assert not worker.is_alive() and worker.last_error is None
+    assert worker.last_stats.changed == 2
+    conn = connect(db)
+    assert published_version(conn) == data_version(conn)
+    conn.close()
+
+
+def test_refresh_readers_see_old_version_until_publish(tmp_path, monkeypatch):
+    drop, db, root = tmp_path / "drop", str(tmp_path / "vahan.db"), str(tmp_path / "snapshot")
+    drop.mkdir()
+    _drop(drop, "01", [10, 20])
+    refresh_once(str(drop), db, root)
+    conn = connect(db)
+    first = published_version(conn)
+    conn.close()
+
+    seen = []
+    refresh_anomalies = src.ingest.refresh_anomalies
+
+    def reading(writer):
+        # Rows and rollups are written by now, the version not yet bumped.
+        reader = connect(db)
+        seen.append((
+            published_version(reader),
+            reader.execute("SELECT SUM(registrations) FROM rollup_maker_month").fetchone()[0],
+        ))
+        reader.close()
+        return refresh_anomalies(writer)
+
+    monkeypatch.setattr(src.ingest, "refresh_anomalies", reading)
+    _drop(drop, "02", [5, 5])
+    refresh_once(str(drop), db, root)
+
+    conn = connect(db)
+    second = published_version(conn)
+    total = conn.execute("SELECT SUM(registrations) FROM rollup_maker_month").fetchone()[0]
+    conn.close()
+    assert seen == [(first, 30)]
+    assert second > first and total == 40
+
+
+def test_failed_refresh_publishes_nothing(tmp_path, monkeypatch):
+    drop, db, root = tmp_path / "drop", str(tmp_path / "vahan.db"), str(tmp_path / "snapshot")
+    drop.mkdir()
+    _drop(drop, "01", [10, 20])
+    refresh_once(str(drop), db, root)
+    conn = connect(db)
+    first = published_version(conn)
+    conn.close()
+
+    def failing(conn):
+        raise RuntimeError("disk full")
+
+    # Fails after the rows, rollups and snapshot were written.
+    monkeypatch.setattr(src.ingest, "publish_version", failing)
+    _drop(drop, "02", [5, 5])
+    with pytest.raises(RuntimeError):
+        refresh_once(str(drop), db, root)
+    conn = connect(db)
+    assert published_version(conn) == first
+    assert conn.execute("SELECT SUM(registrations) FROM registrations").fetchone()[0] == 30
+    conn.close()
+
+    # The next pass redoes all of it, snapshot included, even though the
+    # version it publishes is the one the failed pass wrote a snapshot for.
+    monkeypatch.undo()
+    _drop(drop, "02", [7, 7])
+    refresh_once(str(drop), db, root)
+    conn = connect(db)
+    second = published_version(conn)
+    facts = load_facts(conn, Filters(), root, version=second)
+    conn.close()
+    assert second > first and snapshot_version(root) == second
+    assert facts["registrations"].sum() == 44
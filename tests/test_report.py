@@ -0,0 +1,121 @@
+import json
+import os
+import sys
+
+import pandas as pd
+
+# Ensure src is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.query import Filters, read_category_growth, read_maker_growth, read_monthly_totals
+from src.report import GrowthTables, main, run_presets, summarize
+from src.storage import connect, ensure_schema, refresh_rollups, upsert_frame
+from src.transform import compute_category_growth, compute_yoy_qoq
+
+ROWS = pd.DataFrame({
+    "date": ["2024-01-01", "2024-01-01", "2024-02-01", "2025-01-01", "2025-01-01", "2025-02-01"],
+    "vehicle_category": ["2W", "4W", "2W", "2W", "4W", "2W"],
+    "maker": ["A", "B", "A", "A", "B", "C"],
+    "registrations": [100, 200, 110, 150, 220, 40],
+})
+
+
+def _db(tmp_path):
+    conn = connect(str(tmp_path / "vahan.db"))
+    ensure_schema(conn)
+    with conn:
+        upsert_frame(conn, ROWS)
+    refresh_rollups(conn)
+    return conn
+
+
+def _nulls_as_none(df):
+    # SQLite hands back all-NULL columns as None rather than NaN.
+    return df.astype(object).where(df.notna(), None)
+
+
+def test_select_matches_sql(tmp_path):
+    conn = _db(tmp_path)
+    tables = GrowthTables(conn)
+    for filters in (
+        Filters(),
+        Filters.from_selection("2025-01-01", "2025-02-01", makers=["A", "B"]),
+        Filters.from_selection("2024-02-01", None, categories=["2W"]),
+    ):
+        monthly, quarterly, cat_month, cat_quarter, trend = tables.select(filters)
+        expected = (
+            *read_maker_growth(conn, filters),
+            *read_category_growth(conn, filters),
+            read_monthly_totals(conn, filters),
+        )
+        for got, want in zip((monthly, quarterly, cat_month, cat_quarter, trend), expected):
+            pd.testing.assert_frame_equal(_nulls_as_none(got), _nulls_as_none(want))
+    conn.close()
+
+
+def test_summarize_headline_figures(tmp_path):
+    conn = _db(tmp_path)
+    [report] = run_presets(conn, [{"name": "all"}])
+    direct = summarize(
+        "all", Filters(),
+        *read_maker_growth(conn), *read_category_growth(conn), read_monthly_totals(conn),
+    )
+    conn.close()
+
+    assert report.latest_period == pd.Timestamp("2025-02-01")
+    assert report.latest_total == 40
+    assert report.total_yoy == round(100 * (40 - 110) / 110, 2)
+    assert report.insight == direct.insight
+    assert list(report.tables["top_makers_yoy"]["maker"]) == ["C"]
+
+
+def test_maker_filter_matches_baseline_when_makers_drop_out(tmp_path):
+    rows = pd.DataFrame({
+        "date": ["2024-03-01", "2024-03-01", "2024-03-01", "2025-03-01", "2025-03-01"],
+        "vehicle_category": ["2W", "2W", "4W", "2W", "2W"],
+        "maker": ["A", "B", "D", "A", "C"],
+        "registrations": [100, 100, 50, 100, 500],
+    })
+    conn = connect(str(tmp_path / "vahan.db"))
+    ensure_schema(conn)
+    with conn:
+        upsert_frame(conn, rows)
+    refresh_rollups(conn)
+    filters = Filters.from_selection(makers=["A", "B", "D"])
+    [report] = run_presets(conn, [{"name": "abd", "makers": ["A", "B", "D"]}])
+    _, _, cat_month, cat_quarter, _ = GrowthTables(conn).select(filters)
+    conn.close()
+
+    selected = rows[rows["maker"] != "C"]
+    expected, expected_q = compute_category_growth(selected)
+    expected = expected.sort_values(["vehicle_category", "period"], ignore_index=True)
+    expected_q = expected_q.sort_values(["vehicle_category", "quarter"], ignore_index=True)
+    pd.testing.assert_series_equal(cat_month["yoy_pct"], expected["yoy_pct"])
+    pd.testing.assert_series_equal(cat_quarter["qoq_pct"], expected_q["qoq_pct"])
+    # Headline YoY as the dashboard computed it from the filtered rows.
+    monthly, _ = compute_yoy_qoq(selected)
+    latest = monthly[monthly["period"] == monthly["period"].max()]["registrations"].sum()
+    prior = monthly[monthly["period"] == pd.Timestamp("2024-03-01")]["registrations"].sum()
+    assert report.total_yoy == round(100 * (latest - prior) / prior, 2) == -60.0
+
+
+def test_cli_writes_every_format(tmp_path):
+    _db(tmp_path).close()
+    presets = tmp_path / "presets.json"
+    presets.write_text(json.dumps([
+        {"name": "all"},
+        {"name": "two wheelers", "categories": ["2W"], "start": "2025-01-01"},
+    ]))
+    out = tmp_path / "reports"
+
+    main([
+        "--db", str(tmp_path / "vahan.db"), "--presets", str(presets),
+        "--output-dir", str(out), "--formats", "json,csv,parquet",
+    ])
+
+    summary = json.loads((out / "two_wheelers" / "summary.json").read_text())
+    assert summary["filters"]["categories"] == ["2W"]
+    assert summary["latest_total"] == 40
+    assert (out / "all" / "category_yoy.parquet").exists()
+    trend = pd.read_csv(out / "two_wheelers" / "trend.csv")
+    assert list(trend["registrations"]) == [150, 40]
@@ -0,0 +1,89 @@
+import os
+import sys
+
+import pandas as pd
+
+# Ensure src is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.query import Filters, read_facts
+from src.snapshot import load_facts, read_snapshot, snapshot_version, write_snapshot
+from src.storage import connect, ensure_schema, refresh_rollups, upsert_frame
+
+ROWS = pd.DataFrame({
+    "date": ["2024-01-01", "2024-02-01", "2025-01-01", "2025-01-01"],
+    "vehicle_category": ["2W", "4W", "2W", "4W"],
+    "maker": ["A", "B", "A", "C"],
+    "registrations": [100, 200, 150, 50],
+})
+
+
+def _db(tmp_path):
+    conn = connect(str(tmp_path / "vahan.db"))
+    ensure_schema(conn)
+    with conn:
+        upsert_frame(conn, ROWS)
+    refresh_rollups(conn)
+    return conn
+
+
+def test_write_snapshot_partitions_by_year_and_category(tmp_path):
+    conn = _db(tmp_path)
+    root = str(tmp_path / "snapshot")
+    version = write_snapshot(conn, root)
+    conn.close()
+
+    assert snapshot_version(root) == version
+    partitions = sorted(os.listdir(os.path.join(root, f"v{version}", "year=2025")))
+    assert partitions == ["vehicle_category=2W", "vehicle_category=4W"]
+
+    df = read_snapshot(root, Filters.from_selection("2025-01-01", None, makers=["A", "C"]), ["maker", "registrations"])
+    assert isinstance(df["maker"].dtype, pd.CategoricalDtype)
+    assert sorted(df["registrations"]) == [50, 150]
+
+
+def test_load_facts_matches_sqlite_and_ignores_stale_snapshot(tmp_path):
+    conn = _db(tmp_path)
+    root = str(tmp_path / "snapshot")
+    write_snapshot(conn, root)
+    filters = Filters.from_selection("2024-01-01", "2025-01-01", ["2W"])
+
+    from_snapshot = load_facts(conn, filters, root)
+    from_sqlite = read_facts(conn, filters)
+    pd.testing.assert_frame_equal(from_snapshot, from_sqlite, check_dtype=False, check_categorical=False)
+
+    with conn:
+        upsert_frame(conn, ROWS.assign(registrations=ROWS["registrations"] + 1))
+    refresh_rollups(conn)
+    stale = load_facts(conn, filters, root)
+    conn.close()
+    assert stale["registrations"].tolist() == [101, 151]
+
+
+def test_write_snapshot_rewrites_only_changed_years(tmp_path):
+    conn = _db(tmp_path)
+    root = str(tmp_path / "snapshot")
+    first = write_snapshot(conn, root)
+
+    def files(version, year):
+        base = os.path.join(root, f"v{version}", f"year={year}")
+        return {
+            os.path.relpath(os.path.join(path, name), base): os.stat(os.path.join(path, name)).st_ino
+            for path, _, names in os.walk(base)
+            for name in names
+        }
+
+    with conn:
+        upsert_frame(conn, ROWS.iloc[2:].assign(registrations=[151, 51]))
+    refresh_rollups(conn)
+    second = write_snapshot(conn, root)
+    dirty = conn.execute("SELECT COUNT(*) FROM snapshot_dirty_months").fetchone()[0]
+    from_snapshot = load_facts(conn, Filters(), root)
+    from_sqlite = read_facts(conn, Filters())
+    conn.close()
+
+    assert second > first
+    assert files(second, 2024) == files(first, 2024)
+    assert set(files(second, 2025).values()).isdisjoint(files(first, 2025).values())
+    assert dirty == 0
+    pd.testing.assert_frame_equal(from_snapshot, from_sqlite, check_dtype=False, check_categorical=False)
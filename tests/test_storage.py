@@ -0,0 +1,216 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Ensure src is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.storage import (
+    VersionChanged,
+    connect,
+    ensure_schema,
+    pinned,
+    publish_version,
+    published_version,
+    refresh_rollups,
+    staged,
+    upsert_frame,
+)
+
+
+def test_ensure_schema_migrates_legacy_table(tmp_path):
+    conn = connect(str(tmp_path / "vahan.db"))
+    conn.execute("""
+        CREATE TABLE registrations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            vehicle_category TEXT NOT NULL,
+            maker TEXT NOT NULL,
+            registrations INTEGER NOT NULL
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO registrations (date, vehicle_category, maker, registrations) VALUES (?, ?, ?, ?)",
+        [
+            ("2025-01-01", "2W", "A", 1),
+            ("2025-01-01", "2W", "A", 2),
+            ("2025-02-01", "4W", "B", 3),
+        ],
+    )
+    conn.commit()
+
+    ensure_schema(conn)
+    rows = conn.execute(
+        "SELECT date, vehicle_category, maker, registrations, month_key FROM registrations ORDER BY date"
+    ).fetchall()
+    kind = conn.execute("SELECT type FROM sqlite_master WHERE name = 'registrations'").fetchone()
+    conn.close()
+
+    assert rows == [
+        ("2025-01-01", "2W", "A", 2, 2025 * 12),
+        ("2025-02-01", "4W", "B", 3, 2025 * 12 + 1),
+    ]
+    assert kind == ("view",)
+
+
+def test_upsert_frame_codes_dimensions(tmp_path):
+    conn = connect(str(tmp_path / "vahan.db"))
+    ensure_schema(conn)
+    df = pd.DataFrame({
+        "date": ["2025-01-01", "2025-02-01", "2025-02-01"],
+        "vehicle_category": ["2W", "2W", "4W"],
+        "maker": ["A", "A", "B"],
+        "registrations": [10, 20, 30],
+    })
+
+    with conn:
+        written = upsert_frame(conn, df)
+        rewritten = upsert_frame(conn, df)
+    makers = conn.execute("SELECT COUNT(*) FROM makers").fetchone()[0]
+    journal = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    conn.close()
+
+    assert (written, rewritten) == (3, 0)
+    assert makers == 2
+    assert journal == "wal"
+
+
+def test_refresh_rollups_is_incremental(tmp_path):
+    conn = connect(str(tmp_path / "vahan.db"))
+    ensure_schema(conn)
+    first = pd.DataFrame({
+        "date": ["2025-01-01", "2025-01-15", "2025-04-01"],
+        "vehicle_category": ["2W", "2W", "2W"],
+        "maker": ["A", "A", "A"],
+        "registrations": [10, 5, 30],
+    })
+    with conn:
+        upsert_frame(conn, first)
+    assert refresh_rollups(conn) == 2
+
+    # A late-arriving prior year updates that month and the YoY of the next.
+    with conn:
+        upsert_frame(conn, first.assign(date=["2024-01-01", "2024-01-02", "2024-10-01"]))
+    assert refresh_rollups(conn) == 2
+    assert refresh_rollups(conn) == 0
+
+    monthly = conn.execute(
+        "SELECT month_key, registrations, prev_year_regs FROM rollup_maker_month ORDER BY month_key"
+    ).fetchall()
+    quarterly = conn.execute(
+        "SELECT quarter_key, registrations, prev_q_regs, prev_year_regs"
+        " FROM rollup_category_quarter ORDER BY quarter_key"
+    ).fetchall()
+    conn.close()
+
+    assert monthly == [
+        (2024 * 12, 15, None),
+        (2024 * 12 + 9, 30, None),
+        (2025 * 12, 15, 15),
+        (2025 * 12 + 3, 30, None),
+    ]
+    assert quarterly == [
+        (2024 * 4, 15, None, None),
+        (2024 * 4 + 3, 30, None, None),
+        (2025 * 4, 15, 30, 15),
+        (2025 * 4 + 1, 30, 15, None),
+    ]
+
+
+def test_geo_facts_roll_up_to_every_level(tmp_path):
+    conn = connect(str(tmp_path / "vahan.db"))
+    ensure_schema(conn)
+    df = pd.DataFrame({
+        "date": ["2025-01-01", "2025-01-01", "2025-01-01", "2025-02-01"],
+        "vehicle_category": ["2W", "2W", "2W", "2W"],
+        "maker": ["A", "A", "A", "A"],
+        "state": ["KA", "KA", "MH", "KA"],
+        "rto": ["KA01", "KA02", "MH01", "KA01"],
+        "registrations": [10, 20, 30, 40],
+    })
+    with conn:
+        assert upsert_frame(conn, df) == 4
+        # A revised RTO count moves the national fact by the difference.
+        assert upsert_frame(conn, df.iloc[[1]].assign(registrations=25)) == 1
+    refresh_rollups(conn)
+
+    national = conn.execute("SELECT day, registrations FROM registration_facts ORDER BY day").fetchall()
+    states = conn.execute(
+        "SELECT s.name, r.month_key, r.registrations FROM rollup_state_month AS r"
+        " JOIN states AS s ON s.id = r.state_id ORDER BY s.name, r.month_key"
+    ).fetchall()
+    rtos = conn.execute("SELECT COUNT(*), SUM(registrations) FROM rollup_rto_month").fetchone()
+    maker = conn.execute("SELECT SUM(registrations) FROM rollup_maker_month").fetchone()[0]
+    conn.close()
+
+    assert national == [(20250101, 65), (20250201, 40)]
+    assert states == [("KA", 2025 * 12, 35), ("KA", 2025 * 12 + 1, 40), ("MH", 2025 * 12, 30)]
+    assert rtos == (4, 105) and maker == 105
+
+
+def _totals(conn):
+    return conn.execute("SELECT COALESCE(SUM(registrations), 0) FROM rollup_maker_month").fetchone()[0]
+
+
+def test_staged_writes_appear_with_the_version_or_not_at_all(tmp_path):
+    db = str(tmp_path / "vahan.db")
+    conn = connect(db)
+    ensure_schema(conn)
+    frame = pd.DataFrame({
+        "date": ["2025-01-01"],
+        "vehicle_category": ["2W"],
+        "maker": ["A"],
+        "registrations": [10],
+    })
+    before = publish_version(conn)
+
+    with staged(conn):
+        # Commits made inside the block (as ingest and the rollups do) are
+        # held until it ends.
+        with conn:
+            upsert_frame(conn, frame)
+        refresh_rollups(conn)
+        after = publish_version(conn)
+        with pinned(db) as reader:
+            assert (published_version(reader), _totals(reader)) == (before, 0)
+    with pinned(db) as reader:
+        assert (published_version(reader), _totals(reader)) == (after, 10)
+
+    # A failure anywhere in the block leaves the published data untouched.
+    with pytest.raises(RuntimeError):
+        with staged(conn):
+            with conn:
+                upsert_frame(conn, frame.assign(date=["2025-02-01"]))
+            refresh_rollups(conn)
+            publish_version(conn)
+            raise RuntimeError("boom")
+    assert (published_version(conn), _totals(conn)) == (after, 10)
+    conn.close()
+
+
+def test_pinned_reader_keeps_its_version(tmp_path):
+    db = str(tmp_path / "vahan.db")
+    conn = connect(db)
+    ensure_schema(conn)
+    first = publish_version(conn)
+
+    with pinned(db, first) as reader:
+        with conn:
+            upsert_frame(conn, pd.DataFrame({
+                "date": ["2025-01-01"],
+                "vehicle_category": ["2W"],
+                "maker": ["A"],
+                "registrations": [10],
+            }))
+        refresh_rollups(conn)
+        second = publish_version(conn)
+        # Published mid-read: this reader still sees the version it pinned.
+        assert (published_version(reader), _totals(reader)) == (first, 0)
+    conn.close()
+
+    assert second > first
+    with pytest.raises(VersionChanged):
+        with pinned(db, first):
+            pass
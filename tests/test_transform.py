@@ -1,5 +1,15 @@
 import pandas as pd
-from src.transform import compute_yoy_qoq, compute_category_growth
+import pytest
+from src.data_processing import get_key_insight
+from src.transform import (
+    AggregationContext,
+    compute_category_growth,
+    compute_geo_rollups,
+    compute_windowed_metrics,
+    compute_yoy_qoq,
+    lag_start,
+    with_prior_totals,
+)
 
 
 def test_compute_yoy_qoq_missing_months():
@@ -25,3 +35,144 @@ def test_compute_category_growth_missing_months():
     monthly, _ = compute_category_growth(df)
     res = monthly[monthly["period"] == pd.Timestamp("2023-01-01")]
     assert res["yoy_pct"].iloc[0] == 50.0
+
+
+def test_aggregation_context_shared_across_views():
+    df = pd.DataFrame({
+        "date": ["2023-01-05", "2023-01-20", "2024-01-10", "2024-02-01"],
+        "vehicle_category": ["2W", "2W", "2W", "4W"],
+        "maker": ["A", "B", "A", "B"],
+        "registrations": [100, 50, 180, 40],
+    })
+    context = AggregationContext(df)
+
+    monthly, _ = compute_yoy_qoq(df, context=context)
+    cat_month, _ = compute_category_growth(df, context=context)
+    monthly["yoy_pct"] = 0  # callers get copies, not the cached frames
+
+    assert len(context.cube) == 4
+    assert context.maker_growth[0]["yoy_pct"].isna().sum() == 3
+    jan = cat_month[cat_month["period"] == pd.Timestamp("2024-01-01")]
+    assert jan["yoy_pct"].iloc[0] == 20.0
+    assert context.totals["registrations"].tolist() == [150, 180, 40]
+    assert get_key_insight(df, context=context).startswith("Month-over-month")
+
+
+def test_compute_yoy_qoq_missing_quarter():
+    """QoQ must not compare against a non-adjacent quarter."""
+    df = pd.DataFrame({
+        "date": ["2023-01-01", "2023-07-01", "2023-10-01"],
+        "vehicle_category": ["Car"] * 3,
+        "maker": ["A"] * 3,
+        "registrations": [100, 200, 300],
+    })
+    _, quarterly = compute_yoy_qoq(df)
+    q3 = quarterly[quarterly["quarter"] == pd.Timestamp("2023-07-01")].iloc[0]
+    q4 = quarterly[quarterly["quarter"] == pd.Timestamp("2023-10-01")].iloc[0]
+    assert pd.isna(q3["prev_q_regs"]) and pd.isna(q3["qoq_pct"])
+    assert q4["qoq_pct"] == 50.0
+
+
+def test_growth_arbitrary_lag():
+    df = pd.DataFrame({
+        "date": ["2024-01-01", "2024-02-01", "2024-04-01", "2024-04-01"],
+        "vehicle_category": ["2W", "2W", "2W", "4W"],
+        "registrations": [100, 120, 150, 10],
+    })
+    mom = AggregationContext(df).growth(1)
+    two_months = AggregationContext(df).growth(2, by=())
+
+    two_wheel = mom[mom["vehicle_category"] == "2W"]["growth_pct"]
+    assert pd.isna(two_wheel.iloc[0])
+    assert two_wheel.iloc[1] == 20.0
+    assert pd.isna(two_wheel.iloc[2])  # March is missing, so April has no MoM
+    assert two_months.set_index("period")["prev_regs"].loc[pd.Timestamp("2024-04-01")] == 120
+
+
+def test_compact_frame_matches_string_frame():
+    df = pd.DataFrame({
+        "date": ["2023-01-05", "2023-04-20", "2024-01-10", "2024-04-01", "2024-04-02"],
+        "vehicle_category": ["2W", "2W", "2W", "4W", "2W"],
+        "maker": ["A", "B", "A", "B", "B"],
+        "registrations": [100, 50, 180, 40, 60],
+    })
+    dates = pd.to_datetime(df["date"])
+    compact = pd.DataFrame({
+        "month_key": (dates.dt.year * 12 + dates.dt.month - 1).astype("int32"),
+        "vehicle_category": df["vehicle_category"].astype("category"),
+        "maker": df["maker"].astype("category"),
+        "registrations": df["registrations"].astype("int32"),
+    })
+
+    for expected, got in zip(compute_yoy_qoq(df), compute_yoy_qoq(compact)):
+        pd.testing.assert_frame_equal(got, expected, check_categorical=False, check_dtype=False)
+    for expected, got in zip(compute_category_growth(df), compute_category_growth(compact)):
+        pd.testing.assert_frame_equal(got, expected, check_categorical=False, check_dtype=False)
+    assert get_key_insight(compact) == get_key_insight(df)
+    assert isinstance(compute_yoy_qoq(compact)[0]["maker"].dtype, pd.CategoricalDtype)
+
+
+def test_windowed_metrics_match_naive_sums():
+    """YTD, FYTD and trailing sums should match summing the months by hand."""
+    periods = pd.date_range("2022-01-01", "2024-06-01", freq="MS")
+    df = pd.DataFrame({
+        "date": list(periods) * 2,
+        "vehicle_category": "Car",
+        "maker": ["A"] * len(periods) + ["B"] * len(periods),
+        "registrations": list(range(1, len(periods) + 1)) + [10] * len(periods),
+    })
+    # A skipped month counts as zero registrations.
+    df = df.drop(df[(df["maker"] == "A") & (df["date"] == pd.Timestamp("2023-05-01"))].index)
+    makers, categories = compute_windowed_metrics(df)
+
+    a = df[df["maker"] == "A"].set_index("date")["registrations"].reindex(periods, fill_value=0)
+    row = makers[(makers["maker"] == "A") & (makers["period"] == pd.Timestamp("2023-08-01"))].iloc[0]
+    assert row["ytd"] == a["2023-01":"2023-08"].sum()
+    assert row["fytd"] == a["2023-04":"2023-08"].sum()
+    assert row["trailing_3m"] == a["2023-06":"2023-08"].sum()
+    assert row["trailing_12m"] == a["2022-09":"2023-08"].sum()
+    assert row["ytd_yoy_pct"] == pytest.approx(
+        (a["2023-01":"2023-08"].sum() / a["2022-01":"2022-08"].sum() - 1) * 100
+    )
+    assert row["share_pct"] == pytest.approx(100 * a["2023-08"].iloc[0] / (a["2023-08"].iloc[0] + 10))
+
+    first = makers[makers["maker"] == "A"].iloc[0]
+    # Windows reaching back before the data are unknown, not partial.
+    assert first["ytd"] == 1 and pd.isna(first["fytd"]) and pd.isna(first["trailing_3m"])
+    assert pd.isna(first["ytd_yoy_pct"])
+    assert (categories["share_pct"] == 100).all()
+    assert categories["trailing_12m"].iloc[-1] == makers.groupby("period")["trailing_12m"].sum().iloc[-1]
+
+
+def test_geo_rollups_sum_up_the_hierarchy():
+    df = pd.DataFrame({
+        "date": ["2025-01-03", "2025-01-20", "2025-01-05", "2025-02-01"],
+        "vehicle_category": ["2W"] * 4,
+        "maker": ["A"] * 4,
+        "state": ["KA", "KA", "MH", "KA"],
+        "rto": ["KA01", "KA01", "MH01", "KA02"],
+        "registrations": [10, 5, 30, 40],
+    })
+    rollups = compute_geo_rollups(df)
+
+    assert list(rollups) == ["rto", "state", "national"]
+    assert rollups["rto"]["registrations"].tolist() == [15, 30, 40]
+    assert rollups["state"][["state", "registrations"]].values.tolist() == [["KA", 15], ["MH", 30], ["KA", 40]]
+    assert list(rollups["national"].columns) == ["period", "vehicle_category", "maker", "registrations"]
+    assert rollups["national"]["registrations"].tolist() == [45, 40]
+
+
+def test_with_prior_totals_reads_back_and_trims():
+    """The first kept period gets its prior total from the widened read."""
+    start = 2024 * 12
+    assert lag_start(start, 12) == start - 12
+    assert lag_start(start, 1, quarterly=True) == start - 3
+    sums = pd.DataFrame({
+        "month_key": [start - 12, start - 12, start, start + 1],
+        "vehicle_category": ["2W", "4W", "2W", "2W"],
+        "registrations": [100, 40, 150, 10],
+    })
+    got = with_prior_totals(sums, sums["month_key"].to_numpy(), 12, "prev_year_regs", start)
+    assert got["month_key"].tolist() == [start, start + 1]
+    assert got["prev_year_regs"].tolist()[0] == 100
+    assert pd.isna(got["prev_year_regs"].iloc[1])
@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pandas as pd
+
+# Ensure src is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.validation import canonical_maker, validate
+
+TODAY = pd.Timestamp("2025-06-30")
+
+
+def test_validate_quarantines_each_rule():
+    df = pd.DataFrame({
+        "date": ["2025-01-01", "2025-01-01", "not a date", "2030-01-01", "2025-02-01",
+                 "2025-02-01", "2025-02-01", None, None],
+        "vehicle_category": ["2W", "2W", "2W", "2W", "2W", "4W", "4W", "2W", None],
+        "maker": ["HONDA MOTORCYCLE & SCOOTER INDIA PVT LTD", "Honda", "Honda", "Honda",
+                  "Honda", "Tata", "Tata", "Honda", None],
+        "registrations": ["1,200", "1,250", "5", "5", "abc", "-3", "12.5", "7", None],
+    })
+    result = validate(df, today=TODAY)
+
+    assert result.valid.to_dict("records") == [
+        {"date": "2025-01-01", "vehicle_category": "2W", "maker": "Honda", "registrations": 1250},
+    ]
+    assert result.rejected["rule"].tolist() == [
+        "duplicate", "bad_date", "date_out_of_range", "bad_count", "count_out_of_range",
+        "bad_count", "missing",
+    ]
+    # Raw values are kept as read, and the all-empty spacer row is not reported.
+    assert result.rejected["maker"].iloc[0] == "HONDA MOTORCYCLE & SCOOTER INDIA PVT LTD"
+    assert result.rejected["registrations"].iloc[3] == "abc"
+
+
+def test_dedup_keeps_areas_apart():
+    df = pd.DataFrame({
+        "date": ["2025-01-01"] * 3,
+        "vehicle_category": ["2W"] * 3,
+        "maker": ["Honda"] * 3,
+        "registrations": [10, 20, 30],
+        "state": ["KA", "MH", "KA"],
+        "rto": ["KA01", "MH01", "KA01"],
+    })
+    result = validate(df, today=TODAY)
+
+    assert result.valid["registrations"].tolist() == [20, 30]
+    assert result.rejected[["rto", "rule"]].values.tolist() == [["KA01", "duplicate"]]
+
+
+def test_canonical_maker():
+    assert canonical_maker("Maruti Suzuki India Ltd.") == "Maruti"
+    assert canonical_maker("INDIA YAMAHA MOTOR PVT LTD") == "Yamaha"
+    assert canonical_maker("  Ather   Energy ") == "Ather Energy"